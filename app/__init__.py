@@ -7,12 +7,20 @@ from app.config.settings import Config
 
 def create_app():
     """Application factory pattern"""
+    # Queue-backed structured logging before anything starts logging
+    from app.utils.telemetry import setup_logging
+    setup_logging()
+    
     app = Flask(__name__)
     app.config.from_object(Config)
     
     # Enable CORS
     CORS(app)
     
+    # Minified, fingerprinted and pre-compressed static assets
+    from app.utils.assets import init_assets
+    init_assets(app)
+    
     # Register blueprints
     from app.api.routes import api_bp
     from app.api.main_routes import main_bp
@@ -20,4 +28,12 @@ def create_app():
     app.register_blueprint(main_bp)
     app.register_blueprint(api_bp, url_prefix='/api')
     
+    # Construct AI clients without network I/O; health probes run in the background
+    from app.utils.ai_clients import init_ai_clients
+    init_ai_clients(app)
+    
+    # Serve precomputed answers to common questions from the first request
+    from app.utils.warm_cache import load_warm_cache
+    load_warm_cache()
+    
     return app 
\ No newline at end of file
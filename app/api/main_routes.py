@@ -1,60 +1,124 @@
 """
 Main application routes
 """
+import logging
 import os
-from flask import Blueprint, render_template, send_file, jsonify, current_app
+from flask import Blueprint, Response, abort, request, jsonify
+from app.config.settings import Config
+from app.utils.assets import get_asset_registry
+from app.utils.file_delivery import CachedFile
+from app.utils.metrics import render_prometheus
+from app.utils.page_cache import PrerenderedPage
+
+logger = logging.getLogger(__name__)
 
 main_bp = Blueprint('main', __name__)
 
+# Fingerprinted URLs change whenever the content does, so browsers may keep them forever
+IMMUTABLE_CACHE_CONTROL = 'public, max-age=31536000, immutable'
+
+# The landing page has no per-request data, so it is rendered once and served from memory
+index_page = PrerenderedPage('portfolio.html')
+
+# Path resolved once; stat metadata and (small) contents are cached between downloads
+resume_file = CachedFile(
+    Config.RESUME_PATH,
+    download_name=os.path.basename(Config.RESUME_PATH),
+    mimetype='application/pdf',
+    stat_ttl=Config.RESUME_STAT_TTL,
+    memory_max_bytes=Config.RESUME_MEMORY_MAX_BYTES
+)
+
 @main_bp.route('/')
 def index():
     """Serve the main portfolio page"""
-    return render_template('portfolio.html')
+    body, encoding, etag = index_page.get(request.headers.get('Accept-Encoding'))
+    headers = {
+        # Always revalidate; an unchanged page costs a 304 with no body
+        'Cache-Control': 'no-cache',
+        'Vary': 'Accept-Encoding',
+        'ETag': f'"{etag}"'
+    }
+    if request.if_none_match.contains(etag):
+        return Response(status=304, headers=headers)
+    if encoding:
+        headers['Content-Encoding'] = encoding
+    return Response(body, mimetype='text/html', headers=headers)
+
+@main_bp.route('/static/dist/<path:filename>')
+def static_asset(filename):
+    """Serve a fingerprinted asset, pre-compressed when the client accepts it"""
+    registry = get_asset_registry()
+    variant = registry.variant(filename, request.headers.get('Accept-Encoding')) if registry else None
+    if variant is None:
+        abort(404)
+    body, encoding, etag = variant
+
+    headers = {
+        'Cache-Control': IMMUTABLE_CACHE_CONTROL,
+        'Vary': 'Accept-Encoding',
+        'ETag': f'"{etag}"'
+    }
+    if request.if_none_match.contains(etag):
+        return Response(status=304, headers=headers)
+    if encoding:
+        headers['Content-Encoding'] = encoding
+    return Response(body, mimetype=registry.mimetype(filename), headers=headers)
 
 @main_bp.route('/health')
 def health_check():
     """Health check endpoint for Railway"""
+    from app.utils.ai_clients import get_ai_manager
+    
+    # Liveness never waits on the providers; readiness is reported alongside it
     return jsonify({
         'status': 'healthy',
         'message': 'Portfolio app is running',
-        'version': '1.0.0'
+        'version': '1.0.0',
+        'readiness': get_ai_manager().get_readiness()
     }), 200
 
+@main_bp.route('/metrics')
+def metrics():
+    """Prometheus metrics for this worker"""
+    from app.utils.ai_clients import get_ai_manager
+    from app.utils.coalescing import get_single_flight
+    from app.utils.response_cache import get_response_cache
+    from app.utils.sessions import get_session_store
+    
+    ai_manager = get_ai_manager()
+    circuits = ai_manager.model_health.snapshot()
+    gauges = {
+        'response_cache_entries': ('Answers held in the response cache', [
+            ({}, get_response_cache().stats()['size'])
+        ]),
+        'single_flight_generations': ('Generations currently shared by coalesced requests', [
+            ({}, get_single_flight().in_flight())
+        ]),
+        'model_circuit_open': ('1 while a model is skipped by its circuit breaker (open or evicted)', [
+            ({'model': model}, int(health['state'] in ('open', 'evicted'))) for model, health in circuits.items()
+        ]),
+        'chat_sessions': ('Chat sessions held by the session store', [
+            ({}, size) for size in [get_session_store().size()] if size is not None
+        ]),
+        'provider_slots_in_use': ('Concurrent calls currently held per provider', [
+            ({'provider': provider}, in_use) for provider, in_use in ai_manager.provider_slots.in_use().items()
+        ])
+    }
+    budget = ai_manager.router.budget if ai_manager.router is not None else None
+    if budget is not None:
+        gauges['token_budget_used_ratio'] = ("Share of today's provider token budget this worker has spent", [
+            ({}, round(budget.used_fraction(), 4))
+        ])
+    return Response(render_prometheus(gauges), mimetype='text/plain; version=0.0.4')
+
 @main_bp.route('/download-resume')
 def download_resume():
     """Download resume file"""
-    try:
-        # Get the current working directory and construct the path
-        current_dir = os.getcwd()
-        
-        # Try the actual filename with spaces first
-        resume_path = os.path.join(current_dir, 'assets', 'Raviteja_B_Resume.pdf')
-        
-        print(f"Looking for resume at: {resume_path}")
-        print(f"File exists: {os.path.exists(resume_path)}")
-        
-        if os.path.exists(resume_path):
-            return send_file(
-                resume_path,
-                as_attachment=True,
-                download_name='Raviteja_B_Resume.pdf',
-                mimetype='application/pdf'
-            )
-        else:
-            # Try without spaces as fallback
-            alt_path = os.path.join(current_dir, 'assets', 'Raviteja_B_Resume.pdf')
-            print(f"Trying alternative path: {alt_path}")
-            
-            if os.path.exists(alt_path):
-                return send_file(
-                    alt_path,
-                    as_attachment=True,
-                    download_name='Raviteja_B_Resume.pdf',
-                    mimetype='application/pdf'
-                )
-            else:
-                return jsonify({'error': f'Resume file not found at {resume_path} or {alt_path}'}), 404
-                
-    except Exception as e:
-        print(f"Resume download error: {e}")
-        return jsonify({'error': f'Failed to download resume: {str(e)}'}), 500 
\ No newline at end of file
+    version = resume_file.refresh()
+    if version is None:
+        logger.warning(f"Resume file not found at {resume_file.path}")
+        return jsonify({'error': 'Resume file not found'}), 404
+    if Config.RESUME_OFFLOAD in ('x-sendfile', 'x-accel-redirect'):
+        return resume_file.offload_response(version, Config.RESUME_OFFLOAD, Config.RESUME_ACCEL_PREFIX)
+    return resume_file.response(version)
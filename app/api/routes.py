@@ -1,170 +1,391 @@
 """
 API routes for chat functionality
 """
-import json
-import time
+import hmac
+import logging
+import math
 from flask import Blueprint, request, jsonify, Response
+from app.config.settings import Config
 from app.utils.ai_clients import get_ai_manager
+from app.utils.coalescing import get_single_flight
+from app.utils.deadline import DeadlineExceeded, deadline_scope
+from app.utils.rate_limit import client_key, get_rate_limiter
+from app.utils.response_cache import get_response_cache, normalize_question
 from app.utils.resume_context import RESUME_CONTEXT, get_smart_fallback_response
+from app.utils.sessions import (
+    SESSION_COOKIE, get_session_store, is_follow_up, new_session_id, sessions_enabled, valid_session_id
+)
+from app.utils.sse import SSE_HEADERS, done_event, format_event, meta_event, parse_event_id, stream_flight
+from app.utils.telemetry import Trace, get_metrics_registry, record_stage, span, start_trace, trace_scope
+from app.utils.warm_cache import answer_batch, save_warm_cache
+
+logger = logging.getLogger(__name__)
 
 api_bp = Blueprint('api', __name__)
 
+def chat_session(data):
+    """The visitor's chat session (body session_id, then cookie, else a new one); None when disabled"""
+    if not sessions_enabled():
+        return None
+    session_id = data.get('session_id') or request.cookies.get(SESSION_COOKIE)
+    if not valid_session_id(session_id):
+        session_id = new_session_id()
+    return get_session_store().get(session_id)
+
+def conversation_history(session, user_message):
+    """Session history for a follow-up question; None when the question stands on its own
+
+    Questions without references back ("What are his skills?") are answered
+    like a first question, so the cache, coalescing and warm answers apply.
+    """
+    if session is None or not is_follow_up(user_message, session.has_history()):
+        return None
+    return session.history()
+
+def with_session_cookie(response, session):
+    """Keep the session cookie on the response so the next question continues the conversation"""
+    if session is not None:
+        response.set_cookie(
+            SESSION_COOKIE, session.session_id, max_age=int(Config.SESSION_TTL_SECONDS),
+            httponly=True, samesite='Lax', secure=request.is_secure
+        )
+    return response
+
+def remember_turn(session, user_message, response):
+    """Append an answered question to the session history"""
+    if session is not None and response:
+        session.record(user_message, response)
+        get_session_store().save(session)
+
+def generation(ai_manager, user_message, cache, history=None):
+    """Return (coalescing key or None, start, on_complete) for generating an answer to a question
+
+    Follow-ups (history given) depend on the conversation, so they are
+    neither coalesced nor cached.
+    """
+    def start(cancel_event=None):
+        with span('prompt_build'):
+            prompt, messages = ai_manager.build_prompts(user_message, history)
+        return ai_manager.stream_chat(prompt, messages, cancel_event)
+
+    if history:
+        return None, start, None
+    key = (normalize_question(user_message) or user_message.lower()) if Config.COALESCE_REQUESTS else None
+    # Cache before the flight is released so the next identical question is a cache hit
+    return key, start, lambda text, api_used: cache.put(user_message, RESUME_CONTEXT, text, api_used)
+
+def request_fingerprint(user_message, history=None):
+    """What a streamed answer responds to, so a Last-Event-ID only resumes the same question and conversation"""
+    summary, turns = history or (None, [])
+    return normalize_question(user_message) or user_message.lower(), summary, tuple(turns)
+
+def answer_stream(ai_manager, user_message, cache, history=None):
+    """Yield (api_used, delta) for a question; identical concurrent questions share one generation
+
+    The generation runs as a flight, so waiting on it is bounded by the
+    request deadline (DeadlineExceeded) even when a provider call hangs.
+    """
+    return get_single_flight().subscribe(*generation(ai_manager, user_message, cache, history))
+
+def finish_trace_on_close(response, trace):
+    """Finish a streamed response's trace when the server closes it, if its body never ran"""
+    def finish():
+        if not trace.finished:
+            # The visitor left before the first chunk was requested
+            trace.attributes['disconnected'] = True
+            trace.finish()
+    response.call_on_close(finish)
+    return response
+
+def rate_limited(client, trace):
+    """Charge one provider-bound request to client; returns whole seconds to wait when over budget"""
+    if not Config.RATE_LIMIT_ENABLED:
+        return None
+    limiter = get_rate_limiter()
+    if limiter.allow(client):
+        return None
+    get_metrics_registry().inc('rate_limited', route=trace.route)
+    trace.attributes['rate_limited'] = True
+    logger.warning(f"🚫 Rate limit exceeded for client {client}, serving fallback")
+    return max(1, math.ceil(limiter.retry_after(client)))
+
 @api_bp.route('/chat', methods=['POST'])
 def chat():
     """Handle chat API requests"""
-    try:
-        data = request.get_json()
-        user_message = data.get('message', '').strip()
-        
-        if not user_message:
-            return jsonify({'error': 'No message provided'}), 400
-        
-        # Get AI manager instance
-        ai_manager = get_ai_manager()
-        
-        # Ensure clients are initialized
-        if not ai_manager.gemini_client and not ai_manager.groq_client:
-            print("⚠️ No AI clients initialized, reinitializing...")
-            ai_manager._initialize_clients()
-        
-        response = None
-        api_used = "fallback"
-        
-        print(f"🔍 Processing user message: {user_message[:50]}...")
-        
-        # Try Gemini first
-        print("🤖 Trying Gemini API...")
-        prompt = f"{RESUME_CONTEXT}\n\nUser Question: {user_message}\n\nPlease provide a helpful, professional response:"
-        response = ai_manager.get_gemini_response(prompt)
-        if response:
-            api_used = "gemini"
-        
-        # Try Groq if Gemini failed
-        if response is None:
-            print("🤖 Trying Groq API...")
-            messages = [
-                {"role": "system", "content": RESUME_CONTEXT},
-                {"role": "user", "content": user_message}
-            ]
-            response = ai_manager.get_groq_response(messages)
-            if response:
-                api_used = "groq"
-        
-        # Use fallback ONLY if both APIs completely failed
-        if response is None:
-            print(f"⚠️ All APIs failed, using smart fallback for: {user_message}")
-            response = get_smart_fallback_response(user_message)
+    # One time budget for every provider and model attempt behind this answer
+    with start_trace('chat') as trace, deadline_scope():
+        try:
+            with span('parse'):
+                data = request.get_json()
+                user_message = data.get('message', '').strip()
+
+            if not user_message:
+                return jsonify({'error': 'No message provided'}), 400
+
+            session = chat_session(data)
+            history = conversation_history(session, user_message)
+            session_id = session.session_id if session is not None else None
+
+            # Serve repeated questions without touching the providers (follow-ups depend on the conversation)
+            cache = get_response_cache()
+            cached = None
+            if history is None:
+                with span('cache_lookup') as stage:
+                    cached = cache.get(user_message, RESUME_CONTEXT)
+                    stage['outcome'] = 'hit' if cached else 'miss'
+            if cached:
+                logger.info(f"⚡ Cache hit for: {user_message[:50]}")
+                trace.attributes['api_used'] = 'cache'
+                remember_turn(session, user_message, cached[0])
+                return with_session_cookie(jsonify({
+                    'response': cached[0],
+                    'status': 'success',
+                    'api_used': 'cache',
+                    'session_id': session_id
+                }), session)
+
+            # Over-budget clients get the instant fallback instead of a provider call.
+            # Still a 200: the widget treats any error status as a failed request.
+            retry_after = rate_limited(client_key(request), trace)
+            if retry_after is not None:
+                with span('fallback', reason='rate_limited'):
+                    response = get_smart_fallback_response(user_message)
+                trace.attributes['api_used'] = 'fallback'
+                limited = with_session_cookie(jsonify({
+                    'response': response,
+                    'status': 'success',
+                    'api_used': 'fallback',
+                    'session_id': session_id
+                }), session)
+                limited.headers['Retry-After'] = str(retry_after)
+                return limited
+
+            # Get AI manager instance
+            ai_manager = get_ai_manager()
+
+            # Ensure clients are initialized (single-flight, rate limited)
+            ai_manager.ensure_clients()
+
+            response = None
             api_used = "fallback"
-        
-        print(f"✅ Response generated using: {api_used}")
-        
-        return jsonify({
-            'response': response,
-            'status': 'success',
-            'api_used': api_used
-        })
-        
-    except Exception as e:
-        print(f"Chat Error: {e}")
-        return jsonify({
-            'response': get_smart_fallback_response(user_message if 'user_message' in locals() else ''),
-            'status': 'fallback'
-        })
+
+            logger.info(f"🔍 Processing user message: {user_message[:50]}...")
+
+            # Gemini first, Groq as fallback or hedge, sync or async per Config;
+            # an identical in-flight question is joined instead of calling the providers again
+            with span('generate') as stage:
+                try:
+                    deltas = list(answer_stream(ai_manager, user_message, cache, history))
+                except DeadlineExceeded:
+                    # The providers are still busy; the fallback answers within the deadline instead
+                    deltas = []
+                    trace.attributes['deadline_expired'] = True
+                if deltas:
+                    response, api_used = ''.join(delta for _, delta in deltas).strip(), deltas[-1][0]
+                stage['outcome'] = 'success' if response else 'failed'
+
+            # Use fallback ONLY if both APIs completely failed
+            if not response:
+                logger.warning(f"⚠️ All APIs failed, using smart fallback for: {user_message}")
+                with span('fallback'):
+                    response = get_smart_fallback_response(user_message)
+                api_used = "fallback"
+            else:
+                # The flight's on_complete has already cached a standalone answer
+                remember_turn(session, user_message, response)
+
+            logger.info(f"✅ Response generated using: {api_used}")
+            trace.attributes['api_used'] = api_used
+
+            return with_session_cookie(jsonify({
+                'response': response,
+                'status': 'success',
+                'api_used': api_used,
+                'session_id': session_id
+            }), session)
+
+        except Exception as e:
+            logger.error(f"Chat Error: {e}")
+            trace.attributes['api_used'] = 'fallback'
+            return jsonify({
+                'response': get_smart_fallback_response(user_message if 'user_message' in locals() else ''),
+                'status': 'fallback'
+            })
+
+@api_bp.route('/chat/batch', methods=['POST'])
+def chat_batch():
+    """Answer many questions concurrently (bounded), optionally saving them to the warm cache file"""
+    token = Config.BATCH_API_TOKEN
+    supplied = request.headers.get('Authorization', '').removeprefix('Bearer ').strip()
+    # Every question may cost provider calls, so the endpoint only exists for operators
+    if not token or not hmac.compare_digest(supplied.encode('utf-8'), token.encode('utf-8')):
+        return jsonify({'error': 'Not found'}), 404
+
+    data = request.get_json(silent=True) or {}
+    questions = data.get('questions')
+    if isinstance(questions, list):
+        questions = [str(question).strip() for question in questions if str(question).strip()]
+    if not isinstance(questions, list) or not questions:
+        return jsonify({'error': 'No questions provided'}), 400
+    if len(questions) > Config.BATCH_MAX_QUESTIONS:
+        return jsonify({'error': f'At most {Config.BATCH_MAX_QUESTIONS} questions per batch'}), 400
+
+    # One wall-time budget for the whole batch, so it cannot hold this worker thread indefinitely
+    with start_trace('chat_batch') as trace, deadline_scope(Config.BATCH_DEADLINE_SECONDS):
+        # Callers may ask for less parallelism than the configured cap, never more
+        requested = data.get('concurrency')
+        concurrency = Config.BATCH_CONCURRENCY
+        if isinstance(requested, int) and requested > 0:
+            concurrency = min(requested, concurrency)
+        results = answer_batch(get_ai_manager(), get_response_cache(), questions, concurrency)
+        answered = sum(1 for result in results if result['status'] == 'success')
+        trace.attributes['api_used'] = 'batch'
+        logger.info(f"✅ Batch answered {answered}/{len(results)} questions")
+
+        saved = None
+        if data.get('persist'):
+            try:
+                saved = save_warm_cache(results)
+            except OSError as e:
+                logger.error(f"❌ Could not write warm cache: {e}")
+
+    return jsonify({
+        'results': results,
+        'answered': answered,
+        'failed': len(results) - answered,
+        'warm_cache_entries': saved
+    })
 
 @api_bp.route('/chat-stream', methods=['POST'])
 def chat_stream():
-    """Streaming chat endpoint for real-time response generation"""
+    """Streaming chat endpoint (text/event-stream) for real-time response generation"""
+    # The trace outlives this view: it is finished by the response generator, or on close
+    trace = Trace('chat_stream')
     try:
-        data = request.get_json()
-        user_message = data.get('message', '').strip()
+        with trace_scope(trace), span('parse'):
+            data = request.get_json()
+            user_message = data.get('message', '').strip()
 
         if not user_message:
+            trace.finish()
             return jsonify({'error': 'No message provided'}), 400
 
+        # Resolved here: the request context is gone once the body starts streaming
+        client = client_key(request)
+        session = chat_session(data)
+        history = conversation_history(session, user_message)
+        last_event = parse_event_id(request.headers.get('Last-Event-ID') or data.get('last_event_id'))
+
         def generate_response():
             """Generator function for streaming response"""
-            ai_manager = get_ai_manager()
+            with start_trace('chat_stream', trace), deadline_scope():
+                flights = get_single_flight()
+                flight, start_index = None, 0
+                if last_event is not None:
+                    # A reconnect continues its generation from the replay buffer instead of starting over
+                    flight = flights.resume(last_event[0], request_fingerprint(user_message, history))
+                    if flight is not None:
+                        start_index = last_event[1]
 
-            # Ensure clients are initialized
-            if not ai_manager.gemini_client and not ai_manager.groq_client:
-                print("⚠️ No AI clients initialized, reinitializing...")
-                ai_manager._initialize_clients()
+                if flight is None:
+                    # Serve repeated questions without touching the providers (follow-ups depend on the conversation)
+                    cache = get_response_cache()
+                    cached = None
+                    if history is None:
+                        with span('cache_lookup') as stage:
+                            cached = cache.get(user_message, RESUME_CONTEXT)
+                            stage['outcome'] = 'hit' if cached else 'miss'
+                    if cached:
+                        logger.info(f"⚡ Cache hit for: {user_message[:50]}")
+                        trace.attributes['api_used'] = 'cache'
+                        remember_turn(session, user_message, cached[0])
+                        yield meta_event()
+                        yield format_event({'chunk': cached[0], 'api_used': 'cache'})
+                        yield format_event({'complete': True, 'api_used': 'cache'})
+                        yield done_event()
+                        return
 
-            response = None
-            api_used = "fallback"
+                    # Over-budget clients get the instant fallback instead of a provider call
+                    retry_after = rate_limited(client, trace)
+                    if retry_after is not None:
+                        with span('fallback', reason='rate_limited'):
+                            response = get_smart_fallback_response(user_message)
+                        trace.attributes['api_used'] = 'fallback'
+                        yield meta_event()
+                        yield format_event({'chunk': response, 'api_used': 'fallback'})
+                        yield format_event({'complete': True, 'api_used': 'fallback', 'retry_after': retry_after})
+                        yield done_event()
+                        return
 
-            print(f"🔍 Processing user message: {user_message[:50]}...")
-
-            # Try Gemini first
-            print("🤖 Trying Gemini API...")
-            prompt = f"{RESUME_CONTEXT}\n\nUser Question: {user_message}\n\nPlease provide a helpful, professional response:"
-            response = ai_manager.get_gemini_response(prompt)
-            if response:
-                api_used = "gemini"
-
-            # Try Groq if Gemini failed
-            if response is None:
-                print("🤖 Trying Groq API...")
-                messages = [
-                    {"role": "system", "content": RESUME_CONTEXT},
-                    {"role": "user", "content": user_message}
-                ]
-                response = ai_manager.get_groq_response(messages)
-                if response:
-                    api_used = "groq"
-
-            # Use fallback if both failed
-            if response is None:
-                print(f"⚠️ All APIs failed, using smart fallback for: {user_message}")
-                response = get_smart_fallback_response(user_message)
-                api_used = "fallback"
+                    ai_manager = get_ai_manager()
+
+                    # Ensure clients are initialized (single-flight, rate limited)
+                    ai_manager.ensure_clients()
+
+                    logger.info(f"🔍 Processing user message: {user_message[:50]}...")
+                    flight = flights.join(
+                        *generation(ai_manager, user_message, cache, history),
+                        fingerprint=request_fingerprint(user_message, history)
+                    )
+
+                # Forward provider deltas in coalesced frames as they are emitted
+                state = {}
+                try:
+                    for frame in stream_flight(flight, start_index, state):
+                        if state['frames'] == 1 and 'first_byte' not in state:
+                            state['first_byte'] = True
+                            record_stage('stream_first_byte', trace.elapsed(), api_used=state['api_used'])
+                        yield frame
+                except GeneratorExit:
+                    # The server closes the response once a write to a departed visitor fails.
+                    # Returning frees this worker thread; leave() cancels the generation unless it is resumed.
+                    logger.info(f"🔌 Client disconnected from stream {flight.stream_id}")
+                    get_metrics_registry().inc('stream_disconnects')
+                    trace.attributes['disconnected'] = True
+                    raise
+                finally:
+                    flights.leave(flight)
 
-            print(f"✅ Response generated using: {api_used}")
-
-            # Stream the response word by word for realistic typing effect
-            words = response.split()
-            
-            for word in words:
-                # Send chunk
-                chunk_data = {
-                    'chunk': word + " ",
-                    'api_used': api_used,
-                    'complete': False
-                }
-                yield f"data: {json.dumps(chunk_data)}\n\n"
-                
-                # Add small delay for realistic typing speed (very fast but visible)
-                time.sleep(0.03)  # 30ms between words - extremely fast
-            
-            # Send completion signal
-            yield f"data: {json.dumps({'complete': True, 'api_used': api_used})}\n\n"
-            yield "data: [DONE]\n\n"
-
-        return Response(
+                api_used = state.get('api_used') or "fallback"
+                if state.get('expired'):
+                    trace.attributes['deadline_expired'] = True
+
+                # Use fallback if both failed
+                if not state.get('text'):
+                    logger.warning(f"⚠️ All APIs failed, using smart fallback for: {user_message}")
+                    with span('fallback'):
+                        response = get_smart_fallback_response(user_message)
+                    api_used = "fallback"
+                    yield format_event({'chunk': response, 'api_used': api_used})
+                else:
+                    record_stage('stream_complete', trace.elapsed(), api_used=api_used)
+                    remember_turn(session, user_message, state['text'])
+
+                logger.info(f"✅ Response generated using: {api_used}")
+                trace.attributes['api_used'] = api_used
+
+                # Send completion signal
+                yield format_event({'complete': True, 'api_used': api_used})
+                yield done_event()
+
+        return finish_trace_on_close(with_session_cookie(Response(
             generate_response(),
-            mimetype='text/plain',
-            headers={
-                'Cache-Control': 'no-cache',
-                'Connection': 'keep-alive',
-                'Access-Control-Allow-Origin': '*'
-            }
-        )
+            mimetype='text/event-stream',
+            headers=SSE_HEADERS
+        ), session), trace)
 
     except Exception as e:
-        print(f"Streaming Chat Error: {e}")
+        logger.error(f"Streaming Chat Error: {e}")
+        fallback = get_smart_fallback_response(user_message if 'user_message' in locals() else '')
         def error_response():
-            fallback = get_smart_fallback_response(user_message if 'user_message' in locals() else '')
-            words = fallback.split()
-            for word in words:
-                yield f"data: {json.dumps({'chunk': word + ' ', 'api_used': 'fallback'})}\n\n"
-                time.sleep(0.03)
-            yield "data: [DONE]\n\n"
-        
-        return Response(
+            with start_trace('chat_stream', trace):
+                trace.attributes['api_used'] = 'fallback'
+                yield meta_event()
+                yield format_event({'chunk': fallback, 'api_used': 'fallback'})
+                yield done_event()
+
+        return finish_trace_on_close(Response(
             error_response(),
-            mimetype='text/plain',
-            headers={
-                'Cache-Control': 'no-cache',
-                'Connection': 'keep-alive'
-            }
-        ) 
\ No newline at end of file
+            mimetype='text/event-stream',
+            headers=SSE_HEADERS
+        ), trace)
@@ -12,15 +12,135 @@ class Config:
     SECRET_KEY = os.environ.get('SECRET_KEY') or 'dev-secret-key-change-in-production'
     GEMINI_API_KEY = os.environ.get('GEMINI_API_KEY')
     GROQ_API_KEY = os.environ.get('GROQ_API_KEY')
+    # Alternative provider endpoints (e.g. the benchmark stand-in); the Groq SDK reads GROQ_BASE_URL itself
+    GEMINI_API_ENDPOINT = os.environ.get('GEMINI_API_ENDPOINT', '')
     
     # Flask settings
     DEBUG = os.environ.get('FLASK_DEBUG', 'True').lower() == 'true'
     HOST = os.environ.get('FLASK_HOST', '0.0.0.0')
     PORT = int(os.environ.get('FLASK_PORT', 5000))
     
-    # Application settings
-    RESUME_PATH = os.path.join(os.getcwd(), 'assets', 'Raviteja_B_Resume.pdf')
+    # Logging: 'json' (structured, one object per line) or 'text'
+    LOG_LEVEL = os.environ.get('LOG_LEVEL', 'INFO').upper()
+    LOG_FORMAT = os.environ.get('LOG_FORMAT', 'json').lower()
+    
+    # Production server (gunicorn) settings; WEB_CONCURRENCY=0 derives workers from CPU cores
+    WEB_CONCURRENCY = int(os.environ.get('WEB_CONCURRENCY', 0))
+    GUNICORN_MAX_WORKERS = int(os.environ.get('GUNICORN_MAX_WORKERS', 8))
+    GUNICORN_WORKER_CLASS = os.environ.get('GUNICORN_WORKER_CLASS', 'gthread')
+    GUNICORN_THREADS = int(os.environ.get('GUNICORN_THREADS', 16))
+    GUNICORN_WORKER_CONNECTIONS = int(os.environ.get('GUNICORN_WORKER_CONNECTIONS', 1000))
+    GUNICORN_TIMEOUT = int(os.environ.get('GUNICORN_TIMEOUT', 120))
+    GUNICORN_GRACEFUL_TIMEOUT = int(os.environ.get('GUNICORN_GRACEFUL_TIMEOUT', 30))
+    GUNICORN_KEEPALIVE = int(os.environ.get('GUNICORN_KEEPALIVE', 75))
+    # Worker processes serving the app: gunicorn.conf.py sets it for its workers, the development server runs one
+    WORKER_PROCESSES = int(os.environ.get('WORKER_PROCESSES', 1))
     
+    # Application settings
+    RESUME_PATH = os.environ.get('RESUME_PATH') or os.path.join(os.getcwd(), 'assets', 'Raviteja_B_Resume.pdf')
+    # Resume delivery: '' serves from the app, 'x-sendfile' / 'x-accel-redirect' hand off to the proxy
+    RESUME_OFFLOAD = os.environ.get('RESUME_OFFLOAD', '').lower()
+    RESUME_ACCEL_PREFIX = os.environ.get('RESUME_ACCEL_PREFIX', '/protected')
+    RESUME_STAT_TTL = float(os.environ.get('RESUME_STAT_TTL', 60))
+    RESUME_MEMORY_MAX_BYTES = int(os.environ.get('RESUME_MEMORY_MAX_BYTES', 1024 * 1024))
+
+    # Minify, fingerprint and pre-compress static assets (serves plain /static when disabled)
+    ASSET_PIPELINE = os.environ.get('ASSET_PIPELINE', 'True').lower() == 'true'
+
+    # Retrieval: send only the top-k resume chunks relevant to each question
+    RAG_ENABLED = os.environ.get('RAG_ENABLED', 'True').lower() == 'true'
+    RAG_TOP_K = int(os.environ.get('RAG_TOP_K', 4))
+    RAG_MAX_CONTEXT_CHARS = int(os.environ.get('RAG_MAX_CONTEXT_CHARS', 1200))
+    RAG_INDEX_PATH = os.environ.get('RAG_INDEX_PATH') or os.path.join(os.getcwd(), 'assets', 'resume_index')
+
+    # Verify provider connections in the background after startup
+    AI_STARTUP_PROBES = os.environ.get('AI_STARTUP_PROBES', 'True').lower() == 'true'
+    # Minimum seconds between client reinitialization attempts on the request path
+    AI_REINIT_COOLDOWN_SECONDS = float(os.environ.get('AI_REINIT_COOLDOWN_SECONDS', 60))
+
+    # Response cache settings
+    RESPONSE_CACHE_SIZE = int(os.environ.get('RESPONSE_CACHE_SIZE', 256))
+    RESPONSE_CACHE_TTL = int(os.environ.get('RESPONSE_CACHE_TTL', 3600))
+    RESPONSE_CACHE_SIMILARITY = float(os.environ.get('RESPONSE_CACHE_SIMILARITY', 0.8))
+
+    # Precomputed answers loaded at startup, and the batch endpoint that produces them
+    WARM_CACHE_PATH = os.environ.get('WARM_CACHE_PATH') or os.path.join(os.getcwd(), 'assets', 'warm_cache.json')
+    BATCH_CONCURRENCY = int(os.environ.get('BATCH_CONCURRENCY', 4))
+    BATCH_MAX_QUESTIONS = int(os.environ.get('BATCH_MAX_QUESTIONS', 50))
+    # Wall-time cap for one /api/chat/batch request; questions still unanswered then are reported as timed out
+    BATCH_DEADLINE_SECONDS = float(os.environ.get('BATCH_DEADLINE_SECONDS', 60))
+    # /api/chat/batch is disabled unless a token is set (sent as "Authorization: Bearer <token>")
+    BATCH_API_TOKEN = os.environ.get('BATCH_API_TOKEN', '')
+
+    # Server-side chat sessions: bounded per-visitor history for follow-up questions.
+    # The default store is per worker and gunicorn does not route a visitor back to the same worker,
+    # so 'auto' enables sessions only with a shared SESSION_STORE or a single worker process
+    SESSIONS_ENABLED = os.environ.get('SESSIONS_ENABLED', 'auto').lower()
+    SESSION_MAX_SESSIONS = int(os.environ.get('SESSION_MAX_SESSIONS', 5000))
+    SESSION_TTL_SECONDS = float(os.environ.get('SESSION_TTL_SECONDS', 1800))
+    SESSION_MAX_TURNS = int(os.environ.get('SESSION_MAX_TURNS', 6))
+    SESSION_HISTORY_TOKENS = int(os.environ.get('SESSION_HISTORY_TOKENS', 1200))
+    SESSION_SUMMARY_CHARS = int(os.environ.get('SESSION_SUMMARY_CHARS', 600))
+    # Alternative store as 'package.module:ClassName' (a SessionStore subclass); empty keeps sessions in worker memory
+    SESSION_STORE = os.environ.get('SESSION_STORE', '')
+
+    # Admission control: per-client token bucket and per-provider concurrency caps
+    RATE_LIMIT_ENABLED = os.environ.get('RATE_LIMIT_ENABLED', 'True').lower() == 'true'
+    RATE_LIMIT_PER_MINUTE = float(os.environ.get('RATE_LIMIT_PER_MINUTE', 20))
+    RATE_LIMIT_BURST = int(os.environ.get('RATE_LIMIT_BURST', 5))
+    RATE_LIMIT_MAX_CLIENTS = int(os.environ.get('RATE_LIMIT_MAX_CLIENTS', 10000))
+    # Proxies in front of the app that append to X-Forwarded-For (Railway's edge is one)
+    RATE_LIMIT_PROXY_HOPS = int(os.environ.get('RATE_LIMIT_PROXY_HOPS', 1))
+    GEMINI_MAX_CONCURRENCY = int(os.environ.get('GEMINI_MAX_CONCURRENCY', 32))
+    GROQ_MAX_CONCURRENCY = int(os.environ.get('GROQ_MAX_CONCURRENCY', 32))
+
+    # Share one generation between identical concurrent questions
+    COALESCE_REQUESTS = os.environ.get('COALESCE_REQUESTS', 'True').lower() == 'true'
+
+    # Server-sent events framing for /api/chat-stream
+    SSE_FLUSH_INTERVAL = float(os.environ.get('SSE_FLUSH_INTERVAL', 0.05))
+    SSE_FLUSH_BYTES = int(os.environ.get('SSE_FLUSH_BYTES', 512))
+    SSE_HEARTBEAT_SECONDS = float(os.environ.get('SSE_HEARTBEAT_SECONDS', 15))
+    SSE_RETRY_MS = int(os.environ.get('SSE_RETRY_MS', 2000))
+    # Recent streams kept for Last-Event-ID resumption, and how long an abandoned one keeps generating
+    SSE_REPLAY_STREAMS = int(os.environ.get('SSE_REPLAY_STREAMS', 256))
+    SSE_REPLAY_TTL_SECONDS = float(os.environ.get('SSE_REPLAY_TTL_SECONDS', 60))
+    SSE_RESUME_GRACE_SECONDS = float(os.environ.get('SSE_RESUME_GRACE_SECONDS', 5))
+
+    # Time budget for one chat answer across every provider and model attempt (0 disables it)
+    CHAT_DEADLINE_SECONDS = float(os.environ.get('CHAT_DEADLINE_SECONDS', 25))
+    # Each attempt may use this share of the remaining budget, and is skipped when less than the minimum is left
+    DEADLINE_ATTEMPT_SHARE = float(os.environ.get('DEADLINE_ATTEMPT_SHARE', 0.5))
+    DEADLINE_MIN_ATTEMPT_SECONDS = float(os.environ.get('DEADLINE_MIN_ATTEMPT_SECONDS', 2))
+
+    # Complexity-aware routing: short factual questions go to the small fast model with a tight output cap
+    MODEL_ROUTER_ENABLED = os.environ.get('MODEL_ROUTER_ENABLED', 'True').lower() == 'true'
+    ROUTER_SMALL_MODEL = os.environ.get('ROUTER_SMALL_MODEL', 'llama-3.1-8b-instant')
+    ROUTER_LARGE_MODEL = os.environ.get('ROUTER_LARGE_MODEL', 'llama-3.3-70b-versatile')
+    ROUTER_SIMPLE_MAX_WORDS = int(os.environ.get('ROUTER_SIMPLE_MAX_WORDS', 12))
+    ROUTER_SIMPLE_MAX_TOKENS = int(os.environ.get('ROUTER_SIMPLE_MAX_TOKENS', 350))
+    ROUTER_COMPLEX_MAX_TOKENS = int(os.environ.get('ROUTER_COMPLEX_MAX_TOKENS', 1000))
+    # Daily provider token budget for the whole deployment (0 disables), split evenly across WORKER_PROCESSES;
+    # open-ended questions move to the small model past the share
+    TOKEN_BUDGET_DAILY = int(os.environ.get('TOKEN_BUDGET_DAILY', 0))
+    TOKEN_BUDGET_DOWNGRADE_AT = float(os.environ.get('TOKEN_BUDGET_DOWNGRADE_AT', 0.75))
+
+    # Hedged provider dispatch: fire Groq if Gemini has no first token within the delay
+    HEDGED_REQUESTS = os.environ.get('HEDGED_REQUESTS', 'True').lower() == 'true'
+    HEDGE_DELAY_SECONDS = float(os.environ.get('HEDGE_DELAY_SECONDS', 1.5))
+
+    # Async provider pipeline on a shared event loop (opt-in) and HTTP connection pooling
+    ASYNC_PIPELINE = os.environ.get('ASYNC_PIPELINE', 'False').lower() == 'true'
+    ASYNC_MAX_INFLIGHT = int(os.environ.get('ASYNC_MAX_INFLIGHT', 256))
+    HTTP_POOL_MAX_CONNECTIONS = int(os.environ.get('HTTP_POOL_MAX_CONNECTIONS', 100))
+    HTTP_POOL_MAX_KEEPALIVE = int(os.environ.get('HTTP_POOL_MAX_KEEPALIVE', 20))
+    HTTP_POOL_KEEPALIVE_EXPIRY = float(os.environ.get('HTTP_POOL_KEEPALIVE_EXPIRY', 30))
+
+    # Per-model circuit breaker
+    CIRCUIT_FAILURE_THRESHOLD = int(os.environ.get('CIRCUIT_FAILURE_THRESHOLD', 3))
+    CIRCUIT_COOLDOWN_SECONDS = float(os.environ.get('CIRCUIT_COOLDOWN_SECONDS', 30))
+    CIRCUIT_MAX_COOLDOWN_SECONDS = float(os.environ.get('CIRCUIT_MAX_COOLDOWN_SECONDS', 600))
+
 class DevelopmentConfig(Config):
     """Development configuration"""
     DEBUG = True
@@ -177,7 +177,9 @@ class PortfolioChatbot {
     
                 async sendMessage() {
                 const message = this.chatInput.value.trim();
-                if (!message) return;
+                // One question at a time: ignore repeat clicks / Enter while an answer is streaming
+                if (!message || this.isSending) return;
+                this.isSending = true;
                 
                 this.displayMessage({
                     type: 'user',
@@ -188,55 +190,84 @@ class PortfolioChatbot {
                 this.showTypingIndicator();
                 
                 try {
-                    const response = await fetch('/api/chat-stream', {
-                        method: 'POST',
-                        headers: {
-                            'Content-Type': 'application/json',
-                        },
-                        body: JSON.stringify({
-                            message: message
-                        })
-                    });
-                    
-                    this.hideTypingIndicator();
-                    
-                    if (!response.ok) {
-                        throw new Error('Network response was not ok');
-                    }
-                    
-                    // Create streaming message container
-                    const streamingMessageDiv = this.createStreamingMessage();
-                    
-                    // Read the streaming response
-                    const reader = response.body.getReader();
-                    const decoder = new TextDecoder();
+                    let streamingMessageDiv = null;
                     let accumulatedText = '';
+                    let lastEventId = null;
+                    let streamId = null;
+                    let finished = false;
                     
-                    while (true) {
-                        const { done, value } = await reader.read();
-                        
-                        if (done) break;
-                        
-                        const chunk = decoder.decode(value, { stream: true });
-                        const lines = chunk.split('\n');
+                    // A dropped stream reconnects once; the server resumes it from Last-Event-ID
+                    for (let attempt = 0; !finished; attempt++) {
+                        // Partial text is kept only once the reconnect is known to continue the same stream
+                        let continuing = attempt === 0;
+                        let sawDone = false;
+                        const headers = {
+                            'Content-Type': 'application/json',
+                        };
+                        if (lastEventId) {
+                            headers['Last-Event-ID'] = lastEventId;
+                        }
                         
-                        for (const line of lines) {
-                            if (line.startsWith('data: ')) {
-                                const data = line.slice(6);
-                                if (data === '[DONE]') {
-                                    break;
+                        try {
+                            const response = await fetch('/api/chat-stream', {
+                                method: 'POST',
+                                headers: headers,
+                                body: JSON.stringify({
+                                    message: message
+                                })
+                            });
+                            
+                            if (!response.ok) {
+                                throw new Error('Network response was not ok');
+                            }
+                            
+                            if (!streamingMessageDiv) {
+                                this.hideTypingIndicator();
+                                // Create streaming message container
+                                streamingMessageDiv = this.createStreamingMessage();
+                            }
+                            
+                            await this.readEventStream(response, (event) => {
+                                if (event.id) {
+                                    lastEventId = event.id;
+                                }
+                                if (event.data === '[DONE]') {
+                                    sawDone = true;
+                                    return;
                                 }
                                 
                                 try {
-                                    const jsonData = JSON.parse(data);
-                                    if (jsonData.chunk) {
+                                    const jsonData = JSON.parse(event.data);
+                                    if (event.event === 'meta') {
+                                        // A different stream means the server started over
+                                        if (streamId && jsonData.stream_id !== streamId) {
+                                            accumulatedText = '';
+                                        }
+                                        streamId = jsonData.stream_id;
+                                        continuing = true;
+                                    } else if (jsonData.chunk) {
+                                        if (!continuing) {
+                                            // Answered from scratch (no resume), drop the partial text
+                                            accumulatedText = '';
+                                            continuing = true;
+                                        }
                                         accumulatedText += jsonData.chunk;
                                         this.updateStreamingMessage(streamingMessageDiv, accumulatedText);
                                     }
                                 } catch (e) {
                                     // Skip invalid JSON
                                 }
+                            });
+                            if (!sawDone) {
+                                // The connection closed cleanly but the answer never finished
+                                throw new Error('Stream ended before [DONE]');
+                            }
+                            finished = true;
+                        } catch (streamError) {
+                            if (attempt > 0 || !lastEventId) {
+                                throw streamError;
                             }
+                            console.warn('Stream interrupted, resuming:', streamError);
                         }
                     }
                     
@@ -251,9 +282,48 @@ class PortfolioChatbot {
                         type: 'ai',
                         content: 'Sorry, I encountered an error. Please try asking your question again.'
                     });
+                } finally {
+                    this.isSending = false;
                 }
             }
     
+    async readEventStream(response, onEvent) {
+        // Parse text/event-stream frames, keeping a partial frame until the rest arrives
+        const reader = response.body.getReader();
+        const decoder = new TextDecoder();
+        let buffer = '';
+        
+        while (true) {
+            const { done, value } = await reader.read();
+            
+            if (done) break;
+            
+            buffer += decoder.decode(value, { stream: true });
+            let boundary = buffer.indexOf('\n\n');
+            while (boundary !== -1) {
+                const frame = buffer.slice(0, boundary);
+                buffer = buffer.slice(boundary + 2);
+                boundary = buffer.indexOf('\n\n');
+                
+                const event = { id: null, event: 'message', data: [] };
+                for (const line of frame.split('\n')) {
+                    if (line.startsWith('data: ')) {
+                        event.data.push(line.slice(6));
+                    } else if (line.startsWith('id: ')) {
+                        event.id = line.slice(4);
+                    } else if (line.startsWith('event: ')) {
+                        event.event = line.slice(7);
+                    }
+                }
+                // Comment-only frames are keep-alives
+                if (event.data.length) {
+                    event.data = event.data.join('\n');
+                    onEvent(event);
+                }
+            }
+        }
+    }
+    
     displayMessage(message) {
         const messageDiv = document.createElement('div');
         messageDiv.className = 'chat-message ' + message.type + '-message';
@@ -1,8 +1,26 @@
 """
 AI Client Utilities for Gemini and Groq APIs
 """
+import inspect
+import logging
 import os
+import queue
+import threading
+import time
 from flask import current_app
+from app.config.settings import Config
+from app.utils.async_pipeline import CANCEL_POLL_SECONDS, AsyncChatPipeline, create_http_limits
+from app.utils.circuit_breaker import classify_error, create_model_health_registry, retry_after_seconds
+from app.utils.deadline import DeadlineExceeded, attempt_timeout, deadline_passed, give_up_waiting, wait_timeout
+from app.utils.model_router import create_model_router
+from app.utils.resume_context import (
+    RESUME_CONTEXT, RESUME_FORMAT_EXAMPLES, RESUME_GUIDANCE, RESUME_PROFILE, RESUME_RULES
+)
+from app.utils.rate_limit import create_provider_slots, provider_slot
+from app.utils.retrieval import retrieve_profile_context
+from app.utils.telemetry import get_metrics_registry, record_stage, record_token_usage, run_in_context, span
+
+logger = logging.getLogger(__name__)
 
 # Try to import AI libraries
 try:
@@ -10,94 +28,229 @@ try:
     GEMINI_AVAILABLE = True
 except ImportError:
     GEMINI_AVAILABLE = False
-    print("⚠️  Gemini not available - install with: pip install google-generativeai")
+    logger.warning("⚠️  Gemini not available - install with: pip install google-generativeai")
+
+# Newer google-generativeai releases accept the static context as a system instruction
+GEMINI_SYSTEM_INSTRUCTION = (
+    GEMINI_AVAILABLE
+    and 'system_instruction' in inspect.signature(genai.GenerativeModel.__init__).parameters
+)
+
+# ... and per-call request options such as a timeout
+GEMINI_REQUEST_OPTIONS = (
+    GEMINI_AVAILABLE
+    and 'request_options' in inspect.signature(genai.GenerativeModel.generate_content).parameters
+)
 
 try:
+    import httpx
     from groq import Groq
     GROQ_AVAILABLE = True
 except ImportError:
     GROQ_AVAILABLE = False
-    print("⚠️  Groq not available - install with: pip install groq")
+    logger.warning("⚠️  Groq not available - install with: pip install groq")
 
 class AIClientManager:
     """Manages AI client connections and requests"""
     
+    # Updated model list with working models (tested and verified)
+    GEMINI_MODELS = [
+        'models/gemini-2.0-flash-exp',     # ✅ Working! Primary choice - no quota issues
+        'models/gemini-exp-1206',          # Experimental model - backup
+        'models/gemini-2.0-flash-001',     # Stable version - backup
+        'models/gemini-2.0-flash'           # Medium fallback
+    ]
+    
+    GEMINI_GENERATION_CONFIG = {
+        'temperature': 0.7,
+        'max_output_tokens': 1000,
+        'top_p': 0.8,
+        'top_k': 40
+    }
+    
+    # Updated model list with current working models (tested and verified)
+    GROQ_MODELS = [
+        "llama-3.1-8b-instant",      # ✅ Working! Primary choice
+        "llama-3.3-70b-versatile",   # Larger model for open-ended questions
+        "llama-3.1-70b-versatile",   # Backup - more capable
+        "llama-3.2-1b-preview",      # Lightweight fallback
+        "llama-3.2-3b-preview",      # Medium fallback
+        "mixtral-8x7b-32768",        # Alternative architecture
+        "gemma2-9b-it"               # Final fallback
+    ]
+    
     def __init__(self, app=None):
         self.gemini_client = None
         self.groq_client = None
+        self.groq_api_key = None
+        self.rag_enabled = Config.RAG_ENABLED
+        # With retrieval the static part is only the rules; profile excerpts are added per question
+        self.system_instruction = (
+            RESUME_RULES + RESUME_GUIDANCE + RESUME_FORMAT_EXAMPLES if self.rag_enabled else RESUME_CONTEXT
+        )
+        self._gemini_models = {}
+        self._gemini_models_lock = threading.Lock()
+        self.async_pipeline = AsyncChatPipeline(self) if Config.ASYNC_PIPELINE else None
+        self.hedge_enabled = Config.HEDGED_REQUESTS
+        self.hedge_delay = Config.HEDGE_DELAY_SECONDS
+        self.model_health = create_model_health_registry()
+        # Picks provider order, models and output cap per question (None when routing is off)
+        self.router = create_model_router(self.GEMINI_MODELS, self.GROQ_MODELS)
+        # Global cap on concurrent calls per provider, shared by every request in the process
+        self.provider_slots = create_provider_slots()
+        self.readiness = {'gemini': 'unconfigured', 'groq': 'unconfigured'}
+        self.reinit_cooldown = Config.AI_REINIT_COOLDOWN_SECONDS
+        self._reinit_lock = threading.Lock()
+        self._last_reinit = 0.0
         if app:
             self.init_app(app)
     
     def init_app(self, app):
         """Initialize with Flask app context"""
         with app.app_context():
+            self._last_reinit = time.monotonic()
             self._initialize_clients()
+        if app.config.get('AI_STARTUP_PROBES'):
+            self.start_health_probes()
     
-    def _initialize_clients(self):
-        """Initialize AI clients with robust error handling"""
-        try:
-            # Configure Gemini (same approach as working chatbot)
-            if GEMINI_AVAILABLE:
-                gemini_key = None
-                try:
-                    gemini_key = current_app.config.get('GEMINI_API_KEY')
-                except RuntimeError:
-                    pass
-                
-                if not gemini_key:
-                    gemini_key = os.getenv('GEMINI_API_KEY') or os.getenv('GOOGLE_API_KEY')
-                
-                if gemini_key:
-                    try:
-                        genai.configure(api_key=gemini_key)
-                        self.gemini_client = genai
-                        print("✅ Gemini client initialized")
-                        
-                        # Test the connection with working model
-                        if self._test_gemini_connection():
-                            print("✅ Gemini connection verified")
-                        else:
-                            print("⚠️ Gemini connection test failed but client initialized")
-                        
-                    except Exception as e:
-                        print(f"❌ Gemini initialization failed: {e}")
-                        self.gemini_client = None
-                else:
-                    print("⚠️ Gemini API key not found in config or environment")
-            
-            # Configure Groq (same approach as working chatbot)
-            if GROQ_AVAILABLE:
-                groq_key = None
-                try:
-                    groq_key = current_app.config.get('GROQ_API_KEY')
-                except RuntimeError:
-                    pass
-                
-                if not groq_key:
-                    groq_key = os.getenv('GROQ_API_KEY')
-                
-                if groq_key:
-                    try:
-                        self.groq_client = Groq(api_key=groq_key)
-                        print("✅ Groq client initialized")
-                        
-                        # Test the connection with working model
-                        if self._test_groq_connection():
-                            print("✅ Groq connection verified")
-                        else:
-                            print("⚠️ Groq connection test failed but client initialized")
-                        
-                    except Exception as e:
-                        print(f"❌ Groq initialization failed: {e}")
-                        self.groq_client = None
+    def _initialize_clients(self, providers=('gemini', 'groq')):
+        """Initialize AI clients with robust error handling (no network I/O)"""
+        for provider in providers:
+            try:
+                if provider == 'gemini':
+                    self._initialize_gemini()
                 else:
-                    print("⚠️ Groq API key not found in config or environment")
-                    
-        except Exception as e:
-            print(f"❌ Client initialization error: {e}")
-            self.gemini_client = None
-            self.groq_client = None
+                    self._initialize_groq()
+            except Exception as e:
+                logger.error(f"❌ Client initialization error ({provider}): {e}")
+                setattr(self, f"{provider}_client", None)
+
+    def _initialize_gemini(self):
+        """Configure Gemini (same approach as working chatbot)"""
+        if not GEMINI_AVAILABLE:
+            return
+        gemini_key = None
+        try:
+            gemini_key = current_app.config.get('GEMINI_API_KEY')
+        except RuntimeError:
+            pass
+        
+        if not gemini_key:
+            gemini_key = os.getenv('GEMINI_API_KEY') or os.getenv('GOOGLE_API_KEY')
+        
+        if gemini_key:
+            try:
+                options = {}
+                if Config.GEMINI_API_ENDPOINT:
+                    # Only the REST transport can talk to a plain-HTTP endpoint
+                    options = {'transport': 'rest', 'client_options': {'api_endpoint': Config.GEMINI_API_ENDPOINT}}
+                genai.configure(api_key=gemini_key, **options)
+                self.gemini_client = genai
+                self._gemini_models = {}
+                self.readiness['gemini'] = 'initialized'
+                logger.info("✅ Gemini client initialized")
+            except Exception as e:
+                logger.error(f"❌ Gemini initialization failed: {e}")
+                self.gemini_client = None
+                self.readiness['gemini'] = 'failed'
+        else:
+            logger.warning("⚠️ Gemini API key not found in config or environment")
+
+    def _initialize_groq(self):
+        """Configure Groq (same approach as working chatbot)"""
+        if not GROQ_AVAILABLE:
+            return
+        groq_key = None
+        try:
+            groq_key = current_app.config.get('GROQ_API_KEY')
+        except RuntimeError:
+            pass
+        
+        if not groq_key:
+            groq_key = os.getenv('GROQ_API_KEY')
+        
+        if groq_key:
+            try:
+                # Reuse keep-alive connections across requests through one bounded pool
+                self.groq_client = Groq(
+                    api_key=groq_key,
+                    http_client=httpx.Client(limits=create_http_limits())
+                )
+                self.groq_api_key = groq_key
+                self.readiness['groq'] = 'initialized'
+                logger.info("✅ Groq client initialized")
+            except Exception as e:
+                logger.error(f"❌ Groq initialization failed: {e}")
+                self.groq_client = None
+                self.readiness['groq'] = 'failed'
+        else:
+            logger.warning("⚠️ Groq API key not found in config or environment")
     
+    def ensure_clients(self):
+        """Reinitialize missing clients at most once per cooldown; returns True if any client exists
+
+        Each missing client is retried on its own, so a failed Gemini setup
+        is retried even while Groq is up (and the other way round).
+        """
+        missing = [provider for provider in ('gemini', 'groq') if getattr(self, f"{provider}_client") is None]
+        if len(missing) == 1 and self.readiness[missing[0]] == 'unconfigured':
+            # No key for it at startup: nothing to retry while the other provider answers
+            missing = []
+        if not missing or time.monotonic() - self._last_reinit < self.reinit_cooldown:
+            return bool(self.gemini_client or self.groq_client)
+        # Single-flight: whoever holds the lock reinitializes, everyone else goes on with what exists
+        if not self._reinit_lock.acquire(blocking=False):
+            return bool(self.gemini_client or self.groq_client)
+        try:
+            if time.monotonic() - self._last_reinit < self.reinit_cooldown:
+                return bool(self.gemini_client or self.groq_client)
+            self._last_reinit = time.monotonic()
+            logger.warning(f"⚠️ AI clients not initialized ({', '.join(missing)}), reinitializing...")
+            self._initialize_clients(missing)
+            still_missing = [provider for provider in missing if getattr(self, f"{provider}_client") is None]
+            if still_missing:
+                logger.error(
+                    f"❌ AI clients still not available ({', '.join(still_missing)}), "
+                    f"next attempt in {self.reinit_cooldown:.0f}s"
+                )
+            return bool(self.gemini_client or self.groq_client)
+        finally:
+            self._reinit_lock.release()
+
+    def start_health_probes(self):
+        """Verify provider connections concurrently in background threads"""
+        probes = {
+            'gemini': (self.gemini_client, self._test_gemini_connection),
+            'groq': (self.groq_client, self._test_groq_connection)
+        }
+        for provider, (client, probe) in probes.items():
+            if client is None:
+                continue
+            self.readiness[provider] = 'probing'
+            threading.Thread(
+                target=self._run_health_probe,
+                args=(provider, probe),
+                name=f"{provider}-health-probe",
+                daemon=True
+            ).start()
+
+    def _run_health_probe(self, provider, probe):
+        """Run one connection test and record the outcome"""
+        if probe():
+            self.readiness[provider] = 'ready'
+            logger.info(f"✅ {provider.capitalize()} connection verified")
+        else:
+            self.readiness[provider] = 'degraded'
+            logger.warning(f"⚠️ {provider.capitalize()} connection test failed but client initialized")
+
+    def get_readiness(self):
+        """Return provider readiness; the app is always able to answer via fallback"""
+        providers = dict(self.readiness)
+        return {
+            'ready': any(state in ('initialized', 'ready') for state in providers.values()),
+            'providers': providers
+        }
+
     def _test_gemini_connection(self):
         """Test Gemini connection with a simple request"""
         try:
@@ -110,10 +263,10 @@ class AIClientManager:
                 }
             )
             if response and response.text:
-                print("✅ Gemini connection test successful")
+                logger.info("✅ Gemini connection test successful")
                 return True
         except Exception as e:
-            print(f"❌ Gemini connection test failed: {e}")
+            logger.error(f"❌ Gemini connection test failed: {e}")
             return False
     
     def _test_groq_connection(self):
@@ -125,129 +278,552 @@ class AIClientManager:
                 max_tokens=10
             )
             if chat_completion and chat_completion.choices:
-                print("✅ Groq connection test successful")
+                logger.info("✅ Groq connection test successful")
                 return True
         except Exception as e:
-            print(f"❌ Groq connection test failed: {e}")
+            logger.error(f"❌ Groq connection test failed: {e}")
             return False
     
-    def get_gemini_response(self, prompt):
+    def _gemini_model(self, model_name):
+        """Return the shared GenerativeModel for a model name, building it once"""
+        model = self._gemini_models.get(model_name)
+        if model is None:
+            with self._gemini_models_lock:
+                model = self._gemini_models.get(model_name)
+                if model is None:
+                    options = {'generation_config': self.GEMINI_GENERATION_CONFIG}
+                    if GEMINI_SYSTEM_INSTRUCTION:
+                        options['system_instruction'] = self.system_instruction
+                    model = self.gemini_client.GenerativeModel(model_name, **options)
+                    self._gemini_models[model_name] = model
+        return model
+
+    def _gemini_call_options(self, timeout, route=None):
+        """Keyword arguments for generate_content: the route's output cap and the attempt timeout"""
+        options = {}
+        if route is not None:
+            # Merged over the model's generation config by the SDK
+            options['generation_config'] = {'max_output_tokens': route.max_tokens}
+        if timeout is not None and GEMINI_REQUEST_OPTIONS:
+            options['request_options'] = {'timeout': timeout}
+        return options
+
+    def _max_tokens(self, route):
+        """Output token cap for a Groq call"""
+        return route.max_tokens if route is not None else self.GEMINI_GENERATION_CONFIG['max_output_tokens']
+
+    def _models_for(self, provider, route):
+        """Models worth trying now for a provider, in the route's order when there is one"""
+        if route is None:
+            return self.model_health.ordered(provider, self.GEMINI_MODELS if provider == 'gemini' else self.GROQ_MODELS)
+        return self.model_health.ordered(provider, route.models(provider), keep_order=True)
+
+    def _record_usage(self, provider, model, usage, text_chars=0):
+        """Count reported token usage and charge it to the router's daily budget
+
+        Without a usage report (older Gemini SDKs) the budget is charged an
+        estimate of four characters per token over text_chars (prompt plus answer).
+        """
+        tokens = record_token_usage(provider, model, usage)
+        if self.router is not None and self.router.budget is not None:
+            self.router.budget.charge(tokens or text_chars // 4)
+
+    def route_for(self, messages):
+        """ModelRoute for a question's Groq messages, or None when routing is off"""
+        if self.router is None:
+            return None
+        route = self.router.route(messages)
+        logger.info(f"🧭 Routed as {route.tier}: {route.providers[0]} first, max {route.max_tokens} tokens")
+        return route
+
+    def _groq_for_attempt(self, client, timeout):
+        """The (sync or async) Groq client for one model attempt, bounded by timeout when there is one"""
+        if timeout is None:
+            return client
+        # The model list is the retry loop; SDK retries and their retry-after sleeps would overrun the deadline
+        return client.with_options(timeout=timeout, max_retries=0)
+
+    def _profile_context(self, user_message):
+        """Per-question profile excerpts when retrieval is enabled, else nothing"""
+        if not self.rag_enabled:
+            return ''
+        try:
+            return retrieve_profile_context(user_message)
+        except Exception as e:
+            logger.error(f"❌ Retrieval failed, sending full context: {e}")
+            return RESUME_PROFILE
+
+    def build_prompts(self, user_message, history=None):
+        """Return (gemini_prompt, groq_messages) for a user question
+
+        history is an optional (summary, [(question, answer), ...]) from the
+        visitor's chat session.
+        """
+        summary, turns = history or ('', [])
+        # Follow-ups ("tell me more about the second one") retrieve against the previous question too
+        query = f"{turns[-1][0]} {user_message}" if turns else user_message
+        profile = self._profile_context(query)
+
+        conversation = ''
+        if summary:
+            conversation += f"Earlier in this conversation:\n{summary}\n\n"
+        if turns:
+            conversation += "Conversation so far:\n" + ''.join(
+                f"User: {question}\nAssistant: {answer}\n" for question, answer in turns
+            ) + "\n"
+
+        if GEMINI_SYSTEM_INSTRUCTION:
+            # The static rules already live on the model, send only excerpts and the question
+            prompt = f"{profile}{conversation}User Question: {user_message}\n\nPlease provide a helpful, professional response:"
+        else:
+            prompt = f"{self.system_instruction}{profile}\n\n{conversation}User Question: {user_message}\n\nPlease provide a helpful, professional response:"
+
+        system = self.system_instruction + profile
+        if summary:
+            system += f"\n\nEarlier in this conversation:\n{summary}"
+        messages = [{"role": "system", "content": system}]
+        for question, answer in turns:
+            messages.append({"role": "user", "content": question})
+            messages.append({"role": "assistant", "content": answer})
+        messages.append({"role": "user", "content": user_message})
+        return prompt, messages
+
+    def acquire_provider_slot(self, provider):
+        """Take a concurrency slot for a provider without waiting; False means skip the provider"""
+        if self.provider_slots.try_acquire(provider):
+            return True
+        logger.warning(f"🚦 {provider.capitalize()} concurrency limit reached, skipping provider")
+        get_metrics_registry().inc('provider_rejections', provider=provider)
+        return False
+
+    @provider_slot('gemini')
+    def get_gemini_response(self, prompt, route=None):
         """Get response from Gemini API with automatic retry"""
         if not self.gemini_client:
-            print("⚠️ Gemini client not available, attempting to reinitialize...")
-            self._initialize_clients()
+            self.ensure_clients()
             if not self.gemini_client:
-                print("❌ Gemini client still not available after reinitialize")
                 return None
         
-        # Updated model list with working models (tested and verified)
-        gemini_models = [
-            'models/gemini-2.0-flash-exp',     # ✅ Working! Primary choice - no quota issues
-            'models/gemini-exp-1206',          # Experimental model - backup
-            'models/gemini-2.0-flash-001',     # Stable version - backup
-            'models/gemini-2.0-flash'           # Medium fallback
-        ]
-        
-        for model_name in gemini_models:
+        for model_name in self._models_for("gemini", route):
             try:
-                model = self.gemini_client.GenerativeModel(model_name)
-                ai_response = model.generate_content(
-                    prompt,
-                    generation_config={
-                        'temperature': 0.7,
-                        'max_output_tokens': 1000,
-                        'top_p': 0.8,
-                        'top_k': 40
-                    }
-                )
-                
-                # Better response validation (same as working chatbot)
-                if ai_response and hasattr(ai_response, 'text') and ai_response.text:
-                    print(f"✅ Gemini response successful with model: {model_name}")
-                    return ai_response.text.strip()
-                elif ai_response and hasattr(ai_response, 'candidates') and ai_response.candidates:
-                    # Handle cases where text is in candidates
-                    try:
-                        text = ai_response.candidates[0].content.parts[0].text
-                        if text:
-                            print(f"✅ Gemini response successful with model: {model_name}")
-                            return text.strip()
-                    except (IndexError, AttributeError):
-                        pass
-                else:
-                    print(f"⚠️ Empty response from Gemini model: {model_name}")
-                    continue  # Try next model
-            except Exception as e:
-                error_msg = str(e).lower()
-                if "429" in str(e) or "quota" in error_msg or "rate_limit" in error_msg:
-                    print(f"⚠️ Gemini quota/rate limit exceeded with {model_name}, trying next model...")
-                elif "404" in str(e) or "not found" in error_msg:
-                    print(f"⚠️ Model {model_name} not found, trying next model...")
-                elif "invalid api key" in error_msg or "authentication" in error_msg:
-                    print(f"❌ Gemini API key invalid or expired")
-                    break  # No point trying other models with bad key
-                else:
-                    print(f"❌ Gemini API Error with {model_name}: {e}")
-                continue
+                timeout = attempt_timeout('gemini', model_name)
+            except DeadlineExceeded:
+                return None
+            if not self.model_health.allow(model_name):
+                continue  # Opened, or taken by another probe, since the list was built
+            with span('model_attempt', provider='gemini', model=model_name) as attempt:
+                try:
+                    model = self._gemini_model(model_name)
+                    ai_response = model.generate_content(prompt, **self._gemini_call_options(timeout, route))
+                    
+                    # Better response validation (same as working chatbot)
+                    if ai_response and hasattr(ai_response, 'text') and ai_response.text:
+                        logger.info(f"✅ Gemini response successful with model: {model_name}")
+                        self.model_health.record_success("gemini", model_name)
+                        self._record_usage("gemini", model_name, getattr(ai_response, 'usage_metadata', None),
+                                           len(prompt) + len(ai_response.text))
+                        attempt['outcome'] = 'success'
+                        return ai_response.text.strip()
+                    elif ai_response and hasattr(ai_response, 'candidates') and ai_response.candidates:
+                        # Handle cases where text is in candidates
+                        try:
+                            text = ai_response.candidates[0].content.parts[0].text
+                            if text:
+                                logger.info(f"✅ Gemini response successful with model: {model_name}")
+                                self.model_health.record_success("gemini", model_name)
+                                self._record_usage("gemini", model_name, getattr(ai_response, 'usage_metadata', None),
+                                                   len(prompt) + len(text))
+                                attempt['outcome'] = 'success'
+                                return text.strip()
+                        except (IndexError, AttributeError):
+                            pass
+                        logger.warning(f"⚠️ Empty response from Gemini model: {model_name}")
+                        self.model_health.record_failure("gemini", model_name, 'error')
+                        attempt['outcome'] = 'empty'
+                    else:
+                        logger.warning(f"⚠️ Empty response from Gemini model: {model_name}")
+                        self.model_health.record_failure("gemini", model_name, 'error')
+                        attempt['outcome'] = 'empty'
+                        continue  # Try next model
+                except Exception as e:
+                    if self._handle_model_error("gemini", model_name, e, attempt):
+                        break  # No point trying other models with bad key
+                    continue
         
-        print("❌ All Gemini models failed")
+        logger.error("❌ All Gemini models failed")
         return None
     
-    def get_groq_response(self, messages):
+    @provider_slot('groq')
+    def get_groq_response(self, messages, route=None):
         """Get response from Groq API with automatic retry"""
         if not self.groq_client:
-            print("⚠️ Groq client not available, attempting to reinitialize...")
-            self._initialize_clients()
+            self.ensure_clients()
             if not self.groq_client:
-                print("❌ Groq client still not available after reinitialize")
                 return None
         
         # Validate messages format
         if not isinstance(messages, list):
-            print("❌ Messages must be a list")
+            logger.error("❌ Messages must be a list")
             return None
         
-        # Updated model list with current working models (tested and verified)
-        groq_models = [
-            "llama-3.1-8b-instant",      # ✅ Working! Primary choice
-            "llama-3.1-70b-versatile",   # Backup - more capable
-            "llama-3.2-1b-preview",      # Lightweight fallback
-            "llama-3.2-3b-preview",      # Medium fallback
-            "mixtral-8x7b-32768",        # Alternative architecture
-            "gemma2-9b-it"               # Final fallback
-        ]
-        
-        for model_name in groq_models:
+        for model_name in self._models_for("groq", route):
             try:
-                chat_completion = self.groq_client.chat.completions.create(
-                    messages=messages,
-                    model=model_name,
-                    temperature=0.7,
-                    max_tokens=1000,
-                    top_p=0.9
-                )
-                if chat_completion and chat_completion.choices and len(chat_completion.choices) > 0:
-                    content = chat_completion.choices[0].message.content
-                    if content:
-                        print(f"✅ Groq response successful with model: {model_name}")
-                        return content.strip()
-                    else:
-                        print(f"⚠️ Empty response from Groq model: {model_name}")
-                        continue  # Try next model
-            except Exception as e:
-                error_msg = str(e).lower()
-                if "rate_limit" in error_msg or "429" in str(e):
-                    print(f"⚠️ Groq rate limit with {model_name}, trying next model...")
-                elif "invalid api key" in error_msg or "authentication" in error_msg:
-                    print(f"❌ Groq API key invalid or expired")
-                    break  # No point trying other models with bad key
-                else:
-                    print(f"❌ Groq API Error with {model_name}: {e}")
-                continue
+                timeout = attempt_timeout('groq', model_name)
+            except DeadlineExceeded:
+                return None
+            if not self.model_health.allow(model_name):
+                continue  # Opened, or taken by another probe, since the list was built
+            with span('model_attempt', provider='groq', model=model_name) as attempt:
+                try:
+                    chat_completion = self._groq_for_attempt(self.groq_client, timeout).chat.completions.create(
+                        messages=messages,
+                        model=model_name,
+                        temperature=0.7,
+                        max_tokens=self._max_tokens(route),
+                        top_p=0.9
+                    )
+                    attempt['outcome'] = 'empty'
+                    if chat_completion and chat_completion.choices and len(chat_completion.choices) > 0:
+                        content = chat_completion.choices[0].message.content
+                        if content:
+                            logger.info(f"✅ Groq response successful with model: {model_name}")
+                            self.model_health.record_success("groq", model_name)
+                            self._record_usage("groq", model_name, getattr(chat_completion, 'usage', None))
+                            attempt['outcome'] = 'success'
+                            return content.strip()
+                        else:
+                            logger.warning(f"⚠️ Empty response from Groq model: {model_name}")
+                            self.model_health.record_failure("groq", model_name, 'error')
+                            continue  # Try next model
+                except Exception as e:
+                    if self._handle_model_error("groq", model_name, e, attempt):
+                        break  # No point trying other models with bad key
+                    continue
         
-        print("❌ All Groq models failed")
+        logger.error("❌ All Groq models failed")
         return None
-    
+
+    @provider_slot('gemini')
+    def stream_gemini_response(self, prompt, cancel_event=None, route=None):
+        """Stream response deltas from Gemini API as they are generated"""
+        if not self.gemini_client:
+            self.ensure_clients()
+            if not self.gemini_client:
+                return
+
+        for model_name in self._models_for("gemini", route):
+            if cancel_event is not None and cancel_event.is_set():
+                return
+            try:
+                timeout = attempt_timeout('gemini', model_name)
+            except DeadlineExceeded:
+                return
+            if not self.model_health.allow(model_name):
+                continue  # Opened, or taken by another probe, since the list was built
+            started = False
+            produced = 0
+            with span('model_attempt', provider='gemini', model=model_name, stream=True) as attempt:
+                try:
+                    attempt_started = time.monotonic()
+                    model = self._gemini_model(model_name)
+                    ai_response = model.generate_content(prompt, stream=True, **self._gemini_call_options(timeout, route))
+                    for chunk in ai_response:
+                        if cancel_event is not None and cancel_event.is_set():
+                            logger.info(f"🛑 Gemini stream cancelled with model: {model_name}")
+                            self.model_health.release_probe(model_name)
+                            attempt['outcome'] = 'cancelled'
+                            return
+                        try:
+                            text = chunk.text
+                        except (ValueError, IndexError, AttributeError):
+                            # Chunk without text parts (e.g. safety metadata only)
+                            continue
+                        if text:
+                            if not started:
+                                started = True
+                                self.model_health.record_success("gemini", model_name)
+                                record_stage('model_first_token', time.monotonic() - attempt_started,
+                                             provider='gemini', model=model_name)
+                            produced += len(text)
+                            yield text
+
+                    if started:
+                        logger.info(f"✅ Gemini stream successful with model: {model_name}")
+                        self._record_usage("gemini", model_name, getattr(ai_response, 'usage_metadata', None),
+                                           len(prompt) + produced)
+                        attempt['outcome'] = 'success'
+                        return
+                    logger.warning(f"⚠️ Empty stream from Gemini model: {model_name}")
+                    self.model_health.record_failure("gemini", model_name, 'error')
+                    attempt['outcome'] = 'empty'
+                except Exception as e:
+                    if started:
+                        # Part of the answer already reached the client, switching models would garble it
+                        logger.error(f"❌ Gemini stream interrupted with {model_name}: {e}")
+                        attempt['outcome'] = 'interrupted'
+                        return
+                    if self._handle_model_error("gemini", model_name, e, attempt):
+                        break  # No point trying other models with bad key
+                    continue
+
+        logger.error("❌ All Gemini models failed to stream")
+
+    @provider_slot('groq')
+    def stream_groq_response(self, messages, cancel_event=None, route=None):
+        """Stream response deltas from Groq API as they are generated"""
+        if not self.groq_client:
+            self.ensure_clients()
+            if not self.groq_client:
+                return
+
+        # Validate messages format
+        if not isinstance(messages, list):
+            logger.error("❌ Messages must be a list")
+            return
+
+        for model_name in self._models_for("groq", route):
+            if cancel_event is not None and cancel_event.is_set():
+                return
+            try:
+                timeout = attempt_timeout('groq', model_name)
+            except DeadlineExceeded:
+                return
+            if not self.model_health.allow(model_name):
+                continue  # Opened, or taken by another probe, since the list was built
+            started = False
+            with span('model_attempt', provider='groq', model=model_name, stream=True) as attempt:
+                try:
+                    attempt_started = time.monotonic()
+                    stream = self._groq_for_attempt(self.groq_client, timeout).chat.completions.create(
+                        messages=messages,
+                        model=model_name,
+                        temperature=0.7,
+                        max_tokens=self._max_tokens(route),
+                        top_p=0.9,
+                        stream=True
+                    )
+                    usage = None
+                    try:
+                        for chunk in stream:
+                            if cancel_event is not None and cancel_event.is_set():
+                                logger.info(f"🛑 Groq stream cancelled with model: {model_name}")
+                                self.model_health.release_probe(model_name)
+                                attempt['outcome'] = 'cancelled'
+                                return
+                            # Groq reports token usage on the final chunk
+                            usage = getattr(getattr(chunk, 'x_groq', None), 'usage', None) or usage
+                            if not chunk.choices:
+                                continue
+                            text = chunk.choices[0].delta.content
+                            if text:
+                                if not started:
+                                    started = True
+                                    self.model_health.record_success("groq", model_name)
+                                    record_stage('model_first_token', time.monotonic() - attempt_started,
+                                                 provider='groq', model=model_name)
+                                yield text
+                    finally:
+                        # Drop the HTTP connection instead of draining it when the consumer stops early
+                        stream.close()
+
+                    if started:
+                        logger.info(f"✅ Groq stream successful with model: {model_name}")
+                        self._record_usage("groq", model_name, usage)
+                        attempt['outcome'] = 'success'
+                        return
+                    logger.warning(f"⚠️ Empty stream from Groq model: {model_name}")
+                    self.model_health.record_failure("groq", model_name, 'error')
+                    attempt['outcome'] = 'empty'
+                except Exception as e:
+                    if started:
+                        logger.error(f"❌ Groq stream interrupted with {model_name}: {e}")
+                        attempt['outcome'] = 'interrupted'
+                        return
+                    if self._handle_model_error("groq", model_name, e, attempt):
+                        break  # No point trying other models with bad key
+                    continue
+
+        logger.error("❌ All Groq models failed to stream")
+
+    def _handle_model_error(self, provider, model_name, error, attempt=None):
+        """Log a model failure and update its circuit; returns True when the API key is bad"""
+        kind = classify_error(error)
+        if attempt is not None:
+            attempt['outcome'] = kind
+        label = provider.capitalize()
+        if kind == 'rate_limit':
+            logger.warning(f"⚠️ {label} quota/rate limit exceeded with {model_name}, trying next model...")
+        elif kind == 'not_found':
+            logger.warning(f"⚠️ Model {model_name} not found, trying next model...")
+        elif kind == 'auth':
+            logger.error(f"❌ {label} API key invalid or expired")
+        else:
+            logger.error(f"❌ {label} API Error with {model_name}: {error}")
+        self.model_health.record_failure(provider, model_name, kind, retry_after_seconds(error))
+        return kind == 'auth'
+
+    def _provider_order(self, route):
+        """Providers in the order to try them: the route's, else Gemini then Groq"""
+        return route.providers if route is not None else ('gemini', 'groq')
+
+    def get_chat_response(self, prompt, messages):
+        """Return (response, api_used) using the configured dispatch mode, or (None, None)"""
+        route = self.route_for(messages)
+        if self.async_pipeline is not None:
+            return self.async_pipeline.get_response(prompt, messages, route)
+        if self.hedge_enabled:
+            return self.get_hedged_response(prompt, messages, route)
+
+        for provider in self._provider_order(route):
+            logger.info(f"🤖 Trying {provider.capitalize()} API...")
+            if provider == 'gemini':
+                response = self.get_gemini_response(prompt, route)
+            else:
+                response = self.get_groq_response(messages, route)
+            if response:
+                return response, provider
+        return None, None
+
+    def stream_chat(self, prompt, messages, cancel_event=None):
+        """Yield (api_used, delta) pairs from the first provider that answers
+
+        Setting cancel_event stops the generation at the next delta and
+        skips any remaining fallback models.
+        """
+        route = self.route_for(messages)
+        if self.async_pipeline is not None:
+            yield from self.async_pipeline.stream_chat(prompt, messages, cancel_event, route)
+            return
+        if self.hedge_enabled:
+            yield from self.stream_hedged_response(prompt, messages, cancel_event=cancel_event, route=route)
+            return
+
+        for provider in self._provider_order(route):
+            if cancel_event is not None and cancel_event.is_set():
+                return
+            logger.info(f"🤖 Trying {provider.capitalize()} API...")
+            if provider == 'gemini':
+                deltas = self.stream_gemini_response(prompt, cancel_event, route)
+            else:
+                deltas = self.stream_groq_response(messages, cancel_event, route)
+            streamed = False
+            for delta in deltas:
+                streamed = True
+                yield provider, delta
+            if streamed:
+                return
+
+    def stream_hedged_response(self, prompt, messages, hedge_delay=None, cancel_event=None, route=None):
+        """Race the route's primary provider against the other, yielding (api_used, delta) from the first to answer
+
+        Waiting on the race is bounded by the request deadline: once it runs
+        out, both providers are cancelled and DeadlineExceeded is raised,
+        even when a provider call without a timeout is still hanging.
+
+        A cancelled provider thread only notices between chunks. Until its
+        first chunk arrives it keeps its thread and provider slot, for at
+        most its attempt timeout (Groq) or however long the call hangs
+        (Gemini SDKs without request_options). ASYNC_PIPELINE aborts the
+        request at once instead.
+        """
+        if hedge_delay is None:
+            hedge_delay = self.hedge_delay
+        primary, secondary = self._provider_order(route)
+
+        events = queue.Queue()
+        cancel_events = {'gemini': threading.Event(), 'groq': threading.Event()}
+        sources = {
+            'gemini': lambda: self.stream_gemini_response(prompt, cancel_events['gemini'], route),
+            'groq': lambda: self.stream_groq_response(messages, cancel_events['groq'], route)
+        }
+        launched = []
+        finished = set()
+        winner = None
+        started_at = time.monotonic()
+
+        def run(provider):
+            try:
+                for delta in sources[provider]():
+                    events.put((provider, delta))
+            except Exception as e:
+                logger.error(f"❌ Hedged {provider} request failed: {e}")
+            finally:
+                events.put((provider, None))
+
+        def launch(provider):
+            launched.append(provider)
+            if getattr(self, f"{provider}_client") is None:
+                # Nothing to race without a client, report it as finished straight away
+                events.put((provider, None))
+                return
+            logger.info(f"🤖 Trying {provider.capitalize()} API (hedged)...")
+            # Carry the request trace into the worker thread so its spans are attributed
+            threading.Thread(target=run_in_context(run), args=(provider,), daemon=True).start()
+
+        launch(primary)
+        try:
+            while True:
+                if cancel_event is not None and cancel_event.is_set():
+                    return
+                timeout = None
+                if winner is None and secondary not in launched:
+                    timeout = max(0.0, started_at + hedge_delay - time.monotonic())
+                if cancel_event is not None:
+                    # Wake up regularly so a cancelled request stops waiting on a silent provider
+                    timeout = CANCEL_POLL_SECONDS if timeout is None else min(timeout, CANCEL_POLL_SECONDS)
+                if deadline_passed():
+                    give_up_waiting('hedged race')
+                    raise DeadlineExceeded("no provider finished within the request deadline")
+                try:
+                    provider, delta = events.get(timeout=wait_timeout(timeout))
+                except queue.Empty:
+                    if winner is None and secondary not in launched and time.monotonic() - started_at >= hedge_delay:
+                        logger.info(f"⏱️ {primary.capitalize()} gave no token within {hedge_delay}s, hedging with {secondary.capitalize()}")
+                        launch(secondary)
+                    continue
+
+                if delta is None:
+                    finished.add(provider)
+                    if provider == winner:
+                        return
+                    if winner is None and secondary not in launched:
+                        launch(secondary)
+                    elif winner is None and finished.issuperset(launched):
+                        return
+                    continue
+
+                if winner is None:
+                    winner = provider
+                    self._record_win(provider, time.monotonic() - started_at)
+                    for other, event in cancel_events.items():
+                        if other != provider:
+                            event.set()
+                if provider == winner:
+                    yield provider, delta
+        finally:
+            # Stop every provider still running, including the winner when the consumer goes away
+            for event in cancel_events.values():
+                event.set()
+
+    def get_hedged_response(self, prompt, messages, route=None):
+        """Return (response, api_used) from the hedged race, or (None, None) if both providers fail"""
+        deltas = []
+        api_used = None
+        try:
+            for api_used, delta in self.stream_hedged_response(prompt, messages, route=route):
+                deltas.append(delta)
+        except DeadlineExceeded:
+            # A cut-off answer is worse than the fallback
+            return None, None
+        if not deltas:
+            return None, None
+        return ''.join(deltas).strip(), api_used
+
+    def _record_win(self, provider, first_token_latency):
+        """Count which provider won a hedged race and how fast its first token arrived (exported by /metrics)"""
+        get_metrics_registry().inc('hedge_wins', provider=provider)
+        record_stage('hedge_first_token', first_token_latency, provider=provider)
+
     def test_gemini_models(self):
         """Test and list available Gemini models"""
         if not GEMINI_AVAILABLE or not current_app.config.get('GEMINI_API_KEY'):
@@ -260,7 +836,7 @@ class AIClientManager:
                     available_models.append(model.name)
             return available_models
         except Exception as e:
-            print(f"❌ Error listing Gemini models: {e}")
+            logger.error(f"❌ Error listing Gemini models: {e}")
             return []
 
     def debug_status(self):
@@ -297,12 +873,15 @@ class AIClientManager:
 
 # Global AI client manager instance
 ai_manager = None
+_ai_manager_lock = threading.Lock()
 
 def get_ai_manager(app=None):
-    """Get or create AI manager instance"""
+    """Get or create AI manager instance (thread-safe)"""
     global ai_manager
     if ai_manager is None:
-        ai_manager = AIClientManager(app)
+        with _ai_manager_lock:
+            if ai_manager is None:
+                ai_manager = AIClientManager(app)
     return ai_manager
 
 # Helper function to initialize with app
@@ -0,0 +1,274 @@
+"""
+Static asset pipeline: minify, fingerprint and pre-compress CSS/JS
+
+Build once at deploy time (it also runs at startup when the output is missing or stale):
+
+    python -m app.utils.assets
+
+Each source under app/static is written to app/static/dist as
+<name>.<hash>.<ext> plus .gz and .br variants, and a manifest maps the
+logical path used in templates to the fingerprinted one. Fingerprinted
+URLs never change content, so they are served with a one-year immutable
+Cache-Control.
+"""
+import gzip
+import hashlib
+import json
+import logging
+import os
+import re
+import threading
+
+from app.config.settings import Config
+
+logger = logging.getLogger(__name__)
+
+try:
+    import brotli
+    BROTLI_AVAILABLE = True
+except ImportError:
+    BROTLI_AVAILABLE = False
+    logger.warning("⚠️  brotli not available - static assets will be served gzip only (pip install brotli)")
+
+# Logical paths (relative to the static folder) that go through the pipeline
+ASSET_SOURCES = ('css/portfolio.css', 'js/portfolio.js')
+
+MANIFEST_NAME = 'manifest.json'
+MANIFEST_VERSION = 1
+
+MIMETYPES = {
+    '.css': 'text/css; charset=utf-8',
+    '.js': 'application/javascript; charset=utf-8'
+}
+
+# Content-Encoding -> file suffix, in order of preference
+ENCODINGS = (('br', '.br'), ('gzip', '.gz'))
+
+_CSS_STRING_RE = re.compile(r'''("(?:\\.|[^"\\])*"|'(?:\\.|[^'\\])*')''')
+_CSS_COMMENT_RE = re.compile(r'/\*.*?\*/', re.DOTALL)
+_CSS_SPACE_RE = re.compile(r'\s+')
+_CSS_PUNCT_RE = re.compile(r'\s*([{};,>])\s*')
+_CSS_COLON_RE = re.compile(r':\s+')
+_JS_TRAILING_COMMENT_RE = re.compile(r'([;{}(),])\s*//[^\'"`]*$')
+
+
+def minify_css(source):
+    """Strip comments and redundant whitespace, leaving quoted strings untouched"""
+    source = _CSS_COMMENT_RE.sub('', source)
+    parts = _CSS_STRING_RE.split(source)
+    for index in range(0, len(parts), 2):
+        text = _CSS_SPACE_RE.sub(' ', parts[index])
+        text = _CSS_PUNCT_RE.sub(r'\1', text)
+        parts[index] = _CSS_COLON_RE.sub(':', text)
+    return ''.join(parts).replace(';}', '}').strip()
+
+
+def minify_js(source):
+    """Conservative line-based JS minifier
+
+    Drops comment-only lines, indentation and blank lines but keeps line
+    breaks so automatic semicolon insertion behaves exactly as before.
+    Lines inside template literals are copied verbatim.
+    """
+    lines = []
+    in_template = False
+    in_comment = False
+    for line in source.splitlines():
+        if in_template:
+            lines.append(line)
+            in_template = line.count('`') % 2 == 0
+            continue
+        stripped = line.strip()
+        if in_comment:
+            in_comment = '*/' not in stripped
+            continue
+        if not stripped or stripped.startswith('//'):
+            continue
+        if stripped.startswith('/*'):
+            in_comment = '*/' not in stripped
+            continue
+        stripped = _JS_TRAILING_COMMENT_RE.sub(r'\1', stripped)
+        lines.append(stripped)
+        in_template = stripped.count('`') % 2 == 1
+    return '\n'.join(lines) + '\n'
+
+
+MINIFIERS = {'.css': minify_css, '.js': minify_js}
+
+
+def compress_variants(body):
+    """Return {content_encoding or None: bytes} for every encoding we can produce"""
+    variants = {None: body, 'gzip': gzip.compress(body, compresslevel=9, mtime=0)}
+    if BROTLI_AVAILABLE:
+        variants['br'] = brotli.compress(body, quality=11)
+    return variants
+
+
+def choose_encoding(variants, accept_encoding):
+    """Pick the preferred encoding present in variants and accepted by the client"""
+    accepted = {token.split(';')[0].strip().lower() for token in (accept_encoding or '').split(',')}
+    for encoding, _ in ENCODINGS:
+        if encoding in variants and encoding in accepted:
+            return encoding
+    return None
+
+
+def _write_atomic(path, data):
+    """Write via a temp file so concurrently starting workers never see a partial file"""
+    temp_path = f"{path}.{os.getpid()}.tmp"
+    with open(temp_path, 'wb') as handle:
+        handle.write(data)
+    os.replace(temp_path, path)
+
+
+def _source_digest(static_folder):
+    """Hash of all pipeline inputs, used to detect a stale build"""
+    digest = hashlib.sha256()
+    digest.update(str(BROTLI_AVAILABLE).encode('utf-8'))
+    for logical in ASSET_SOURCES:
+        with open(os.path.join(static_folder, logical), 'rb') as handle:
+            digest.update(handle.read())
+    return digest.hexdigest()[:16]
+
+
+def build_assets(static_folder, dist_dir=None):
+    """Minify, fingerprint and pre-compress every asset; returns the manifest"""
+    dist_dir = dist_dir or os.path.join(static_folder, 'dist')
+    manifest = {
+        'version': MANIFEST_VERSION,
+        'source_digest': _source_digest(static_folder),
+        'assets': {}
+    }
+    for logical in ASSET_SOURCES:
+        root, ext = os.path.splitext(logical)
+        with open(os.path.join(static_folder, logical), encoding='utf-8') as handle:
+            source = handle.read()
+        body = MINIFIERS[ext](source).encode('utf-8')
+        content_hash = hashlib.sha256(body).hexdigest()[:12]
+        hashed = f"{root}.{content_hash}{ext}"
+
+        target = os.path.join(dist_dir, hashed)
+        os.makedirs(os.path.dirname(target), exist_ok=True)
+        variants = compress_variants(body)
+        encodings = []
+        for encoding, suffix in [(None, '')] + list(ENCODINGS):
+            if encoding in variants:
+                _write_atomic(f"{target}{suffix}", variants[encoding])
+                if encoding:
+                    encodings.append(encoding)
+
+        manifest['assets'][logical] = {
+            'path': hashed,
+            'hash': content_hash,
+            'encodings': encodings,
+            'original_size': len(source.encode('utf-8')),
+            'size': len(body)
+        }
+    _write_atomic(os.path.join(dist_dir, MANIFEST_NAME), json.dumps(manifest, indent=2).encode('utf-8'))
+    return manifest
+
+
+class AssetRegistry:
+    """Fingerprinted asset lookup plus in-memory copies of every encoded variant"""
+
+    def __init__(self, static_folder, dist_dir=None):
+        self.static_folder = static_folder
+        self.dist_dir = dist_dir or os.path.join(static_folder, 'dist')
+        self.logical_to_hashed = {}
+        self.files = {}  # hashed path -> {encoding or None: bytes}
+        self.hashes = {}  # hashed path -> content hash
+
+    def load(self):
+        """Load the manifest, rebuilding the assets when they are missing or stale"""
+        manifest = self._read_manifest()
+        if manifest is None or manifest.get('source_digest') != _source_digest(self.static_folder):
+            logger.warning("⚠️ Static asset build missing or stale, building")
+            manifest = build_assets(self.static_folder, self.dist_dir)
+
+        for logical, entry in manifest['assets'].items():
+            hashed = entry['path']
+            target = os.path.join(self.dist_dir, hashed)
+            variants = {}
+            with open(target, 'rb') as handle:
+                variants[None] = handle.read()
+            for encoding, suffix in ENCODINGS:
+                if encoding in entry['encodings']:
+                    with open(f"{target}{suffix}", 'rb') as handle:
+                        variants[encoding] = handle.read()
+            self.logical_to_hashed[logical] = hashed
+            self.files[hashed] = variants
+            self.hashes[hashed] = entry['hash']
+        logger.info(f"✅ Static assets ready: {', '.join(self.logical_to_hashed.values())}")
+        return self
+
+    def _read_manifest(self):
+        try:
+            with open(os.path.join(self.dist_dir, MANIFEST_NAME), encoding='utf-8') as handle:
+                manifest = json.load(handle)
+        except (OSError, ValueError):
+            return None
+        if manifest.get('version') != MANIFEST_VERSION:
+            return None
+        return manifest
+
+    def hashed_path(self, logical):
+        """Fingerprinted path for a logical asset, or None when it is not in the pipeline"""
+        return self.logical_to_hashed.get(logical)
+
+    def variant(self, hashed, accept_encoding):
+        """Return (body, content_encoding, etag) for the best encoding the client accepts"""
+        variants = self.files.get(hashed)
+        if variants is None:
+            return None
+        encoding = choose_encoding(variants, accept_encoding)
+        etag = f"{self.hashes[hashed]}-{encoding}" if encoding else self.hashes[hashed]
+        return variants[encoding], encoding, etag
+
+    @staticmethod
+    def mimetype(hashed):
+        return MIMETYPES.get(os.path.splitext(hashed)[1], 'application/octet-stream')
+
+
+# Global asset registry instance
+asset_registry = None
+_asset_lock = threading.Lock()
+
+def init_assets(app):
+    """Load the asset build and expose asset_url() to templates"""
+    global asset_registry
+    from flask import url_for
+
+    if Config.ASSET_PIPELINE:
+        with _asset_lock:
+            try:
+                asset_registry = AssetRegistry(app.static_folder).load()
+            except Exception as e:
+                asset_registry = None
+                logger.error(f"❌ Static asset pipeline failed, serving unprocessed files: {e}")
+
+    def asset_url(filename):
+        """URL for a static file: fingerprinted when built, plain /static otherwise"""
+        hashed = asset_registry.hashed_path(filename) if asset_registry else None
+        if hashed:
+            return url_for('main.static_asset', filename=hashed)
+        return url_for('static', filename=filename)
+
+    app.jinja_env.globals['asset_url'] = asset_url
+
+
+def get_asset_registry():
+    """Return the loaded asset registry, or None when the pipeline is disabled"""
+    return asset_registry
+
+
+def main():
+    """Build the static assets"""
+    static_folder = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'static')
+    manifest = build_assets(static_folder)
+    for logical, entry in manifest['assets'].items():
+        print(f"✅ {logical} -> dist/{entry['path']} ({entry['original_size']} -> {entry['size']} bytes, "
+              f"{'/'.join(entry['encodings'])})")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,284 @@
+"""
+Asyncio chat pipeline with pooled, keep-alive provider connections
+
+A single event loop runs in a background thread per process. Gemini async
+calls and an AsyncGroq client with a shared httpx connection pool live on
+that loop, so any number of request threads can have generations in flight
+without each holding its own sockets or event loop.
+"""
+import asyncio
+import logging
+import queue
+import threading
+import time
+
+from app.config.settings import Config
+from app.utils.deadline import DeadlineExceeded, activate_deadline, attempt_timeout, current_deadline
+from app.utils.rate_limit import provider_slot
+from app.utils.telemetry import activate_trace, current_trace, record_stage, span
+
+logger = logging.getLogger(__name__)
+
+try:
+    import httpx
+    from groq import AsyncGroq
+    ASYNC_GROQ_AVAILABLE = True
+except ImportError:
+    ASYNC_GROQ_AVAILABLE = False
+
+# Sentinel put on a bridge queue when the async producer has finished
+_DONE = object()
+
+# How often a blocked consumer checks whether its generation was cancelled
+CANCEL_POLL_SECONDS = 0.25
+
+
+def create_http_limits():
+    """Connection pool limits shared by the sync and async provider clients"""
+    return httpx.Limits(
+        max_connections=Config.HTTP_POOL_MAX_CONNECTIONS,
+        max_keepalive_connections=Config.HTTP_POOL_MAX_KEEPALIVE,
+        keepalive_expiry=Config.HTTP_POOL_KEEPALIVE_EXPIRY
+    )
+
+
+class AsyncChatPipeline:
+    """Runs provider calls as coroutines on a shared background event loop"""
+
+    def __init__(self, manager, max_inflight=None):
+        self.manager = manager
+        self.max_inflight = max_inflight or Config.ASYNC_MAX_INFLIGHT
+        self._loop = None
+        self._thread = None
+        self._start_lock = threading.Lock()
+        self._semaphore = None
+        self._groq_async = None
+
+    def _ensure_loop(self):
+        """Start the background event loop on first use"""
+        if self._loop is not None:
+            return self._loop
+        with self._start_lock:
+            if self._loop is None:
+                loop = asyncio.new_event_loop()
+                self._thread = threading.Thread(
+                    target=loop.run_forever, name="async-chat-pipeline", daemon=True
+                )
+                self._thread.start()
+                # Bound in-flight generations so memory stays flat under bursts
+                self._semaphore = asyncio.Semaphore(self.max_inflight)
+                self._loop = loop
+                logger.info("✅ Async chat pipeline started")
+        return self._loop
+
+    def _groq(self):
+        """Pooled AsyncGroq client, created lazily on the pipeline loop"""
+        if self._groq_async is None and ASYNC_GROQ_AVAILABLE and self.manager.groq_api_key:
+            self._groq_async = AsyncGroq(
+                api_key=self.manager.groq_api_key,
+                http_client=httpx.AsyncClient(limits=create_http_limits())
+            )
+        return self._groq_async
+
+    @provider_slot('gemini')
+    async def _stream_gemini(self, prompt, route=None):
+        """Async generator of Gemini deltas across the healthy model list"""
+        manager = self.manager
+        if not manager.gemini_client:
+            return
+        for model_name in manager._models_for("gemini", route):
+            try:
+                timeout = attempt_timeout('gemini', model_name)
+            except DeadlineExceeded:
+                return
+            if not manager.model_health.allow(model_name):
+                continue  # Opened, or taken by another probe, since the list was built
+            started = False
+            produced = 0
+            with span('model_attempt', provider='gemini', model=model_name, stream=True) as attempt:
+                try:
+                    attempt_started = time.monotonic()
+                    model = manager._gemini_model(model_name)
+                    ai_response = await model.generate_content_async(
+                        prompt, stream=True, **manager._gemini_call_options(timeout, route)
+                    )
+                    async for chunk in ai_response:
+                        try:
+                            text = chunk.text
+                        except (ValueError, IndexError, AttributeError):
+                            continue
+                        if text:
+                            if not started:
+                                started = True
+                                manager.model_health.record_success("gemini", model_name)
+                                record_stage('model_first_token', time.monotonic() - attempt_started,
+                                             provider='gemini', model=model_name)
+                            produced += len(text)
+                            yield text
+                    if started:
+                        logger.info(f"✅ Gemini async stream successful with model: {model_name}")
+                        manager._record_usage(
+                            "gemini", model_name, getattr(ai_response, 'usage_metadata', None), len(prompt) + produced
+                        )
+                        attempt['outcome'] = 'success'
+                        return
+                    manager.model_health.record_failure("gemini", model_name, 'error')
+                    attempt['outcome'] = 'empty'
+                except asyncio.CancelledError:
+                    # A hedge loser never finished its attempt; a half-open model must not stay reserved
+                    manager.model_health.release_probe(model_name)
+                    raise
+                except Exception as e:
+                    if started:
+                        logger.error(f"❌ Gemini async stream interrupted with {model_name}: {e}")
+                        attempt['outcome'] = 'interrupted'
+                        return
+                    if manager._handle_model_error("gemini", model_name, e, attempt):
+                        break
+        logger.error("❌ All Gemini models failed to stream (async)")
+
+    @provider_slot('groq')
+    async def _stream_groq(self, messages, route=None):
+        """Async generator of Groq deltas across the healthy model list"""
+        manager = self.manager
+        client = self._groq()
+        if client is None:
+            return
+        for model_name in manager._models_for("groq", route):
+            try:
+                timeout = attempt_timeout('groq', model_name)
+            except DeadlineExceeded:
+                return
+            if not manager.model_health.allow(model_name):
+                continue  # Opened, or taken by another probe, since the list was built
+            started = False
+            with span('model_attempt', provider='groq', model=model_name, stream=True) as attempt:
+                try:
+                    attempt_started = time.monotonic()
+                    stream = await manager._groq_for_attempt(client, timeout).chat.completions.create(
+                        messages=messages,
+                        model=model_name,
+                        temperature=0.7,
+                        max_tokens=manager._max_tokens(route),
+                        top_p=0.9,
+                        stream=True
+                    )
+                    usage = None
+                    try:
+                        async for chunk in stream:
+                            usage = getattr(getattr(chunk, 'x_groq', None), 'usage', None) or usage
+                            if not chunk.choices:
+                                continue
+                            text = chunk.choices[0].delta.content
+                            if text:
+                                if not started:
+                                    started = True
+                                    manager.model_health.record_success("groq", model_name)
+                                    record_stage('model_first_token', time.monotonic() - attempt_started,
+                                                 provider='groq', model=model_name)
+                                yield text
+                    finally:
+                        await stream.close()
+                    if started:
+                        logger.info(f"✅ Groq async stream successful with model: {model_name}")
+                        manager._record_usage("groq", model_name, usage)
+                        attempt['outcome'] = 'success'
+                        return
+                    manager.model_health.record_failure("groq", model_name, 'error')
+                    attempt['outcome'] = 'empty'
+                except asyncio.CancelledError:
+                    # A hedge loser never finished its attempt; a half-open model must not stay reserved
+                    manager.model_health.release_probe(model_name)
+                    raise
+                except Exception as e:
+                    if started:
+                        logger.error(f"❌ Groq async stream interrupted with {model_name}: {e}")
+                        attempt['outcome'] = 'interrupted'
+                        return
+                    if manager._handle_model_error("groq", model_name, e, attempt):
+                        break
+        logger.error("❌ All Groq models failed to stream (async)")
+
+    async def _race(self, prompt, messages, emit, route=None):
+        """Hedged dispatch: the second provider joins if the route's primary has no first token within the hedge delay"""
+        manager = self.manager
+        primary, secondary = manager._provider_order(route)
+        sources = {
+            'gemini': lambda: self._stream_gemini(prompt, route),
+            'groq': lambda: self._stream_groq(messages, route)
+        }
+        winner = None
+        started_at = time.monotonic()
+
+        async def run(provider, source):
+            nonlocal winner
+            try:
+                async for delta in source:
+                    if winner is None:
+                        winner = provider
+                        manager._record_win(provider, time.monotonic() - started_at)
+                        for other in tasks:
+                            if other is not asyncio.current_task():
+                                other.cancel()
+                    if winner == provider:
+                        emit(provider, delta)
+                return winner == provider
+            finally:
+                # Close the generator now, also when cancelled, so its provider slot and connection are freed at once
+                await source.aclose()
+
+        tasks = [asyncio.ensure_future(run(primary, sources[primary]()))]
+        hedge_delay = manager.hedge_delay if manager.hedge_enabled else None
+        done, _ = await asyncio.wait(tasks, timeout=hedge_delay)
+        primary_failed = bool(done) and (tasks[0].exception() is not None or not tasks[0].result())
+        if winner is None and (not done or primary_failed):
+            if not done:
+                logger.info(f"⏱️ {primary.capitalize()} gave no token within {hedge_delay}s, hedging with {secondary.capitalize()} (async)")
+            tasks.append(asyncio.ensure_future(run(secondary, sources[secondary]())))
+        await asyncio.gather(*tasks, return_exceptions=True)
+
+    async def _produce(self, prompt, messages, out, trace=None, deadline=None, route=None):
+        """Run one generation under the in-flight semaphore, feeding a thread-safe queue"""
+        # Tasks get their own context copy, so this only affects this generation
+        activate_trace(trace)
+        activate_deadline(deadline)
+        async with self._semaphore:
+            try:
+                await self._race(prompt, messages, lambda provider, delta: out.put((provider, delta)), route)
+            finally:
+                out.put(_DONE)
+
+    def stream_chat(self, prompt, messages, cancel_event=None, route=None):
+        """Blocking iterator of (api_used, delta) pairs driven by the async pipeline
+
+        Setting cancel_event cancels the coroutine, aborting the provider
+        request in flight.
+        """
+        loop = self._ensure_loop()
+        out = queue.Queue()
+        future = asyncio.run_coroutine_threadsafe(
+            self._produce(prompt, messages, out, current_trace(), current_deadline(), route), loop
+        )
+        timeout = CANCEL_POLL_SECONDS if cancel_event is not None else None
+        try:
+            while cancel_event is None or not cancel_event.is_set():
+                try:
+                    item = out.get(timeout=timeout)
+                except queue.Empty:
+                    continue
+                if item is _DONE:
+                    break
+                yield item
+        finally:
+            # Consumer went away, finished or was cancelled: cancel the coroutine and free its connection
+            future.cancel()
+
+    def get_response(self, prompt, messages, route=None):
+        """Return (response, api_used) from the async pipeline, or (None, None)"""
+        deltas = []
+        api_used = None
+        for api_used, delta in self.stream_chat(prompt, messages, route=route):
+            deltas.append(delta)
+        if not deltas:
+            return None, None
+        return ''.join(deltas).strip(), api_used
@@ -0,0 +1,188 @@
+"""
+Per-model circuit breaker and health memory for the provider fallback lists
+"""
+import logging
+import re
+import threading
+import time
+
+from app.config.settings import Config
+
+logger = logging.getLogger(__name__)
+
+CLOSED = 'closed'
+OPEN = 'open'
+HALF_OPEN = 'half_open'
+
+_RETRY_DELAY_RE = re.compile(r'retry[_ -]?(?:delay|after)[^0-9]{0,20}(\d+(?:\.\d+)?)', re.IGNORECASE)
+
+
+def classify_error(error):
+    """Map a provider exception to rate_limit, not_found, auth or error"""
+    message = str(error).lower()
+    status = getattr(error, 'status_code', None) or getattr(error, 'code', None)
+    if callable(status):
+        status = None
+    if status == 429 or "429" in message or "quota" in message or "rate_limit" in message:
+        return 'rate_limit'
+    if status == 404 or "404" in message or "not found" in message or "decommissioned" in message:
+        return 'not_found'
+    if status in (401, 403) or "invalid api key" in message or "authentication" in message:
+        return 'auth'
+    return 'error'
+
+
+def retry_after_seconds(error):
+    """Extract a retry-after hint from a provider exception, if it carries one"""
+    response = getattr(error, 'response', None)
+    headers = getattr(response, 'headers', None)
+    if headers:
+        value = headers.get('retry-after')
+        try:
+            return float(value) if value is not None else None
+        except ValueError:
+            pass
+    match = _RETRY_DELAY_RE.search(str(error))
+    if match:
+        return float(match.group(1))
+    return None
+
+
+class ModelHealth:
+    """Circuit state for a single model"""
+
+    __slots__ = ('state', 'failures', 'open_until', 'probe_until', 'evicted')
+
+    def __init__(self):
+        self.state = CLOSED
+        self.failures = 0
+        self.open_until = 0.0
+        self.probe_until = 0.0
+        self.evicted = False
+
+
+class ModelHealthRegistry:
+    """Remembers which models are healthy so dead ones cost no network round-trip"""
+
+    # How long a half-open probe slot is reserved before another request may take it
+    PROBE_TIMEOUT = 60
+
+    def __init__(self, failure_threshold=3, cooldown=30, max_cooldown=600):
+        self.failure_threshold = failure_threshold
+        self.cooldown = cooldown
+        self.max_cooldown = max_cooldown
+        self._models = {}
+        self._last_good = {}
+        self._lock = threading.Lock()
+
+    def _health(self, model):
+        """Return the health record for a model (caller holds the lock)"""
+        health = self._models.get(model)
+        if health is None:
+            health = self._models[model] = ModelHealth()
+        return health
+
+    def ordered(self, provider, models, keep_order=False):
+        """Return the models worth trying now, last known-good first unless keep_order is set"""
+        now = time.monotonic()
+        candidates = []
+        with self._lock:
+            last_good = self._last_good.get(provider)
+            for model in models:
+                health = self._health(model)
+                if health.evicted:
+                    continue
+                if health.state == OPEN:
+                    if now < health.open_until:
+                        continue
+                    health.state = HALF_OPEN
+                    health.probe_until = 0.0
+                if health.state == HALF_OPEN and now < health.probe_until:
+                    # Another request is already probing this recovering model
+                    continue
+                candidates.append(model)
+        if last_good in candidates and not keep_order:
+            candidates.remove(last_good)
+            candidates.insert(0, last_good)
+        return candidates
+
+    def allow(self, model):
+        """Claim an attempt on a model just before it starts; False means skip it
+
+        A half-open model admits one probe at a time, so its probe slot is
+        reserved here rather than in ordered(), where most listed models are
+        never tried because an earlier one answers.
+        """
+        now = time.monotonic()
+        with self._lock:
+            health = self._health(model)
+            if health.evicted or (health.state == OPEN and now < health.open_until):
+                return False
+            if health.state != CLOSED:
+                if now < health.probe_until:
+                    return False
+                health.state = HALF_OPEN
+                health.probe_until = now + self.PROBE_TIMEOUT
+            return True
+
+    def release_probe(self, model):
+        """Give back a half-open probe slot whose attempt was cancelled before it could succeed or fail"""
+        with self._lock:
+            health = self._models.get(model)
+            if health is not None and health.state == HALF_OPEN:
+                health.probe_until = 0.0
+
+    def record_success(self, provider, model):
+        """Close the circuit and remember the model as the provider's preferred choice"""
+        with self._lock:
+            health = self._health(model)
+            health.state = CLOSED
+            health.failures = 0
+            health.probe_until = 0.0
+            self._last_good[provider] = model
+
+    def record_failure(self, provider, model, kind, retry_after=None):
+        """Open, back off or evict a model according to the failure kind"""
+        with self._lock:
+            health = self._health(model)
+            health.probe_until = 0.0
+            if kind == 'auth':
+                # A bad key says nothing about the model itself
+                return
+            if kind == 'not_found':
+                health.evicted = True
+                health.state = OPEN
+                logger.warning(f"🚫 Model {model} evicted (not found)")
+            else:
+                health.failures += 1
+                if kind == 'rate_limit' or health.failures >= self.failure_threshold or health.state == HALF_OPEN:
+                    backoff = retry_after or min(
+                        self.cooldown * (2 ** max(0, health.failures - 1)), self.max_cooldown
+                    )
+                    health.state = OPEN
+                    health.open_until = time.monotonic() + backoff
+                    logger.warning(f"⛔ Circuit open for {model} ({kind}), retry in {backoff:.0f}s")
+            if self._last_good.get(provider) == model:
+                del self._last_good[provider]
+
+    def snapshot(self):
+        """Return the circuit state of every model seen so far"""
+        now = time.monotonic()
+        with self._lock:
+            return {
+                model: {
+                    'state': 'evicted' if health.evicted else health.state,
+                    'failures': health.failures,
+                    'retry_in': round(max(0.0, health.open_until - now), 1) if health.state == OPEN else 0
+                }
+                for model, health in self._models.items()
+            }
+
+
+def create_model_health_registry():
+    """Build a registry from the application configuration"""
+    return ModelHealthRegistry(
+        failure_threshold=Config.CIRCUIT_FAILURE_THRESHOLD,
+        cooldown=Config.CIRCUIT_COOLDOWN_SECONDS,
+        max_cooldown=Config.CIRCUIT_MAX_COOLDOWN_SECONDS
+    )
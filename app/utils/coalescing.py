@@ -0,0 +1,258 @@
+"""
+Single-flight coalescing of identical concurrent chat questions
+
+Every generation runs on a background thread as a flight that buffers
+its deltas. Identical concurrent questions share one flight; a dropped
+stream can rejoin its flight by stream id and replay what it missed.
+A flight nobody is listening to any more is cancelled, which stops the
+provider request instead of generating an answer no one will read. So is
+a flight whose subscriber runs out of request deadline.
+"""
+import logging
+import threading
+import time
+import uuid
+from collections import OrderedDict
+
+from app.config.settings import Config
+from app.utils.deadline import DeadlineExceeded, deadline_passed, give_up_waiting, wait_timeout
+from app.utils.telemetry import get_metrics_registry, run_in_context
+
+logger = logging.getLogger(__name__)
+
+
+class Flight:
+    """One generation and the deltas it has produced so far"""
+
+    def __init__(self, key, fingerprint=None):
+        self.key = key
+        self.fingerprint = fingerprint  # what the flight answers; a resume must present the same
+        self.stream_id = uuid.uuid4().hex[:16]
+        self.deltas = []  # (api_used, delta) in arrival order
+        self.done = False
+        self.cancelled = False
+        self.cancel_event = threading.Event()  # handed to the generation so it can stop early
+        self.subscribers = 0
+        self.abandoned_at = None  # monotonic time the last subscriber left
+        self.finished_at = None
+        self.condition = threading.Condition()
+
+    def read(self, index, timeout=None):
+        """Wait up to timeout for deltas past index; returns (new deltas, done)
+
+        When done is True the returned deltas run to the end of the flight.
+        """
+        with self.condition:
+            if index >= len(self.deltas) and not self.done and not self.cancelled:
+                self.condition.wait(timeout)
+            return self.deltas[index:], self.done
+
+    def cancel(self):
+        """Stop the generation; returns False when it already finished or was cancelled"""
+        with self.condition:
+            if self.done or self.cancelled:
+                return False
+            self.cancelled = True
+            self.cancel_event.set()
+            self.condition.notify_all()
+        return True
+
+
+class SingleFlight:
+    """Concurrent requests for the same key share one generation
+
+    The first subscriber starts the generation on a background thread, so
+    it keeps running for the others if that subscriber disconnects. Every
+    subscriber replays the buffered deltas and then follows the live stream.
+    When the last subscriber has been gone for the resume grace period
+    (at once when it is 0), the generation is cancelled. Recent flights stay addressable by stream
+    id for a short while so a dropped stream can resume.
+    """
+
+    def __init__(self, replay_size=256, replay_ttl=60.0, resume_grace=5.0):
+        self.replay_size = replay_size
+        self.replay_ttl = replay_ttl
+        self.resume_grace = resume_grace
+        self._flights = {}  # key -> shared in-flight Flight
+        self._streams = OrderedDict()  # stream_id -> Flight, kept for replay
+        self._lock = threading.Lock()
+
+    def join(self, key, start, on_complete=None, fingerprint=None):
+        """Subscribe to the generation for key, starting one when none is in flight; returns the Flight
+
+        start(cancel_event) returns the (api_used, delta) iterator for a new
+        generation, which should stop once cancel_event is set;
+        on_complete(text, api_used) runs once after a successful generation,
+        before the flight is released, so later requests find its result.
+        A key of None always starts a private flight. fingerprint identifies
+        the request (question and conversation) a new flight answers, for
+        resume(). Pair with leave().
+        """
+        with self._lock:
+            flight = self._flights.get(key) if key is not None else None
+            # A flight whose subscribers all left is winding down; start afresh
+            leader = flight is None or flight.cancelled
+            if leader:
+                flight = Flight(key, fingerprint)
+                if key is not None:
+                    self._flights[key] = flight
+                self._remember(flight)
+            with flight.condition:
+                flight.subscribers += 1
+                flight.abandoned_at = None
+
+        if leader:
+            threading.Thread(
+                target=run_in_context(self._produce),
+                args=(flight, start, on_complete),
+                name="chat-single-flight",
+                daemon=True
+            ).start()
+        else:
+            get_metrics_registry().inc('coalesced_requests')
+            logger.info(f"🔗 Joined in-flight generation for: {key[:50]}")
+        return flight
+
+    def resume(self, stream_id, fingerprint=None):
+        """Rejoin a recent flight by stream id; returns the Flight or None when it is gone
+
+        With a fingerprint, a flight answering a different request is not
+        rejoined either.
+        """
+        with self._lock:
+            self._prune()
+            flight = self._streams.get(stream_id)
+            if flight is None or (fingerprint is not None and flight.fingerprint != fingerprint):
+                return None
+            with flight.condition:
+                if flight.cancelled:
+                    return None
+                flight.subscribers += 1
+                flight.abandoned_at = None
+        get_metrics_registry().inc('stream_resumes')
+        logger.info(f"🔗 Resuming stream {stream_id}")
+        return flight
+
+    def leave(self, flight):
+        """Drop a subscription taken by join() or resume()
+
+        The last subscriber leaving an unfinished flight schedules its
+        cancellation after the resume grace period.
+        """
+        with flight.condition:
+            flight.subscribers -= 1
+            if flight.subscribers or flight.done:
+                return
+            abandoned_at = flight.abandoned_at = time.monotonic()
+        if self.resume_grace <= 0:
+            self._cancel_abandoned(flight, abandoned_at)
+            return
+        timer = threading.Timer(self.resume_grace, self._cancel_abandoned, args=(flight, abandoned_at))
+        timer.daemon = True
+        timer.start()
+
+    def _cancel_abandoned(self, flight, abandoned_at):
+        """Cancel a flight unless it finished or was resumed since it was abandoned at abandoned_at"""
+        with flight.condition:
+            if flight.abandoned_at != abandoned_at or not flight.cancel():
+                return
+        get_metrics_registry().inc('cancelled_generations')
+        logger.info(f"🛑 All subscribers left, cancelling generation for: {(flight.key or flight.stream_id)[:50]}")
+
+    def subscribe(self, key, start, on_complete=None):
+        """Yield (api_used, delta) pairs for key, joining an in-flight generation when there is one
+
+        Waits are bounded by the request deadline. When it runs out, or the
+        flight is cancelled, the generation is cancelled and
+        DeadlineExceeded is raised.
+        """
+        flight = self.join(key, start, on_complete)
+        index = 0
+        try:
+            while True:
+                pending, done = flight.read(index, wait_timeout())
+                index += len(pending)
+                for item in pending:
+                    yield item
+                if done:
+                    return
+                if deadline_passed() or flight.cancelled:
+                    flight.cancel()
+                    give_up_waiting('generation')
+                    raise DeadlineExceeded("the generation did not finish within the request deadline")
+        finally:
+            self.leave(flight)
+
+    def _produce(self, flight, start, on_complete):
+        """Drive one generation, publishing each delta to the flight's subscribers"""
+        source = None
+        completed = False
+        try:
+            source = start(flight.cancel_event)
+            for item in source:
+                if flight.cancel_event.is_set():
+                    break
+                with flight.condition:
+                    flight.deltas.append(item)
+                    flight.condition.notify_all()
+            # A cancelled generation may end quietly with a partial answer; never cache that
+            completed = not flight.cancel_event.is_set()
+        except DeadlineExceeded as e:
+            logger.warning(f"⏱️ Coalesced generation stopped at the request deadline: {e}")
+        except Exception as e:
+            logger.error(f"❌ Coalesced generation failed: {e}")
+        finally:
+            if source is not None and hasattr(source, 'close'):
+                # Closing the provider generator cancels any still-running provider calls
+                source.close()
+            try:
+                if completed and flight.deltas and on_complete is not None:
+                    on_complete(''.join(delta for _, delta in flight.deltas).strip(), flight.deltas[-1][0])
+            except Exception as e:
+                logger.error(f"❌ Coalesced completion callback failed: {e}")
+            with self._lock:
+                if flight.key is not None and self._flights.get(flight.key) is flight:
+                    del self._flights[flight.key]
+            with flight.condition:
+                flight.done = True
+                flight.finished_at = time.monotonic()
+                flight.condition.notify_all()
+
+    def _remember(self, flight):
+        """Register a flight for resumption (caller holds the lock)"""
+        self._prune()
+        self._streams[flight.stream_id] = flight
+        while len(self._streams) > self.replay_size:
+            self._streams.popitem(last=False)
+
+    def _prune(self):
+        """Forget finished flights older than the replay TTL (caller holds the lock)"""
+        now = time.monotonic()
+        while self._streams:
+            flight = next(iter(self._streams.values()))
+            if flight.finished_at is None or now - flight.finished_at < self.replay_ttl:
+                break
+            self._streams.popitem(last=False)
+
+    def in_flight(self):
+        """Number of generations currently shared"""
+        with self._lock:
+            return len(self._flights)
+
+
+# Global single-flight instance
+single_flight = None
+_single_flight_lock = threading.Lock()
+
+def get_single_flight():
+    """Get or create the single-flight coalescer"""
+    global single_flight
+    if single_flight is None:
+        with _single_flight_lock:
+            if single_flight is None:
+                single_flight = SingleFlight(
+                    replay_size=Config.SSE_REPLAY_STREAMS,
+                    replay_ttl=Config.SSE_REPLAY_TTL_SECONDS,
+                    resume_grace=Config.SSE_RESUME_GRACE_SECONDS
+                )
+    return single_flight
@@ -0,0 +1,115 @@
+"""
+Request deadlines shared across the provider and model fallback chain
+
+A chat request gets one time budget (CHAT_DEADLINE_SECONDS). Each model
+attempt may spend a share of what is left as its SDK timeout, so a hung
+model still leaves room for the next one, and the chain stops as soon as
+the remainder cannot cover another attempt. The deadline travels in a
+context variable, so threads started through run_in_context see it too.
+
+SDKs without a per-call timeout (google-generativeai 0.3.2) can hang past
+any attempt budget, so every wait on a generation (the hedged race, a
+flight's subscribers, the SSE writer) is bounded by the deadline as well
+and gives up, cancelling the generation, once it runs out.
+"""
+import contextvars
+import logging
+import time
+from contextlib import contextmanager
+
+from app.config.settings import Config
+from app.utils.telemetry import get_metrics_registry
+
+logger = logging.getLogger(__name__)
+
+
+class DeadlineExceeded(Exception):
+    """The request deadline cannot cover another model attempt"""
+
+
+class Deadline:
+    """A point in time by which a chat request must have its answer"""
+
+    def __init__(self, seconds, attempt_share=None, min_attempt=None):
+        self.seconds = seconds
+        self.expires_at = time.monotonic() + seconds
+        self.attempt_share = Config.DEADLINE_ATTEMPT_SHARE if attempt_share is None else attempt_share
+        self.min_attempt = Config.DEADLINE_MIN_ATTEMPT_SECONDS if min_attempt is None else min_attempt
+
+    def remaining(self):
+        return max(0.0, self.expires_at - time.monotonic())
+
+    def attempt_timeout(self):
+        """Timeout for the next model attempt; raises DeadlineExceeded when too little is left
+
+        An attempt gets attempt_share of the remaining budget, but never less
+        than min_attempt, so the budget shrinks geometrically along the chain.
+        """
+        remaining = self.remaining()
+        if remaining < self.min_attempt:
+            raise DeadlineExceeded(f"{remaining:.2f}s left of a {self.seconds}s deadline")
+        return max(self.min_attempt, remaining * self.attempt_share)
+
+
+_current_deadline = contextvars.ContextVar('chat_deadline', default=None)
+
+def current_deadline():
+    """Return the deadline active in this context, or None"""
+    return _current_deadline.get()
+
+
+def activate_deadline(deadline):
+    """Make a deadline current in this context (e.g. inside an event loop task)"""
+    _current_deadline.set(deadline)
+
+
+@contextmanager
+def deadline_scope(seconds=None):
+    """Run a block under a request deadline (CHAT_DEADLINE_SECONDS by default; 0 disables it)"""
+    seconds = Config.CHAT_DEADLINE_SECONDS if seconds is None else seconds
+    deadline = Deadline(seconds) if seconds > 0 else None
+    token = _current_deadline.set(deadline)
+    try:
+        yield deadline
+    finally:
+        _current_deadline.reset(token)
+
+
+def attempt_timeout(provider, model):
+    """SDK timeout for a model attempt under the current deadline (None when there is none)
+
+    Raises DeadlineExceeded, after counting it, when the deadline cannot
+    cover the attempt; callers stop walking their model list.
+    """
+    deadline = _current_deadline.get()
+    if deadline is None:
+        return None
+    try:
+        return deadline.attempt_timeout()
+    except DeadlineExceeded as e:
+        logger.warning(f"⏱️ Deadline reached before {provider} model {model}: {e}")
+        get_metrics_registry().inc('deadline_exceeded', provider=provider)
+        raise
+
+
+def wait_timeout(timeout=None):
+    """Bound a wait (seconds, None for no limit) by what is left of the current deadline"""
+    deadline = _current_deadline.get()
+    if deadline is None:
+        return timeout
+    remaining = deadline.remaining()
+    return remaining if timeout is None else min(timeout, remaining)
+
+
+def deadline_passed():
+    """True when the current deadline has run out (never without a deadline)"""
+    deadline = _current_deadline.get()
+    return deadline is not None and deadline.remaining() <= 0
+
+
+def give_up_waiting(where):
+    """Log and count a wait on a generation abandoned at the deadline"""
+    deadline = _current_deadline.get()
+    seconds = deadline.seconds if deadline is not None else 0
+    logger.warning(f"⏱️ Deadline of {seconds}s reached while waiting on the {where}, giving up")
+    get_metrics_registry().inc('deadline_waits_expired', where=where)
@@ -0,0 +1,106 @@
+"""
+Conditional, range-capable delivery of a single downloadable file
+"""
+import os
+import threading
+import time
+from datetime import datetime, timezone
+
+from flask import Response, request
+from werkzeug.wsgi import wrap_file
+
+
+class FileVersion:
+    """Metadata and (small) contents of one version of the file; never changed once published"""
+
+    __slots__ = ('size', 'mtime', 'etag', 'last_modified', 'content')
+
+    def __init__(self, size, mtime, etag, last_modified, content):
+        self.size = size
+        self.mtime = mtime
+        self.etag = etag
+        self.last_modified = last_modified
+        self.content = content
+
+
+class CachedFile:
+    """A file whose path is resolved once and whose stat metadata is cached
+
+    Small files are also kept in memory so a download is a memory copy.
+    Larger ones are streamed through the server's wsgi.file_wrapper, which
+    gunicorn implements with os.sendfile. A reload publishes a new
+    FileVersion in one assignment, so a response never mixes the body of
+    one version with the headers of another.
+    """
+
+    def __init__(self, path, download_name, mimetype, stat_ttl=60, memory_max_bytes=1024 * 1024):
+        self.path = os.path.abspath(path)
+        self.download_name = download_name
+        self.mimetype = mimetype
+        self.stat_ttl = stat_ttl
+        self.memory_max_bytes = memory_max_bytes
+        self.version = None
+        self._checked_at = 0.0
+        self._lock = threading.Lock()
+
+    def refresh(self):
+        """Re-stat the file at most once per stat_ttl; returns the current FileVersion, or None when it is missing"""
+        now = time.monotonic()
+        version = self.version
+        if version is not None and now - self._checked_at < self.stat_ttl:
+            return version
+        with self._lock:
+            version = self.version
+            if version is not None and now - self._checked_at < self.stat_ttl:
+                return version
+            try:
+                stat = os.stat(self.path)
+            except OSError:
+                self.version = None
+                return None
+            if version is None or stat.st_mtime_ns != version.mtime or stat.st_size != version.size:
+                content = None
+                if stat.st_size <= self.memory_max_bytes:
+                    with open(self.path, 'rb') as handle:
+                        content = handle.read()
+                version = self.version = FileVersion(
+                    stat.st_size,
+                    stat.st_mtime_ns,
+                    f"{stat.st_size:x}-{stat.st_mtime_ns:x}",
+                    datetime.fromtimestamp(stat.st_mtime, tz=timezone.utc),
+                    content
+                )
+            self._checked_at = now
+            return version
+
+    def _base_headers(self):
+        return {
+            'Content-Disposition': f'attachment; filename="{self.download_name}"',
+            'Cache-Control': 'no-cache'
+        }
+
+    def offload_response(self, version, mode, accel_prefix):
+        """Empty response telling the fronting proxy to send the file itself"""
+        response = Response(mimetype=self.mimetype, headers=self._base_headers())
+        if mode == 'x-accel-redirect':
+            response.headers['X-Accel-Redirect'] = f"{accel_prefix.rstrip('/')}/{os.path.basename(self.path)}"
+        else:
+            response.headers['X-Sendfile'] = self.path
+        response.set_etag(version.etag)
+        response.last_modified = version.last_modified
+        # Conditional requests are still answered here; ranges are left to the proxy
+        return response.make_conditional(request)
+
+    def response(self, version):
+        """Full, partial (206) or not-modified (304) response for the current request from one FileVersion"""
+        if version.content is not None:
+            response = Response(version.content, mimetype=self.mimetype, headers=self._base_headers())
+        else:
+            body = wrap_file(request.environ, open(self.path, 'rb'))
+            response = Response(body, mimetype=self.mimetype, headers=self._base_headers(),
+                                direct_passthrough=True)
+            response.content_length = version.size
+        response.set_etag(version.etag)
+        response.last_modified = version.last_modified
+        # Handles If-None-Match / If-Modified-Since (304), Range (206/416) and If-Range
+        return response.make_conditional(request, accept_ranges=True, complete_length=version.size)
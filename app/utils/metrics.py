@@ -0,0 +1,114 @@
+"""
+Prometheus text exposition of the in-process metrics
+
+Counters and histograms are per process: with several gunicorn workers
+each scrape reads the worker that answered, identified by the ``worker``
+label.
+"""
+import os
+
+from app.utils.telemetry import get_metrics_registry
+
+PREFIX = 'portfolio'
+
+# Stage histograms whose sample count is also exported as a named counter
+STAGE_COUNTERS = {
+    'request': ('requests_total', 'Chat requests by route and answering source'),
+    'model_attempt': ('model_attempts_total', 'Provider model attempts by outcome (success, rate_limit, not_found, auth, error, empty, cancelled)'),
+    'cache_lookup': ('cache_lookups_total', 'Response cache lookups by outcome'),
+    'fallback': ('fallback_responses_total', 'Answers served by the keyword fallback')
+}
+
+COUNTER_HELP = {
+    'tokens': ('tokens_total', 'Prompt and completion tokens reported by the providers'),
+    'hedge_wins': ('hedge_wins_total', 'Hedged provider races won, by the provider whose first token arrived first'),
+    'coalesced_requests': ('coalesced_requests_total', 'Requests that joined an identical in-flight generation'),
+    'rate_limited': ('rate_limited_total', 'Requests answered by the fallback because the client was over its rate limit'),
+    'stream_resumes': ('stream_resumes_total', 'Dropped streams resumed from the replay buffer via Last-Event-ID'),
+    'stream_disconnects': ('stream_disconnects_total', 'Streaming responses whose client went away before the answer finished'),
+    'cancelled_generations': ('cancelled_generations_total', 'Provider generations cancelled because no client was left to read them'),
+    'batch_questions': ('batch_questions_total', 'Questions answered through the batch runner by status'),
+    'routed_questions': ('routed_questions_total', 'Questions per model routing tier (simple, complex, economy)'),
+    'deadline_exceeded': ('deadline_exceeded_total', 'Provider fallback chains cut short because the request deadline was nearly spent'),
+    'deadline_waits_expired': ('deadline_waits_expired_total', 'Waits on a still-running generation abandoned at the request deadline, by where the wait was'),
+    'provider_rejections': ('provider_rejections_total', 'Provider calls skipped because the provider was at its concurrency cap')
+}
+
+STAGE_HELP = {
+    'request': 'Total chat request latency',
+    'model_first_token': 'Time to first token per provider model (TTFT)',
+    'hedge_first_token': 'Time from dispatch to the first token of the provider that won a hedged race',
+    'stream_first_byte': 'Time from request start to the first streamed chunk',
+    'stream_complete': 'Time from request start to the end of the streamed answer',
+    'model_attempt': 'Duration of each provider model attempt',
+    'generate': 'Provider dispatch time for non-streaming requests'
+}
+
+
+def _escape(value):
+    return str(value).replace('\\', '\\\\').replace('\n', '\\n').replace('"', '\\"')
+
+
+def _labels(labels, extra=None):
+    items = dict(labels)
+    if extra:
+        items.update(extra)
+    if not items:
+        return ''
+    return '{' + ','.join(f'{key}="{_escape(value)}"' for key, value in sorted(items.items())) + '}'
+
+
+def _number(value):
+    if value == float('inf'):
+        return '+Inf'
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+def render_prometheus(gauges=None):
+    """Render all metrics, plus optional gauges {name: (help, [(labels, value)])}, as Prometheus text"""
+    counters, histograms = get_metrics_registry().snapshot()
+    worker = {'worker': str(os.getpid())}
+    lines = []
+
+    def family(name, kind, help_text, samples):
+        lines.append(f'# HELP {PREFIX}_{name} {help_text}')
+        lines.append(f'# TYPE {PREFIX}_{name} {kind}')
+        lines.extend(samples)
+
+    by_stage = {}
+    for histogram in histograms:
+        by_stage.setdefault(histogram['name'], []).append(histogram)
+
+    for stage, series in sorted(by_stage.items()):
+        metric = f'{stage}_seconds'
+        samples = []
+        for histogram in series:
+            labels = {**histogram['labels'], **worker}
+            for bound, count in histogram['buckets']:
+                samples.append(f'{PREFIX}_{metric}_bucket{_labels(labels, {"le": _number(bound)})} {count}')
+            samples.append(f'{PREFIX}_{metric}_sum{_labels(labels)} {_number(histogram["sum"])}')
+            samples.append(f'{PREFIX}_{metric}_count{_labels(labels)} {histogram["count"]}')
+        family(metric, 'histogram', STAGE_HELP.get(stage, f'Latency of the {stage} stage'), samples)
+
+        if stage in STAGE_COUNTERS:
+            name, help_text = STAGE_COUNTERS[stage]
+            family(name, 'counter', help_text, [
+                f'{PREFIX}_{name}{_labels({**histogram["labels"], **worker})} {histogram["count"]}'
+                for histogram in series
+            ])
+
+    by_counter = {}
+    for (name, labels), value in counters.items():
+        by_counter.setdefault(name, []).append((labels, value))
+    for name, series in sorted(by_counter.items()):
+        metric, help_text = COUNTER_HELP.get(name, (f'{name}_total', name))
+        family(metric, 'counter', help_text, [
+            f'{PREFIX}_{metric}{_labels({**dict(labels), **worker})} {_number(value)}' for labels, value in series
+        ])
+
+    for name, (help_text, series) in sorted((gauges or {}).items()):
+        family(name, 'gauge', help_text, [
+            f'{PREFIX}_{name}{_labels({**labels, **worker})} {_number(value)}' for labels, value in series
+        ])
+
+    return '\n'.join(lines) + '\n'
@@ -0,0 +1,165 @@
+"""
+Complexity-aware model routing with an optional daily token budget
+
+Questions are classified with the same intent keywords as the smart
+fallback. A short question about a single topic ("What is his current
+role?") is factual. It goes to the fastest small model first, with a tight
+output cap. Open-ended questions, follow-ups that refer back to the
+conversation and anything the keywords do not recognise keep the larger
+models and the full limit.
+
+With a daily token budget, the router downgrades in two steps. Past
+TOKEN_BUDGET_DOWNGRADE_AT of the budget, open-ended questions also start
+on the small model. Once the budget is spent, every question gets the
+small model and the tight cap. The budget covers the whole deployment;
+each worker enforces an equal share of it.
+"""
+import logging
+import threading
+import time
+
+from app.config.settings import Config
+from app.utils.resume_context import INTENT_PRIORITY, classify_intent, score_intents
+from app.utils.sessions import is_follow_up
+from app.utils.telemetry import get_metrics_registry
+
+logger = logging.getLogger(__name__)
+
+SIMPLE = 'simple'
+COMPLEX = 'complex'
+ECONOMY = 'economy'  # open-ended question on the small model because the budget is running low
+
+# Words that make a question open-ended however short it is
+OPEN_ENDED_WORDS = frozenset({
+    'why', 'how', 'explain', 'describe', 'compare', 'elaborate', 'detail', 'details',
+    'difference', 'differences', 'think', 'should', 'would', 'hire', 'fit', 'suitable',
+    'strength', 'strengths', 'weakness', 'weaknesses', 'summarize', 'summary', 'everything'
+})
+
+
+class ModelRoute:
+    """Provider order, model lists and output cap for one question"""
+
+    __slots__ = ('tier', 'providers', 'gemini_models', 'groq_models', 'max_tokens')
+
+    def __init__(self, tier, providers, gemini_models, groq_models, max_tokens):
+        self.tier = tier
+        self.providers = providers  # primary first; the hedge/fallback goes second
+        self.gemini_models = gemini_models
+        self.groq_models = groq_models
+        self.max_tokens = max_tokens
+
+    def models(self, provider):
+        return self.gemini_models if provider == 'gemini' else self.groq_models
+
+
+class TokenBudget:
+    """Provider tokens spent today (UTC) by this worker against its daily limit
+
+    Counts live in the worker's memory and start again at zero when the
+    worker restarts.
+    """
+
+    def __init__(self, daily_tokens):
+        self.daily_tokens = daily_tokens
+        self._day = None
+        self._used = 0
+        self._lock = threading.Lock()
+
+    def _roll(self):
+        """Start a fresh count on a new UTC day (caller holds the lock)"""
+        today = time.strftime('%Y-%m-%d', time.gmtime())
+        if today != self._day:
+            self._day, self._used = today, 0
+
+    def charge(self, tokens):
+        if not tokens:
+            return
+        with self._lock:
+            self._roll()
+            self._used += tokens
+
+    def used(self):
+        with self._lock:
+            self._roll()
+            return self._used
+
+    def used_fraction(self):
+        return self.used() / self.daily_tokens if self.daily_tokens > 0 else 0.0
+
+
+class ModelRouter:
+    """Picks a ModelRoute per question from its intent, length and the token budget"""
+
+    def __init__(self, gemini_models, groq_models, small_model=None, large_model=None, simple_max_words=None,
+                 simple_max_tokens=None, complex_max_tokens=None, budget=None, downgrade_at=None):
+        small_model = small_model or Config.ROUTER_SMALL_MODEL
+        large_model = large_model or Config.ROUTER_LARGE_MODEL
+        self.simple_max_words = simple_max_words or Config.ROUTER_SIMPLE_MAX_WORDS
+        self.simple_max_tokens = simple_max_tokens or Config.ROUTER_SIMPLE_MAX_TOKENS
+        self.complex_max_tokens = complex_max_tokens or Config.ROUTER_COMPLEX_MAX_TOKENS
+        self.budget = budget
+        self.downgrade_at = Config.TOKEN_BUDGET_DOWNGRADE_AT if downgrade_at is None else downgrade_at
+        self.gemini_models = list(gemini_models)
+        # Small model first for factual questions, the larger one first for open-ended ones
+        self.small_groq_models = _promote(groq_models, small_model)
+        self.large_groq_models = _promote(groq_models, large_model)
+
+    def classify(self, question, follow_up=False):
+        """SIMPLE for short single-topic factual questions, else COMPLEX"""
+        if follow_up:
+            # Follow-ups lean on the conversation so far; leave them to the larger models
+            return COMPLEX
+        words = question.lower().split()
+        if not words or len(words) > self.simple_max_words:
+            return COMPLEX
+        if OPEN_ENDED_WORDS.intersection(word.strip('?.,!') for word in words):
+            return COMPLEX
+        if classify_intent(question) == 'out_of_context':
+            # The fallback would answer with a polite redirect, so the small model will do
+            return SIMPLE
+        scores = score_intents(question)
+        topics = [intent for intent in INTENT_PRIORITY if intent != 'out_of_context' and scores.get(intent)]
+        return SIMPLE if len(topics) == 1 else COMPLEX
+
+    def route(self, messages):
+        """ModelRoute for a Groq-style message list (the question is the last message)"""
+        question = messages[-1].get('content', '') if messages else ''
+        # System prompt plus the question; anything more is conversation history, which only
+        # matters when the question refers back to it
+        tier = self.classify(question, follow_up=is_follow_up(question, has_history=len(messages) > 2))
+        if self.budget is not None and self.budget.daily_tokens > 0:
+            used = self.budget.used_fraction()
+            if used >= 1.0:
+                tier = SIMPLE
+            elif used >= self.downgrade_at and tier == COMPLEX:
+                tier = ECONOMY
+        get_metrics_registry().inc('routed_questions', tier=tier)
+
+        if tier == SIMPLE:
+            return ModelRoute(tier, ('groq', 'gemini'), self.gemini_models, self.small_groq_models,
+                              self.simple_max_tokens)
+        if tier == ECONOMY:
+            return ModelRoute(tier, ('groq', 'gemini'), self.gemini_models, self.small_groq_models,
+                              self.complex_max_tokens)
+        return ModelRoute(tier, ('gemini', 'groq'), self.gemini_models, self.large_groq_models,
+                          self.complex_max_tokens)
+
+
+def _promote(models, model):
+    """Copy of models with model moved to the front (unchanged when it is not listed)"""
+    models = list(models)
+    if model in models:
+        models.remove(model)
+        models.insert(0, model)
+    return models
+
+
+def create_model_router(gemini_models, groq_models):
+    """Router configured from Config, or None when routing is disabled"""
+    if not Config.MODEL_ROUTER_ENABLED:
+        return None
+    # Each worker counts its own spend, so it gets an even share of the deployment's budget
+    share = max(1, Config.TOKEN_BUDGET_DAILY // max(1, Config.WORKER_PROCESSES))
+    budget = TokenBudget(share) if Config.TOKEN_BUDGET_DAILY > 0 else None
+    return ModelRouter(gemini_models, groq_models, budget=budget)
@@ -0,0 +1,66 @@
+"""
+Pre-rendered page cache for templates without per-request data
+"""
+import hashlib
+import logging
+import os
+import threading
+
+from flask import current_app, render_template
+
+from app.utils.assets import choose_encoding, compress_variants
+
+logger = logging.getLogger(__name__)
+
+
+class PrerenderedPage:
+    """Renders a template once and keeps the bytes, compressed variants and ETag in memory
+
+    The page is rendered lazily on the first request (URLs need a request
+    context) and again only when the template file changes on disk while
+    template auto-reload is enabled (debug mode).
+    """
+
+    def __init__(self, template_name):
+        self.template_name = template_name
+        # (variants, etag, template mtime), replaced as a whole so a request never mixes two renders
+        self.rendered = None
+        self._lock = threading.Lock()
+
+    def _template_mtime(self):
+        try:
+            path = os.path.join(current_app.root_path, current_app.template_folder, self.template_name)
+            return os.stat(path).st_mtime
+        except OSError:
+            return None
+
+    def _is_stale(self, rendered):
+        if rendered is None:
+            return True
+        if current_app.jinja_env.auto_reload:
+            return self._template_mtime() != rendered[2]
+        return False
+
+    def _render(self):
+        mtime = self._template_mtime()
+        body = render_template(self.template_name).encode('utf-8')
+        etag = hashlib.sha256(body).hexdigest()[:16]
+        logger.info(f"✅ Pre-rendered {self.template_name} ({len(body)} bytes, etag {etag})")
+        return compress_variants(body), etag, mtime
+
+    def get(self, accept_encoding):
+        """Return (body, content_encoding, etag) for the best encoding the client accepts"""
+        rendered = self.rendered
+        if self._is_stale(rendered):
+            with self._lock:
+                rendered = self.rendered
+                if self._is_stale(rendered):
+                    rendered = self.rendered = self._render()
+        variants, etag, _ = rendered
+        encoding = choose_encoding(variants, accept_encoding)
+        return variants[encoding], encoding, f"{etag}-{encoding}" if encoding else etag
+
+    def invalidate(self):
+        """Drop the rendered copy so the next request renders again"""
+        with self._lock:
+            self.rendered = None
@@ -0,0 +1,159 @@
+"""
+Admission control: per-client token buckets and per-provider concurrency slots
+"""
+import functools
+import inspect
+import threading
+import time
+from collections import OrderedDict
+
+from app.config.settings import Config
+
+
+class ClientRateLimiter:
+    """Token bucket per client key, bounded by LRU eviction of idle clients"""
+
+    def __init__(self, rate_per_minute=20, burst=5, max_clients=10000):
+        self.rate = rate_per_minute / 60.0
+        self.burst = burst
+        self.max_clients = max_clients
+        self._buckets = OrderedDict()  # key -> [tokens, last refill]
+        self._lock = threading.Lock()
+
+    def allow(self, key):
+        """Take one token for key; returns False when the client is over budget"""
+        now = time.monotonic()
+        with self._lock:
+            bucket = self._buckets.get(key)
+            if bucket is None:
+                bucket = self._buckets[key] = [float(self.burst), now]
+                if len(self._buckets) > self.max_clients:
+                    self._buckets.popitem(last=False)
+            else:
+                self._buckets.move_to_end(key)
+                bucket[0] = min(self.burst, bucket[0] + (now - bucket[1]) * self.rate)
+                bucket[1] = now
+            if bucket[0] < 1.0:
+                return False
+            bucket[0] -= 1.0
+            return True
+
+    def retry_after(self, key):
+        """Seconds until key has a whole token again"""
+        with self._lock:
+            bucket = self._buckets.get(key)
+            if bucket is None or bucket[0] >= 1.0:
+                return 0.0
+            return (1.0 - bucket[0]) / self.rate if self.rate else float('inf')
+
+
+class ProviderSlots:
+    """Global cap on concurrent calls per provider; never waits for a slot"""
+
+    def __init__(self, limits):
+        self.limits = dict(limits)
+        self._in_use = {provider: 0 for provider in limits}
+        self._lock = threading.Lock()
+
+    def try_acquire(self, provider):
+        """Take a slot if one is free right now"""
+        with self._lock:
+            if self._in_use[provider] >= self.limits[provider]:
+                return False
+            self._in_use[provider] += 1
+            return True
+
+    def release(self, provider):
+        with self._lock:
+            if not self._in_use[provider]:
+                raise ValueError(f"{provider} slot released more often than it was taken")
+            self._in_use[provider] -= 1
+
+    def in_use(self):
+        """Slots currently held per provider"""
+        with self._lock:
+            return dict(self._in_use)
+
+
+def provider_slot(provider):
+    """Run a provider call on the manager only when one of the provider's slots is free
+
+    Works for plain methods (returns None when rejected) and for sync or
+    async generator methods (yield nothing when rejected). Methods of
+    helper objects reach the manager through their ``manager`` attribute.
+    """
+    def decorator(method):
+        if inspect.isasyncgenfunction(method):
+            @functools.wraps(method)
+            async def async_wrapper(self, *args, **kwargs):
+                manager = getattr(self, 'manager', self)
+                if not manager.acquire_provider_slot(provider):
+                    return
+                stream = method(self, *args, **kwargs)
+                try:
+                    async for item in stream:
+                        yield item
+                finally:
+                    await stream.aclose()
+                    manager.provider_slots.release(provider)
+            return async_wrapper
+
+        if inspect.isgeneratorfunction(method):
+            @functools.wraps(method)
+            def generator_wrapper(self, *args, **kwargs):
+                manager = getattr(self, 'manager', self)
+                if not manager.acquire_provider_slot(provider):
+                    return
+                try:
+                    yield from method(self, *args, **kwargs)
+                finally:
+                    manager.provider_slots.release(provider)
+            return generator_wrapper
+
+        @functools.wraps(method)
+        def wrapper(self, *args, **kwargs):
+            manager = getattr(self, 'manager', self)
+            if not manager.acquire_provider_slot(provider):
+                return None
+            try:
+                return method(self, *args, **kwargs)
+            finally:
+                manager.provider_slots.release(provider)
+        return wrapper
+    return decorator
+
+
+def client_key(request):
+    """Client IP, taken from X-Forwarded-For as appended by the trusted proxy hops"""
+    hops = Config.RATE_LIMIT_PROXY_HOPS
+    route = request.access_route
+    if hops and len(route) >= hops and request.headers.get('X-Forwarded-For'):
+        # The rightmost entries were added by our own proxies; anything left of them is client-controlled
+        return route[-hops]
+    return request.remote_addr or 'unknown'
+
+
+def create_provider_slots():
+    """Build provider slots from the application configuration"""
+    return ProviderSlots({
+        'gemini': Config.GEMINI_MAX_CONCURRENCY,
+        'groq': Config.GROQ_MAX_CONCURRENCY
+    })
+
+
+# Global client rate limiter instance
+rate_limiter = None
+_rate_limiter_lock = threading.Lock()
+
+def get_rate_limiter():
+    """Get or create the per-client rate limiter"""
+    global rate_limiter
+    if rate_limiter is None:
+        with _rate_limiter_lock:
+            if rate_limiter is None:
+                rate_limiter = ClientRateLimiter(
+                    rate_per_minute=Config.RATE_LIMIT_PER_MINUTE,
+                    burst=Config.RATE_LIMIT_BURST,
+                    max_clients=Config.RATE_LIMIT_MAX_CLIENTS
+                )
+    return rate_limiter
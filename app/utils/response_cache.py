@@ -0,0 +1,173 @@
+"""
+Response cache for chat answers
+"""
+import hashlib
+import logging
+import re
+import threading
+import time
+from collections import OrderedDict
+
+from app.config.settings import Config
+
+logger = logging.getLogger(__name__)
+
+# Words that carry no meaning for matching portfolio questions
+STOPWORDS = frozenset([
+    'a', 'an', 'the', 'is', 'are', 'was', 'were', 'be', 'been', 'am', 'do', 'does', 'did',
+    'what', 'which', 'who', 'whom', 'how', 'can', 'could', 'would', 'should', 'will',
+    'you', 'your', 'me', 'my', 'i', 'he', 'his', 'him', 'she', 'her', 'they', 'their',
+    'about', 'of', 'to', 'in', 'on', 'at', 'for', 'with', 'and', 'or', 'tell', 'please',
+    'raviteja', 'raviteja\'s', 'ravi', 'some', 'any', 'has', 'have', 'had', 'that', 'this',
+    'there', 'it', 'its', 'give', 'list', 'show', 'know', 'describe', 'explain'
+])
+
+_TOKEN_RE = re.compile(r"[a-z0-9+#']+")
+
+
+def _fold_word(word):
+    """Cheap plural folding so 'skills' and 'skill' share a key"""
+    word = word.strip("'")
+    if len(word) > 3 and word.endswith('s') and not word.endswith('ss'):
+        return word[:-1]
+    return word
+
+
+def tokenize(text):
+    """Lower-cased, plural-folded content words of a text, stopwords removed"""
+    words = (_fold_word(token) for token in _TOKEN_RE.findall(text.lower()) if token not in STOPWORDS)
+    return [word for word in words if word]
+
+
+def normalize_question(message):
+    """Fold case, punctuation and stopwords so equivalent questions share a key"""
+    return ' '.join(sorted(set(tokenize(message))))
+
+
+def _trigrams(key):
+    """Character trigrams used for fuzzy matching of normalized keys"""
+    padded = f"  {key} "
+    return frozenset(padded[i:i + 3] for i in range(len(padded) - 2))
+
+
+def context_fingerprint(context):
+    """Short stable hash of the prompt context"""
+    return hashlib.sha256(context.encode('utf-8')).hexdigest()[:16]
+
+
+class ResponseCache:
+    """Bounded LRU cache of chat answers with TTL and context invalidation"""
+
+    def __init__(self, max_size=256, ttl=3600, similarity=0.8):
+        self.max_size = max_size
+        self.ttl = ttl
+        self.similarity = similarity
+        self._entries = OrderedDict()  # key -> (response, api_used, expires_at, trigrams)
+        self._lock = threading.Lock()
+        self._context = None
+        self._context_hash = None
+        self.hits = 0
+        self.misses = 0
+
+    def _check_context(self, context):
+        """Drop every entry when the prompt context has changed (caller holds the lock)"""
+        if context is self._context:
+            return
+        fingerprint = context_fingerprint(context)
+        if fingerprint != self._context_hash:
+            if self._entries:
+                logger.info("♻️ Resume context changed, clearing response cache")
+            self._entries.clear()
+            self._context_hash = fingerprint
+        self._context = context
+
+    def _find_similar(self, key, candidates):
+        """Return the closest key among (key, trigrams) candidates above the similarity threshold"""
+        grams = _trigrams(key)
+        best_key, best_score = None, self.similarity
+        for other, other_grams in candidates:
+            union = len(grams | other_grams)
+            score = len(grams & other_grams) / union if union else 0
+            if score >= best_score:
+                best_key, best_score = other, score
+        return best_key
+
+    def _hit(self, key):
+        """Return the live entry for key as (response, api_used), counting the hit, or None (caller holds the lock)"""
+        entry = self._entries.get(key)
+        if entry is None:
+            return None
+        self._entries.move_to_end(key)
+        self.hits += 1
+        return entry[0], entry[1]
+
+    def get(self, message, context):
+        """Return (response, api_used) for a cached answer, or None"""
+        key = normalize_question(message)
+        if not key:
+            return None
+        now = time.monotonic()
+        with self._lock:
+            self._check_context(context)
+            entry = self._entries.get(key)
+            if entry is not None and entry[2] < now:
+                del self._entries[key]
+            hit = self._hit(key)
+            if hit is not None:
+                return hit
+            if self.similarity >= 1:
+                self.misses += 1
+                return None
+            # Score a snapshot outside the lock so a fuzzy scan never stalls other lookups
+            candidates = [
+                (other, other_grams) for other, (_, _, expires_at, other_grams) in self._entries.items()
+                if expires_at >= now
+            ]
+        similar = self._find_similar(key, candidates)
+        with self._lock:
+            # The match may have been evicted while it was being scored
+            hit = self._hit(similar) if similar is not None else None
+            if hit is None:
+                self.misses += 1
+            return hit
+
+    def put(self, message, context, response, api_used, ttl=None):
+        """Store a provider answer for the normalized question (ttl overrides the default lifetime)"""
+        key = normalize_question(message)
+        if not response or not key:
+            return
+        with self._lock:
+            self._check_context(context)
+            lifetime = self.ttl if ttl is None else ttl
+            self._entries[key] = (response, api_used, time.monotonic() + lifetime, _trigrams(key))
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+
+    def clear(self):
+        """Remove all cached answers"""
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self):
+        """Return cache size and hit/miss counters"""
+        with self._lock:
+            return {'size': len(self._entries), 'hits': self.hits, 'misses': self.misses}
+
+
+# Global response cache instance
+response_cache = None
+_response_cache_lock = threading.Lock()
+
+def get_response_cache():
+    """Get or create the response cache instance (thread-safe)"""
+    global response_cache
+    if response_cache is None:
+        with _response_cache_lock:
+            if response_cache is None:
+                response_cache = ResponseCache(
+                    max_size=Config.RESPONSE_CACHE_SIZE,
+                    ttl=Config.RESPONSE_CACHE_TTL,
+                    similarity=Config.RESPONSE_CACHE_SIMILARITY
+                )
+    return response_cache
@@ -1,9 +1,10 @@
 """
 Resume Context and Fallback Responses
 """
+import re
 
-# Resume context for AI
-RESUME_CONTEXT = """
+# Assistant rules: tone, scope and paragraph formatting
+RESUME_RULES = """
 You are Raviteja's professional portfolio assistant. Follow these strict guidelines:
 
 MOST IMPORTANT - PARAGRAPH FORMATTING:
@@ -26,7 +27,10 @@ CRITICAL FORMATTING REQUIREMENTS - MUST FOLLOW:
 - Each paragraph should be 1-3 sentences only
 - Always add blank lines between different sections of your response
 
-RAVITEJA'S PROFESSIONAL PROFILE:
+"""
+
+# Professional profile facts (the part retrieval narrows down per question)
+RESUME_PROFILE = """RAVITEJA'S PROFESSIONAL PROFILE:
 
 CURRENT ROLE: Associate Software Engineer at Kadel Labs (Sep 2025 - Present)
 - Raviteja developed data collection platforms and automated Apache Airflow pipelines to aggregate multi-source datasets for AI model training, storing them in cloud and relational database environments
@@ -51,11 +55,17 @@ KEY PROJECTS:
 EDUCATION: Bachelor of Computer Applications, REVA University (CGPA: 8.22)
 Professional certifications in Full Stack Development and Deep Learning
 
-IMPORTANT: This is Raviteja's first professional role. Focus on growth, achievements, and technical excellence demonstrated in current position.
+"""
+
+# Guidance on how to present the profile
+RESUME_GUIDANCE = """IMPORTANT: This is Raviteja's first professional role. Focus on growth, achievements, and technical excellence demonstrated in current position.
 
 RESPONSE APPROACH: Always frame responses positively, emphasize unique value propositions, and connect background to professional opportunities.
 
-MANDATORY FORMATTING EXAMPLES - FOLLOW EXACTLY:
+"""
+
+# Formatting examples the model must follow
+RESUME_FORMAT_EXAMPLES = """MANDATORY FORMATTING EXAMPLES - FOLLOW EXACTLY:
 
 For project questions, format like this:
 "Raviteja has developed several AI projects demonstrating his technical expertise.
@@ -76,6 +86,9 @@ CLOUD & TOOLS: GCP, Docker, MongoDB, MySQL, Vector Databases"
 CRITICAL: Always include blank line between intro paragraph and details section.
 """
 
+# Resume context for AI
+RESUME_CONTEXT = RESUME_RULES + RESUME_PROFILE + RESUME_GUIDANCE + RESUME_FORMAT_EXAMPLES
+
 # Professional fallback responses (no emojis, formal tone)
 FALLBACK_RESPONSES = {
     'experience': """Raviteja currently serves as Associate Software Engineer at Kadel Labs, having been promoted from his initial Trainee role within six months.
@@ -142,30 +155,76 @@ I can provide information about:
 Please ask specific questions about his professional profile. How may I assist you today?"""
 }
 
-def get_smart_fallback_response(message):
-    """Smart fallback when AI APIs are unavailable"""
-    message_lower = message.lower().strip()
-    
-    # Check for clearly out-of-context questions
-    out_of_context_keywords = [
-        'weather', 'food', 'movie', 'music', 'sports', 'politics', 'news', 
-        'personal', 'family', 'relationship', 'hobby', 'travel', 'health',
+# Keywords per intent; each matches as a whole word with an optional plural/verb suffix
+INTENT_KEYWORDS = {
+    'out_of_context': [
+        'weather', 'food', 'movie', 'music', 'sport', 'politics', 'news',
+        'personal', 'family', 'relationship', 'hobby', 'hobbies', 'travel', 'health',
         'recipe', 'joke', 'game', 'entertainment', 'celebrity', 'fashion',
         'shopping', 'restaurant', 'book', 'tv show', 'animal', 'nature',
-        'cooking', 'cook'
+        'cook'
+    ],
+    'experience': [
+        'experience', 'work', 'job', 'role', 'career', 'position', 'current',
+        'doing', 'prior', 'before', 'previous', 'company', 'employer', 'kadel'
+    ],
+    'skills': [
+        'skill', 'technology', 'technologies', 'programming', 'tech', 'language',
+        'framework', 'tool', 'stack', 'expertise'
+    ],
+    'projects': [
+        'project', 'portfolio', 'built', 'develop', 'created', 'app', 'application',
+        'build', 'made'
+    ],
+    'education': [
+        'education', 'degree', 'university', 'study', 'studies', 'college',
+        'certification', 'school', 'graduate', 'cgpa'
     ]
-    
-    if any(word in message_lower for word in out_of_context_keywords):
-        return FALLBACK_RESPONSES['out_of_context']
-    
-    # For career questions, provide basic info
-    if any(word in message_lower for word in ['experience', 'work', 'job', 'role', 'career', 'position', 'current', 'doing', 'working', 'prior', 'before', 'previous']):
-        return FALLBACK_RESPONSES['experience']
-    elif any(word in message_lower for word in ['skill', 'technology', 'programming', 'tech', 'language', 'framework', 'tools', 'stack']):
-        return FALLBACK_RESPONSES['skills']
-    elif any(word in message_lower for word in ['project', 'portfolio', 'built', 'developed', 'created', 'app', 'build', 'made']):
-        return FALLBACK_RESPONSES['projects']
-    elif any(word in message_lower for word in ['education', 'degree', 'university', 'study', 'college', 'certification', 'school', 'graduate']):
-        return FALLBACK_RESPONSES['education']
-    else:
-        return FALLBACK_RESPONSES['default'] 
\ No newline at end of file
+}
+
+# Tie-break order between equally scored intents (mirrors the original precedence)
+INTENT_PRIORITY = ['out_of_context', 'experience', 'skills', 'projects', 'education']
+
+_WORD_RE = re.compile(r"[a-z]+")
+_SUFFIXES = ('', 's', 'es', 'ed', 'ing')
+
+def _build_intent_matcher(intent_keywords):
+    """Expand every keyword and its suffixed forms into one word -> intent lookup table"""
+    word_intents = {}
+    for intent, keywords in intent_keywords.items():
+        for keyword in keywords:
+            for suffix in _SUFFIXES:
+                word_intents.setdefault(keyword + suffix, intent)
+    # Last words of multi-word keywords ('tv show' -> 'show', 'shows') trigger a bigram lookup
+    phrase_tails = frozenset(phrase.rsplit(' ', 1)[1] for phrase in word_intents if ' ' in phrase)
+    return word_intents, phrase_tails
+
+_WORD_INTENTS, _PHRASE_TAILS = _build_intent_matcher(INTENT_KEYWORDS)
+
+def score_intents(message):
+    """Count whole-word keyword hits per intent in a single tokenizing pass"""
+    scores = {}
+    previous = None
+    for word in _WORD_RE.findall(message.lower()):
+        intent = _WORD_INTENTS.get(word)
+        if intent is None and word in _PHRASE_TAILS:
+            intent = _WORD_INTENTS.get(f"{previous} {word}")
+        if intent is not None:
+            scores[intent] = scores.get(intent, 0) + 1
+        previous = word
+    return scores
+
+def classify_intent(message):
+    """Return the best matching FALLBACK_RESPONSES key for a message"""
+    scores = score_intents(message)
+    if not scores:
+        return 'default'
+    best = INTENT_PRIORITY[0]
+    for intent in INTENT_PRIORITY[1:]:
+        if scores.get(intent, 0) > scores.get(best, 0):
+            best = intent
+    return best
+
+def get_smart_fallback_response(message):
+    """Smart fallback when AI APIs are unavailable"""
+    return FALLBACK_RESPONSES[classify_intent(message)]
@@ -0,0 +1,297 @@
+"""
+Local TF-IDF retrieval over the resume PDF and profile context
+
+Build the on-disk index once (it is also rebuilt in memory when missing or stale):
+
+    python -m app.utils.retrieval
+
+The index is a JSON metadata file plus a binary inverted index that is
+memory-mapped at runtime, so each worker shares the pages with the OS
+page cache instead of holding its own copy.
+"""
+import array
+import hashlib
+import heapq
+import json
+import logging
+import math
+import mmap
+import os
+import re
+import threading
+from collections import Counter
+
+from app.config.settings import Config
+from app.utils.response_cache import tokenize
+from app.utils.resume_context import FALLBACK_RESPONSES, RESUME_PROFILE
+
+logger = logging.getLogger(__name__)
+
+try:
+    from pypdf import PdfReader
+    PDF_AVAILABLE = True
+except ImportError:
+    PDF_AVAILABLE = False
+    logger.warning("⚠️  pypdf not available - resume PDF will not be indexed (pip install pypdf)")
+
+INDEX_VERSION = 1
+
+# Longest chunk we keep before splitting an entry at its bullets
+MAX_CHUNK_CHARS = 700
+
+# "CURRENT ROLE: ..." / "KEY PROJECTS:" style headings in RESUME_PROFILE
+_PROFILE_HEADING_RE = re.compile(r"^([A-Z][A-Z '&/-]+):\s*(.*)$")
+# Stand-alone upper-case section lines in the PDF text ("EXPERIENCE", "PROFILE SUMMARY")
+_PDF_HEADING_RE = re.compile(r"^[A-Z][A-Z &/-]{2,}$")
+
+
+def _chunk(source, title, text):
+    return {'source': source, 'title': title, 'text': text.strip()}
+
+
+def chunk_profile(profile):
+    """Split RESUME_PROFILE into one chunk per heading"""
+    chunks = []
+    title, lines = None, []
+    for line in profile.splitlines():
+        match = _PROFILE_HEADING_RE.match(line.strip())
+        if match:
+            if title and ''.join(lines).strip():
+                chunks.append(_chunk('profile', title, '\n'.join(lines)))
+            title, lines = match.group(1), [match.group(2)] if match.group(2) else []
+        elif title is not None:
+            lines.append(line)
+    if title and ''.join(lines).strip():
+        chunks.append(_chunk('profile', title, '\n'.join(lines)))
+    return chunks
+
+
+def chunk_fallbacks(responses):
+    """Curated fallback answers are already topic-sized chunks"""
+    return [
+        _chunk(f'fallback:{key}', key.upper(), text)
+        for key, text in responses.items()
+        if key not in ('out_of_context', 'default')
+    ]
+
+
+def chunk_pdf_text(text):
+    """Split extracted resume text into section/entry chunks"""
+    sections = []
+    title, lines = 'SUMMARY', []
+    for raw in text.splitlines():
+        line = raw.strip()
+        if not line:
+            continue
+        if _PDF_HEADING_RE.match(line):
+            sections.append((title, lines))
+            title, lines = line, []
+        elif lines and lines[-1].startswith('•') and not line.startswith('•') and not lines[-1].endswith('.'):
+            # Wrapped bullet from the PDF layout, glue it back onto the previous line
+            lines[-1] = f"{lines[-1]} {line}"
+        else:
+            lines.append(line)
+    sections.append((title, lines))
+
+    chunks = []
+    for title, lines in sections:
+        if not lines:
+            continue
+        text = '\n'.join(lines)
+        if len(text) <= MAX_CHUNK_CHARS:
+            chunks.append(_chunk('pdf', title, text))
+            continue
+        # Long section: one chunk per entry (a non-bullet line and the bullets under it)
+        entry = []
+        for line in lines:
+            if not line.startswith('•') and entry and entry[-1].startswith('•'):
+                chunks.append(_chunk('pdf', title, '\n'.join(entry)))
+                entry = []
+            entry.append(line)
+        if entry:
+            chunks.append(_chunk('pdf', title, '\n'.join(entry)))
+    return chunks
+
+
+def read_pdf_text(pdf_path):
+    """Extract plain text from the resume PDF, or '' when unavailable"""
+    if not PDF_AVAILABLE or not pdf_path or not os.path.exists(pdf_path):
+        return ''
+    try:
+        reader = PdfReader(pdf_path)
+        return '\n'.join(page.extract_text() or '' for page in reader.pages)
+    except Exception as e:
+        logger.error(f"❌ Failed to read resume PDF for indexing: {e}")
+        return ''
+
+
+def source_fingerprint(pdf_path):
+    """Hash of everything the index is built from, used to detect a stale index"""
+    digest = hashlib.sha256()
+    digest.update(RESUME_PROFILE.encode('utf-8'))
+    digest.update(json.dumps(FALLBACK_RESPONSES, sort_keys=True).encode('utf-8'))
+    digest.update(str(PDF_AVAILABLE).encode('utf-8'))
+    if pdf_path and os.path.exists(pdf_path):
+        with open(pdf_path, 'rb') as handle:
+            digest.update(handle.read())
+    return digest.hexdigest()[:16]
+
+
+class RetrievalIndex:
+    """Inverted TF-IDF index: term -> postings of (chunk id, L2-normalized weight)"""
+
+    def __init__(self, chunks, vocab, term_offsets, chunk_ids, weights, fingerprint):
+        self.chunks = chunks
+        self.vocab = vocab                # term -> (term id, idf)
+        self.term_offsets = term_offsets  # postings of term t are [offsets[t], offsets[t + 1])
+        self.chunk_ids = chunk_ids
+        self.weights = weights
+        self.fingerprint = fingerprint
+
+    @classmethod
+    def build(cls, chunks, fingerprint):
+        """Compute TF-IDF postings for a list of chunks"""
+        documents = [Counter(tokenize(f"{chunk['title']} {chunk['text']}")) for chunk in chunks]
+        document_frequency = Counter(term for document in documents for term in document)
+        total = len(documents)
+        terms = sorted(document_frequency)
+        idf = {term: math.log((1 + total) / (1 + document_frequency[term])) + 1 for term in terms}
+
+        postings = {term: [] for term in terms}
+        for chunk_id, document in enumerate(documents):
+            weighted = {term: (1 + math.log(count)) * idf[term] for term, count in document.items()}
+            norm = math.sqrt(sum(weight * weight for weight in weighted.values())) or 1.0
+            for term, weight in weighted.items():
+                postings[term].append((chunk_id, weight / norm))
+
+        vocab = {}
+        term_offsets = array.array('i', [0])
+        chunk_ids = array.array('i')
+        weights = array.array('f')
+        for term_id, term in enumerate(terms):
+            vocab[term] = (term_id, idf[term])
+            for chunk_id, weight in postings[term]:
+                chunk_ids.append(chunk_id)
+                weights.append(weight)
+            term_offsets.append(len(chunk_ids))
+        return cls(chunks, vocab, term_offsets, chunk_ids, weights, fingerprint)
+
+    def save(self, base_path):
+        """Write <base>.json metadata and <base>.bin postings"""
+        os.makedirs(os.path.dirname(base_path) or '.', exist_ok=True)
+        blobs = [self.term_offsets.tobytes(), self.chunk_ids.tobytes(), self.weights.tobytes()]
+        with open(f"{base_path}.bin", 'wb') as handle:
+            for blob in blobs:
+                handle.write(blob)
+        meta = {
+            'version': INDEX_VERSION,
+            'fingerprint': self.fingerprint,
+            'chunks': self.chunks,
+            'vocab': self.vocab,
+            'lengths': [len(self.term_offsets), len(self.chunk_ids), len(self.weights)]
+        }
+        with open(f"{base_path}.json", 'w', encoding='utf-8') as handle:
+            json.dump(meta, handle)
+
+    @classmethod
+    def load(cls, base_path):
+        """Memory-map a saved index; returns None when missing or incompatible"""
+        try:
+            with open(f"{base_path}.json", encoding='utf-8') as handle:
+                meta = json.load(handle)
+            if meta.get('version') != INDEX_VERSION:
+                return None
+            with open(f"{base_path}.bin", 'rb') as handle:
+                mapped = mmap.mmap(handle.fileno(), 0, access=mmap.ACCESS_READ)
+        except (OSError, ValueError):
+            return None
+
+        view = memoryview(mapped)
+        offsets_len, ids_len, weights_len = meta['lengths']
+        position = 0
+        term_offsets = view[position:position + offsets_len * 4].cast('i')
+        position += offsets_len * 4
+        chunk_ids = view[position:position + ids_len * 4].cast('i')
+        position += ids_len * 4
+        weights = view[position:position + weights_len * 4].cast('f')
+        vocab = {term: tuple(entry) for term, entry in meta['vocab'].items()}
+        return cls(meta['chunks'], vocab, term_offsets, chunk_ids, weights, meta['fingerprint'])
+
+    def search(self, question, top_k):
+        """Return the top_k chunks by cosine similarity to the question"""
+        scores = {}
+        for term, count in Counter(tokenize(question)).items():
+            entry = self.vocab.get(term)
+            if entry is None:
+                continue
+            term_id, idf = entry
+            query_weight = (1 + math.log(count)) * idf
+            for position in range(self.term_offsets[term_id], self.term_offsets[term_id + 1]):
+                chunk_id = self.chunk_ids[position]
+                scores[chunk_id] = scores.get(chunk_id, 0.0) + query_weight * self.weights[position]
+        best = heapq.nlargest(top_k, scores.items(), key=lambda item: item[1])
+        return [self.chunks[chunk_id] for chunk_id, _ in best]
+
+
+def collect_chunks(pdf_path):
+    """All indexable chunks: profile headings, curated answers and the resume PDF"""
+    chunks = chunk_profile(RESUME_PROFILE) + chunk_fallbacks(FALLBACK_RESPONSES)
+    chunks += chunk_pdf_text(read_pdf_text(pdf_path))
+    return chunks
+
+
+def build_index(pdf_path=None):
+    """Build a fresh index from the current sources"""
+    pdf_path = pdf_path or Config.RESUME_PATH
+    return RetrievalIndex.build(collect_chunks(pdf_path), source_fingerprint(pdf_path))
+
+
+def format_excerpts(chunks):
+    """Render retrieved chunks for the prompt"""
+    sections = [f"{chunk['title']}:\n{chunk['text']}" for chunk in chunks]
+    return "RELEVANT PROFILE EXCERPTS:\n\n" + "\n\n".join(sections) + "\n\n"
+
+
+def retrieve_profile_context(question, top_k=None, max_chars=None):
+    """Profile text for one question: top-k excerpts, or the full profile when nothing matches"""
+    max_chars = max_chars or Config.RAG_MAX_CONTEXT_CHARS
+    selected, used = [], 0
+    for chunk in get_retrieval_index().search(question, top_k or Config.RAG_TOP_K):
+        # Keep the best match even if it is long, then stay within the character budget
+        if selected and used + len(chunk['text']) > max_chars:
+            continue
+        selected.append(chunk)
+        used += len(chunk['text'])
+    if not selected:
+        return RESUME_PROFILE
+    return format_excerpts(selected)
+
+
+# Global retrieval index instance
+retrieval_index = None
+_retrieval_lock = threading.Lock()
+
+def get_retrieval_index():
+    """Load the on-disk index, rebuilding in memory when it is missing or stale"""
+    global retrieval_index
+    if retrieval_index is None:
+        with _retrieval_lock:
+            if retrieval_index is None:
+                fingerprint = source_fingerprint(Config.RESUME_PATH)
+                index = RetrievalIndex.load(Config.RAG_INDEX_PATH)
+                if index is None or index.fingerprint != fingerprint:
+                    logger.warning("⚠️ Retrieval index missing or stale, building in memory")
+                    index = build_index()
+                retrieval_index = index
+    return retrieval_index
+
+
+def main():
+    """Build the retrieval index and write it next to the resume"""
+    index = build_index()
+    index.save(Config.RAG_INDEX_PATH)
+    print(f"✅ Indexed {len(index.chunks)} chunks, {len(index.vocab)} terms -> {Config.RAG_INDEX_PATH}.bin/.json")
+
+
+if __name__ == '__main__':
+    main()
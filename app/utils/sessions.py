@@ -0,0 +1,261 @@
+"""
+Server-side chat sessions: bounded conversation history per visitor
+
+Each session keeps its most recent turns in a ring buffer. When the turns
+exceed the per-session token budget, the oldest turns are folded into a
+short extractive summary, so follow-up questions have context while the
+prompt stays bounded. Sessions live in a bounded in-process LRU store; a
+different store can be plugged in with ``SESSION_STORE``. The in-process
+store is private to each gunicorn worker, so by default sessions are only
+enabled when a single worker serves the app.
+
+Only questions that refer back to the conversation ("tell me more about
+that one") are answered with the history. Questions that stand on their
+own are answered like a first question, from the response cache when
+possible.
+"""
+import importlib
+import logging
+import re
+import secrets
+import threading
+import time
+from collections import OrderedDict, deque
+
+from app.config.settings import Config
+
+logger = logging.getLogger(__name__)
+
+SESSION_COOKIE = 'chat_session'
+
+_SESSION_ID_RE = re.compile(r'^[A-Za-z0-9_-]{16,64}$')
+_SENTENCE_RE = re.compile(r'(?<=[.!?])\s')
+
+# Phrases that only make sense as a reference back to the conversation ("what about that one?")
+_REFERENCE_RE = re.compile(
+    r"\b(?:same|former|latter|above"
+    r"|(?:previous|earlier|last) (?:answer|question|reply|response|one)"
+    r"|(?:first|second|third|last|other|that|this|these|those) ones?"
+    r"|you (?:just )?(?:said|mentioned|listed)"
+    r"|(?:what|anything) else"
+    r"|(?:what|how) about (?:it|that|this|them|these|those)"
+    r"|more (?:about|on) (?:it|that|this|them|these|those)"
+    r"|tell me more(?=\W*$))\b",
+    re.IGNORECASE
+)
+# Pronouns that point back in a short question ("Is it open source?") but rarely in a longer one
+# ("What is it like to work with him?")
+_PRONOUN_RE = re.compile(r"\b(?:it|its|that|this|these|those|they|them|their|there)\b", re.IGNORECASE)
+PRONOUN_FOLLOW_UP_MAX_WORDS = 6
+# Bare continuations such as "Why?" or "How so?"
+_CONTINUATION_WORDS = frozenset({'why', 'how', 'and', 'so', 'really'})
+
+
+def estimate_tokens(text):
+    """Rough token count (about four characters per token) used for history budgets"""
+    return (len(text) + 3) // 4
+
+
+def new_session_id():
+    return secrets.token_urlsafe(18)
+
+
+def valid_session_id(session_id):
+    """Only accept ids shaped like the ones we issue"""
+    return bool(session_id) and bool(_SESSION_ID_RE.match(session_id))
+
+
+def is_follow_up(question, has_history):
+    """True when a question refers back to an earlier turn rather than standing on its own
+
+    Without earlier turns there is nothing to refer to. Everyday pronouns
+    only count in short questions, so "Tell me more about his projects" or
+    "Is there a way to contact him?" are still answered from the cache.
+    """
+    if not has_history:
+        return False
+    words = [word.strip('?.,!') for word in question.lower().split()]
+    if words and len(words) <= 3 and words[0] in _CONTINUATION_WORDS:
+        return True
+    if _REFERENCE_RE.search(question):
+        return True
+    return len(words) <= PRONOUN_FOLLOW_UP_MAX_WORDS and bool(_PRONOUN_RE.search(question))
+
+
+def sessions_enabled():
+    """SESSIONS_ENABLED, where 'auto' means only when every request sees the same sessions"""
+    if Config.SESSIONS_ENABLED == 'auto':
+        return bool(Config.SESSION_STORE) or Config.WORKER_PROCESSES <= 1
+    return Config.SESSIONS_ENABLED == 'true'
+
+
+def _first_sentence(text, limit):
+    sentence = _SENTENCE_RE.split(' '.join(text.split()), maxsplit=1)[0]
+    return sentence if len(sentence) <= limit else sentence[:limit - 1].rstrip() + '…'
+
+
+class ChatSession:
+    """Conversation history of one visitor: recent turns plus a summary of older ones"""
+
+    def __init__(self, session_id, max_turns=10, history_tokens=1200, summary_chars=600):
+        self.session_id = session_id
+        self.history_tokens = history_tokens
+        self.summary_chars = summary_chars
+        self.turns = deque(maxlen=max_turns)  # (question, answer) pairs, oldest first
+        self.summary = ''
+        self.updated = time.time()
+        self.lock = threading.Lock()
+
+    def history(self):
+        """Return (summary, [(question, answer), ...]) to build the next prompt from"""
+        with self.lock:
+            return self.summary, list(self.turns)
+
+    def has_history(self):
+        return bool(self.summary or self.turns)
+
+    def last_question(self):
+        with self.lock:
+            return self.turns[-1][0] if self.turns else ''
+
+    def record(self, question, answer):
+        """Append a turn, then compact older turns until the history fits the token budget"""
+        with self.lock:
+            if len(self.turns) == self.turns.maxlen:
+                self._fold(self.turns.popleft())
+            self.turns.append((question, answer))
+            # The newest turn always stays verbatim, however long it is
+            while len(self.turns) > 1 and self._turn_tokens() > self.history_tokens:
+                self._fold(self.turns.popleft())
+            self.updated = time.time()
+
+    def _turn_tokens(self):
+        return sum(estimate_tokens(question) + estimate_tokens(answer) for question, answer in self.turns)
+
+    def _fold(self, turn):
+        """Summarize a turn in one line and keep only the most recent summary text"""
+        question, answer = turn
+        line = f"- Asked: {_first_sentence(question, 120)} Answered: {_first_sentence(answer, 160)}"
+        summary = f"{self.summary}\n{line}" if self.summary else line
+        if len(summary) > self.summary_chars:
+            # Drop whole lines from the front so the summary stays readable
+            lines = summary.split('\n')
+            while len(lines) > 1 and len('\n'.join(lines)) > self.summary_chars:
+                lines.pop(0)
+            summary = '\n'.join(lines)[-self.summary_chars:]
+        self.summary = summary
+
+    def to_dict(self):
+        """Plain-data form for stores that serialize sessions"""
+        with self.lock:
+            return {
+                'session_id': self.session_id,
+                'turns': [list(turn) for turn in self.turns],
+                'summary': self.summary,
+                'updated': self.updated
+            }
+
+    @classmethod
+    def from_dict(cls, data, **limits):
+        session = cls(data['session_id'], **limits)
+        session.turns.extend(tuple(turn) for turn in data.get('turns', []))
+        session.summary = data.get('summary', '')
+        session.updated = data.get('updated', time.time())
+        return session
+
+
+class SessionStore:
+    """Storage backend for chat sessions
+
+    Subclasses implement ``load`` and ``save``; ``size`` is optional and
+    only feeds the /metrics gauge.
+    """
+
+    def __init__(self, ttl=1800, **limits):
+        self.ttl = ttl
+        self.limits = limits
+
+    def get(self, session_id):
+        """Return the session for an id, starting a fresh one when it is unknown or expired"""
+        session = self.load(session_id)
+        if session is None or time.time() - session.updated > self.ttl:
+            session = ChatSession(session_id, **self.limits)
+        return session
+
+    def load(self, session_id):
+        raise NotImplementedError
+
+    def save(self, session):
+        raise NotImplementedError
+
+    def size(self):
+        return None
+
+
+class InMemorySessionStore(SessionStore):
+    """Bounded LRU of live sessions in this worker process"""
+
+    def __init__(self, max_sessions=5000, ttl=1800, **limits):
+        super().__init__(ttl=ttl, **limits)
+        self.max_sessions = max_sessions
+        self._sessions = OrderedDict()
+        self._lock = threading.Lock()
+
+    def load(self, session_id):
+        with self._lock:
+            session = self._sessions.get(session_id)
+            if session is not None:
+                self._sessions.move_to_end(session_id)
+            return session
+
+    def save(self, session):
+        with self._lock:
+            self._sessions[session.session_id] = session
+            self._sessions.move_to_end(session.session_id)
+            while len(self._sessions) > self.max_sessions:
+                self._sessions.popitem(last=False)
+
+    def size(self):
+        with self._lock:
+            return len(self._sessions)
+
+
+def _load_store_class(path):
+    """Import a store class from 'package.module:ClassName'"""
+    module_name, _, class_name = path.partition(':')
+    return getattr(importlib.import_module(module_name), class_name)
+
+
+# Global session store instance
+session_store = None
+_session_store_lock = threading.Lock()
+
+def get_session_store():
+    """Get or create the configured session store"""
+    global session_store
+    if session_store is None:
+        with _session_store_lock:
+            if session_store is None:
+                limits = {
+                    'max_turns': Config.SESSION_MAX_TURNS,
+                    'history_tokens': Config.SESSION_HISTORY_TOKENS,
+                    'summary_chars': Config.SESSION_SUMMARY_CHARS
+                }
+                store = None
+                if Config.SESSION_STORE:
+                    try:
+                        store = _load_store_class(Config.SESSION_STORE)(ttl=Config.SESSION_TTL_SECONDS, **limits)
+                        logger.info(f"✅ Using session store {Config.SESSION_STORE}")
+                    except Exception as e:
+                        logger.error(f"❌ Could not load session store {Config.SESSION_STORE}: {e}")
+                if store is None:
+                    if Config.WORKER_PROCESSES > 1:
+                        logger.warning(
+                            f"⚠️ Chat sessions kept per worker across {Config.WORKER_PROCESSES} workers; "
+                            "follow-ups reaching another worker lose their history (set SESSION_STORE)"
+                        )
+                    store = InMemorySessionStore(
+                        max_sessions=Config.SESSION_MAX_SESSIONS, ttl=Config.SESSION_TTL_SECONDS, **limits
+                    )
+                session_store = store
+    return session_store
@@ -0,0 +1,142 @@
+"""
+Server-sent events framing for the streaming chat endpoint
+
+Deltas from a flight are coalesced into frames bounded by time and size
+(the first delta goes out at once), metadata is sent once per stream,
+every response opens with a ``meta`` event naming its stream,
+idle periods carry keep-alive comments, and every frame has an event id
+``<stream_id>-<delta index>`` that a reconnecting client sends back as
+Last-Event-ID to resume from the replay buffer.
+"""
+import json
+import time
+import uuid
+
+from app.config.settings import Config
+from app.utils.deadline import deadline_passed, give_up_waiting, wait_timeout
+
+HEARTBEAT = ": keep-alive\n\n"
+
+# Sent with text/event-stream so proxies pass frames through unbuffered
+SSE_HEADERS = {
+    'Cache-Control': 'no-cache',
+    'X-Accel-Buffering': 'no',
+    'Access-Control-Allow-Origin': '*'
+}
+
+
+def format_event(data, event=None, event_id=None, retry=None):
+    """One SSE frame; dict data is JSON-encoded"""
+    lines = []
+    if retry is not None:
+        lines.append(f"retry: {retry}")
+    if event:
+        lines.append(f"event: {event}")
+    if event_id is not None:
+        lines.append(f"id: {event_id}")
+    if not isinstance(data, str):
+        data = json.dumps(data)
+    lines.extend(f"data: {line}" for line in data.split('\n'))
+    return '\n'.join(lines) + '\n\n'
+
+
+def done_event():
+    """The end-of-stream marker the chat widget waits for"""
+    return format_event('[DONE]')
+
+
+def meta_event(stream_id=None):
+    """The opening event of every chat stream; answers without a flight get a fresh stream id
+
+    The widget discards partial text when a reconnect opens a stream other
+    than the one it was reading.
+    """
+    return format_event({'stream_id': stream_id or uuid.uuid4().hex[:16]}, event='meta', retry=Config.SSE_RETRY_MS)
+
+
+def event_id(stream_id, index):
+    return f"{stream_id}-{index}"
+
+
+def parse_event_id(value):
+    """Split a Last-Event-ID into (stream_id, delta index), or None when malformed"""
+    stream_id, _, index = (value or '').strip().rpartition('-')
+    if not stream_id or not index.isdigit():
+        return None
+    return stream_id, int(index)
+
+
+def stream_flight(flight, start_index=0, state=None, flush_interval=None, flush_bytes=None, heartbeat=None):
+    """Yield SSE frames for a flight's deltas from start_index until the flight is done
+
+    state (a dict) receives 'text' (everything sent, including replayed
+    deltas), 'api_used', 'frames' and 'first_frame_at' (monotonic). Waits
+    are bounded by the request deadline; when it runs out, the flight is
+    cancelled, what arrived is flushed and state['expired'] is set.
+    """
+    flush_interval = Config.SSE_FLUSH_INTERVAL if flush_interval is None else flush_interval
+    flush_bytes = Config.SSE_FLUSH_BYTES if flush_bytes is None else flush_bytes
+    heartbeat = Config.SSE_HEARTBEAT_SECONDS if heartbeat is None else heartbeat
+    state = {} if state is None else state
+    state.setdefault('frames', 0)
+    # The index comes from the client; it can never have seen more than the flight produced
+    start_index = min(start_index, len(flight.deltas))
+    sent, index = [], start_index
+    if start_index:
+        sent = [delta for _, delta in flight.deltas[:start_index]]
+    pending, pending_since = [], None
+    api_used = None
+    last_write = time.monotonic()
+
+    yield meta_event(flight.stream_id)
+
+    while True:
+        now = time.monotonic()
+        waits = [last_write + heartbeat - now]
+        if pending:
+            waits.append(pending_since + flush_interval - now)
+        items, done = flight.read(index, wait_timeout(max(0.0, min(waits))))
+        index += len(items)
+        now = time.monotonic()
+        for item_api, delta in items:
+            if pending_since is None:
+                pending_since = now
+            pending.append(delta)
+            api_used = item_api
+
+        expired = not done and (deadline_passed() or flight.cancelled)
+        if expired:
+            flight.cancel()
+            give_up_waiting('stream')
+            state['expired'] = True
+
+        size = sum(len(delta) for delta in pending)
+        due = (
+            done
+            or expired
+            or state['frames'] == 0  # first delta goes out immediately for TTFT
+            or size >= flush_bytes
+            or (pending_since is not None and now - pending_since >= flush_interval)
+        )
+        if pending and due:
+            payload = {'chunk': ''.join(pending)}
+            if 'api_used' not in state:
+                # Metadata rides on the first frame only
+                payload['api_used'] = api_used
+                state['api_used'] = api_used
+                state['first_frame_at'] = now
+            sent.extend(pending)
+            pending, pending_since = [], None
+            state['frames'] += 1
+            last_write = now
+            yield format_event(payload, event_id=event_id(flight.stream_id, index))
+        elif now - last_write >= heartbeat:
+            last_write = now
+            yield HEARTBEAT
+
+        if done or expired:
+            break
+
+    if 'api_used' not in state and flight.deltas:
+        state['api_used'] = flight.deltas[-1][0]
+    state['text'] = ''.join(sent).strip()
@@ -0,0 +1,329 @@
+"""
+Structured logging and per-stage latency tracing for the chat path
+
+Application modules log through ``logging.getLogger(__name__)``. Records
+go onto an in-memory queue and a background listener thread formats them
+(JSON by default) and writes them to stdout, so request threads never
+block on stdout.
+
+Each chat request runs inside a trace. Spans time the stages (parse, cache
+lookup, prompt build, each provider/model attempt, fallback, stream first
+byte, stream complete) and feed latency histograms keyed by stage and
+labels (exported by /metrics). A trace emits one JSON summary line when
+it finishes.
+"""
+import atexit
+import bisect
+import contextvars
+import json
+import logging
+import logging.handlers
+import queue
+import sys
+import threading
+import time
+import uuid
+from contextlib import contextmanager
+from datetime import datetime, timezone
+
+from app.config.settings import Config
+
+# Upper bounds (seconds) of the latency histogram buckets
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+
+# Attributes every LogRecord has; anything else arrived through ``extra``
+_RECORD_ATTRIBUTES = set(vars(logging.LogRecord('', 0, '', 0, '', (), None))) | {'message', 'asctime'}
+
+logger = logging.getLogger(__name__)
+
+
+class JsonFormatter(logging.Formatter):
+    """One JSON object per line with the trace id and any ``extra`` fields"""
+
+    def format(self, record):
+        payload = {
+            'ts': datetime.fromtimestamp(record.created, tz=timezone.utc).isoformat(timespec='milliseconds'),
+            'level': record.levelname.lower(),
+            'logger': record.name,
+            'message': record.getMessage()
+        }
+        trace = getattr(record, 'trace_id', None)
+        if trace:
+            payload['trace_id'] = trace
+        for key, value in vars(record).items():
+            if key not in _RECORD_ATTRIBUTES and key not in payload:
+                payload[key] = value
+        if record.exc_info:
+            payload['exc_info'] = self.formatException(record.exc_info)
+        return json.dumps(payload, ensure_ascii=False, default=str)
+
+
+class TraceIdFilter(logging.Filter):
+    """Stamp records with the active trace id; runs in the calling thread"""
+
+    def filter(self, record):
+        trace = _current_trace.get()
+        if trace is not None and not hasattr(record, 'trace_id'):
+            record.trace_id = trace.trace_id
+        return True
+
+
+_listener = None
+_setup_lock = threading.Lock()
+
+def setup_logging():
+    """Route the ``app`` logger hierarchy through a queue to a stdout handler (idempotent)"""
+    global _listener
+    with _setup_lock:
+        if _listener is not None:
+            return
+        handler = logging.StreamHandler(sys.stdout)
+        if Config.LOG_FORMAT == 'json':
+            handler.setFormatter(JsonFormatter())
+        else:
+            handler.setFormatter(logging.Formatter('%(asctime)s %(levelname)s %(name)s: %(message)s'))
+
+        log_queue = queue.SimpleQueue()
+        queue_handler = logging.handlers.QueueHandler(log_queue)
+        queue_handler.addFilter(TraceIdFilter())
+
+        app_logger = logging.getLogger('app')
+        app_logger.setLevel(Config.LOG_LEVEL)
+        app_logger.handlers[:] = [queue_handler]
+        app_logger.propagate = False
+
+        _listener = logging.handlers.QueueListener(log_queue, handler, respect_handler_level=True)
+        _listener.start()
+        # Flush whatever is still queued when the worker exits
+        atexit.register(_listener.stop)
+
+
+class _Shard:
+    """Metrics written by a single thread; only that thread ever mutates it"""
+
+    __slots__ = ('thread', 'counters', 'histograms')
+
+    def __init__(self, thread):
+        self.thread = thread
+        self.counters = {}    # (name, labels) -> value
+        self.histograms = {}  # (name, labels) -> [bucket counts..., sum, count]
+
+
+class MetricsRegistry:
+    """Counters and latency histograms accumulated in per-thread shards
+
+    The hot path touches only the calling thread's own dicts, so recording
+    takes no lock. A scrape merges all shards. Shards of threads that have
+    exited are folded into a retired total on every scrape and every
+    RETIRE_EVERY shard registrations, so short-lived threads (flights,
+    hedged requests, grace timers) don't pile up when nothing scrapes.
+    """
+
+    RETIRE_EVERY = 64
+
+    def __init__(self):
+        self._local = threading.local()
+        self._shards = []
+        self._retired = _Shard(None)
+        self._registrations = 0
+        self._lock = threading.Lock()  # shard registration and scrapes only
+
+    def _shard(self):
+        shard = getattr(self._local, 'shard', None)
+        if shard is None:
+            shard = self._local.shard = _Shard(threading.current_thread())
+            with self._lock:
+                self._registrations += 1
+                if self._registrations % self.RETIRE_EVERY == 0:
+                    self._retire()
+                self._shards.append(shard)
+        return shard
+
+    def _retire(self):
+        """Fold the shards of exited threads into the retired total (caller holds the lock)"""
+        live = []
+        for shard in self._shards:
+            if shard.thread.is_alive():
+                live.append(shard)
+            else:
+                self._merge(self._retired, shard)
+        self._shards = live
+
+    def inc(self, name, value=1, **labels):
+        """Add to a counter"""
+        counters = self._shard().counters
+        key = (name, tuple(sorted(labels.items())))
+        counters[key] = counters.get(key, 0) + value
+
+    def observe(self, name, seconds, **labels):
+        """Record a latency sample in seconds"""
+        histograms = self._shard().histograms
+        key = (name, tuple(sorted(labels.items())))
+        histogram = histograms.get(key)
+        if histogram is None:
+            histogram = histograms[key] = [0] * (len(LATENCY_BUCKETS) + 3)
+        histogram[bisect.bisect_left(LATENCY_BUCKETS, seconds)] += 1
+        histogram[-2] += seconds
+        histogram[-1] += 1
+
+    @staticmethod
+    def _merge(target, shard):
+        for key, value in dict(shard.counters).items():
+            target.counters[key] = target.counters.get(key, 0) + value
+        for key, values in dict(shard.histograms).items():
+            values = list(values)
+            merged = target.histograms.get(key)
+            if merged is None:
+                target.histograms[key] = values
+            else:
+                target.histograms[key] = [a + b for a, b in zip(merged, values)]
+
+    def snapshot(self):
+        """Return (counters, histograms) merged across threads
+
+        counters: {(name, labels): value}
+        histograms: [{'name', 'labels', 'buckets': [(upper bound, cumulative count)], 'sum', 'count'}]
+        """
+        with self._lock:
+            self._retire()
+            total = _Shard(None)
+            self._merge(total, self._retired)
+            for shard in self._shards:
+                self._merge(total, shard)
+
+        histograms = []
+        for (name, labels), values in total.histograms.items():
+            cumulative, running = [], 0
+            for bound, bucket_count in zip(LATENCY_BUCKETS + (float('inf'),), values[:-2]):
+                running += bucket_count
+                cumulative.append((bound, running))
+            histograms.append({
+                'name': name,
+                'labels': dict(labels),
+                'buckets': cumulative,
+                'sum': values[-2],
+                'count': values[-1]
+            })
+        return total.counters, histograms
+
+
+metrics = MetricsRegistry()
+
+def get_metrics_registry():
+    """Return the process-wide metrics registry"""
+    return metrics
+
+
+class Trace:
+    """Spans recorded for one chat request"""
+
+    def __init__(self, route):
+        self.trace_id = uuid.uuid4().hex[:16]
+        self.route = route
+        self.started = time.monotonic()
+        self.spans = []
+        self.attributes = {}
+        self.finished = False
+
+    def elapsed(self):
+        return time.monotonic() - self.started
+
+    def record(self, stage, seconds, labels):
+        self.spans.append({'stage': stage, 'ms': round(seconds * 1000, 2), **labels})
+
+    def finish(self):
+        """Observe the total and emit the trace summary line (once; later calls do nothing)"""
+        if self.finished:
+            return
+        self.finished = True
+        total = self.elapsed()
+        metrics.observe('request', total, route=self.route, **self.attributes)
+        logger.info(
+            'chat trace',
+            extra={
+                'event': 'trace',
+                'trace_id': self.trace_id,
+                'route': self.route,
+                'total_ms': round(total * 1000, 2),
+                'spans': list(self.spans),
+                **self.attributes
+            }
+        )
+
+
+_current_trace = contextvars.ContextVar('chat_trace', default=None)
+
+def current_trace():
+    """Return the trace active in this context, or None"""
+    return _current_trace.get()
+
+
+def activate_trace(trace):
+    """Make a trace current in this context (e.g. inside an event loop task)"""
+    _current_trace.set(trace)
+
+
+@contextmanager
+def trace_scope(trace):
+    """Make a trace current for a block without finishing it"""
+    token = _current_trace.set(trace)
+    try:
+        yield trace
+    finally:
+        _current_trace.reset(token)
+
+
+@contextmanager
+def start_trace(route, trace=None):
+    """Run a block as one traced request (optionally continuing a trace); yields the Trace"""
+    trace = trace or Trace(route)
+    with trace_scope(trace):
+        try:
+            yield trace
+        finally:
+            trace.finish()
+
+
+@contextmanager
+def span(stage, **labels):
+    """Time a stage; the yielded dict can add labels such as ``outcome`` before it closes"""
+    started = time.monotonic()
+    attributes = {}
+    try:
+        yield attributes
+    except BaseException as e:
+        # GeneratorExit / CancelledError mean the consumer went away mid-stage
+        attributes.setdefault('outcome', 'exception' if isinstance(e, Exception) else 'cancelled')
+        raise
+    finally:
+        labels.update(attributes)
+        record_stage(stage, time.monotonic() - started, **labels)
+
+
+def record_stage(stage, seconds, **labels):
+    """Observe a stage duration and attach it to the current trace"""
+    metrics.observe(stage, seconds, **labels)
+    trace = _current_trace.get()
+    if trace is not None:
+        trace.record(stage, seconds, labels)
+
+
+def record_token_usage(provider, model, usage):
+    """Count prompt/completion tokens from a Groq or Gemini usage object; returns the total counted"""
+    if usage is None:
+        return 0
+    prompt_tokens = getattr(usage, 'prompt_tokens', None) or getattr(usage, 'prompt_token_count', None)
+    completion_tokens = (
+        getattr(usage, 'completion_tokens', None) or getattr(usage, 'candidates_token_count', None)
+    )
+    if prompt_tokens:
+        metrics.inc('tokens', prompt_tokens, provider=provider, model=model, kind='prompt')
+    if completion_tokens:
+        metrics.inc('tokens', completion_tokens, provider=provider, model=model, kind='completion')
+    return (prompt_tokens or 0) + (completion_tokens or 0)
+
+
+def run_in_context(target):
+    """Wrap a thread target so it sees the caller's trace"""
+    context = contextvars.copy_context()
+    return lambda *args, **kwargs: context.run(target, *args, **kwargs)
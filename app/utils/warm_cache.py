@@ -0,0 +1,208 @@
+"""
+Precomputed answers for common questions, loaded into the response cache at startup
+
+Generate the warm cache file (needs the provider API keys):
+
+    python -m app.utils.warm_cache
+    python -m app.utils.warm_cache --questions questions.txt --concurrency 8
+
+The file records a fingerprint of the resume context and the resume PDF
+(the retrieval source) it was generated from, and is ignored once either
+changes. The same batch runner backs
+POST /api/chat/batch.
+"""
+import argparse
+import json
+import logging
+import os
+import time
+from concurrent.futures import ThreadPoolExecutor, wait
+
+from app.config.settings import Config
+from app.utils.deadline import wait_timeout
+from app.utils.response_cache import context_fingerprint
+from app.utils.resume_context import RESUME_CONTEXT
+from app.utils.retrieval import source_fingerprint
+from app.utils.telemetry import get_metrics_registry, run_in_context
+
+logger = logging.getLogger(__name__)
+
+WARM_CACHE_VERSION = 1
+
+# Questions visitors ask most; answered ahead of time so they are served from the cache
+SUGGESTED_QUESTIONS = [
+    "What is Raviteja's current role?",
+    "What are his technical skills?",
+    "Tell me about his projects",
+    "What is his educational background?",
+    "What experience does he have with LLMs and RAG?",
+    "What did he work on before his current role?",
+    "Which programming languages and frameworks does he use?",
+    "What certifications does he have?",
+    "How can I contact Raviteja?",
+    "Why should we hire Raviteja?"
+]
+
+
+def answer_question(ai_manager, cache, question):
+    """Answer one question from the cache or the providers; returns a result dict
+
+    'provider' names the provider that produced the answer, also for
+    answers served from the cache.
+    """
+    cached = cache.get(question, RESUME_CONTEXT)
+    if cached:
+        return {'question': question, 'response': cached[0], 'api_used': 'cache', 'provider': cached[1],
+                'status': 'success'}
+    prompt, messages = ai_manager.build_prompts(question)
+    response, api_used = ai_manager.get_chat_response(prompt, messages)
+    if response is None:
+        return {'question': question, 'response': None, 'api_used': None, 'provider': None, 'status': 'failed'}
+    cache.put(question, RESUME_CONTEXT, response, api_used)
+    return {'question': question, 'response': response, 'api_used': api_used, 'provider': api_used,
+            'status': 'success'}
+
+
+def answer_batch(ai_manager, cache, questions, concurrency=None):
+    """Answer many questions with at most ``concurrency`` provider calls in flight, keeping input order
+
+    Under a deadline (the batch endpoint's), questions not answered when it
+    passes are reported with status 'timeout' and the rest are not started.
+    """
+    concurrency = max(1, min(concurrency or Config.BATCH_CONCURRENCY, len(questions) or 1))
+    ai_manager.ensure_clients()
+
+    def run(question):
+        try:
+            result = answer_question(ai_manager, cache, question)
+        except Exception as e:
+            logger.error(f"❌ Batch question failed: {question[:50]}: {e}")
+            result = {'question': question, 'response': None, 'api_used': None, 'provider': None, 'status': 'failed'}
+        get_metrics_registry().inc('batch_questions', status=result['status'])
+        return result
+
+    pool = ThreadPoolExecutor(max_workers=concurrency, thread_name_prefix='chat-batch')
+    try:
+        # One context copy per task: a copied context cannot be entered by two threads at once
+        futures = [pool.submit(run_in_context(run), question) for question in questions]
+        wait(futures, timeout=wait_timeout())
+    finally:
+        # Don't hold the caller for questions still running past the deadline
+        pool.shutdown(wait=False, cancel_futures=True)
+
+    results = []
+    for question, future in zip(questions, futures):
+        if future.done() and not future.cancelled():
+            results.append(future.result())
+            continue
+        logger.warning(f"⏱️ Batch question timed out: {question[:50]}")
+        get_metrics_registry().inc('batch_questions', status='timeout')
+        results.append({'question': question, 'response': None, 'api_used': None, 'provider': None,
+                        'status': 'timeout'})
+    return results
+
+
+def warm_cache_fingerprint():
+    """Hash of what warm answers depend on: the prompt context and the retrieval sources (resume PDF)"""
+    return context_fingerprint(RESUME_CONTEXT + source_fingerprint(Config.RESUME_PATH))
+
+
+def save_warm_cache(results, path=None, merge=True):
+    """Write successful provider answers to the warm cache file; returns the number of entries
+
+    Answers served from the response cache are stored under the provider
+    that produced them; fallback answers are never stored.
+    """
+    path = path or Config.WARM_CACHE_PATH
+    entries = {}
+    if merge:
+        for entry in read_warm_cache(path):
+            entries[entry['question']] = entry
+    for result in results:
+        provider = result.get('provider') or result['api_used']
+        if result['status'] == 'success' and provider not in (None, 'cache', 'fallback'):
+            entries[result['question']] = {
+                'question': result['question'],
+                'response': result['response'],
+                'api_used': provider
+            }
+
+    payload = {
+        'version': WARM_CACHE_VERSION,
+        'context_hash': warm_cache_fingerprint(),
+        'generated_at': time.strftime('%Y-%m-%dT%H:%M:%SZ', time.gmtime()),
+        'entries': list(entries.values())
+    }
+    os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+    temp_path = f"{path}.{os.getpid()}.tmp"
+    with open(temp_path, 'w', encoding='utf-8') as handle:
+        json.dump(payload, handle, indent=2, ensure_ascii=False)
+    os.replace(temp_path, path)
+    return len(entries)
+
+
+def read_warm_cache(path=None):
+    """Entries of the warm cache file, or [] when it is missing, unreadable or for another resume"""
+    path = path or Config.WARM_CACHE_PATH
+    try:
+        with open(path, encoding='utf-8') as handle:
+            payload = json.load(handle)
+    except FileNotFoundError:
+        return []
+    except (OSError, ValueError) as e:
+        logger.warning(f"⚠️ Could not read warm cache {path}: {e}")
+        return []
+    if payload.get('version') != WARM_CACHE_VERSION:
+        return []
+    if payload.get('context_hash') != warm_cache_fingerprint():
+        logger.warning("⚠️ Warm cache was generated for a different resume context or PDF, ignoring it")
+        return []
+    return payload.get('entries', [])
+
+
+def load_warm_cache(cache=None, path=None):
+    """Seed the response cache from the warm cache file; returns the number of answers loaded"""
+    if cache is None:
+        from app.utils.response_cache import get_response_cache
+        cache = get_response_cache()
+    entries = read_warm_cache(path)
+    for entry in entries:
+        # Warm answers stay until the resume changes or LRU pressure evicts them
+        cache.put(entry['question'], RESUME_CONTEXT, entry['response'], entry['api_used'], ttl=float('inf'))
+    if entries:
+        logger.info(f"✅ Warmed response cache with {len(entries)} precomputed answers")
+    return len(entries)
+
+
+def _read_questions(path):
+    with open(path, encoding='utf-8') as handle:
+        return [line.strip() for line in handle if line.strip() and not line.startswith('#')]
+
+
+def main():
+    """Answer the suggested questions and write the warm cache file"""
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--questions', help='file with one question per line (default: the suggested questions)')
+    parser.add_argument('--concurrency', type=int, default=Config.BATCH_CONCURRENCY)
+    parser.add_argument('--output', default=Config.WARM_CACHE_PATH)
+    parser.add_argument('--replace', action='store_true', help='drop entries already in the file')
+    args = parser.parse_args()
+
+    from app import create_app
+    from app.utils.ai_clients import get_ai_manager
+    from app.utils.response_cache import ResponseCache
+
+    questions = _read_questions(args.questions) if args.questions else SUGGESTED_QUESTIONS
+    app = create_app()
+    with app.app_context():
+        # A private cache so every question reaches the providers instead of the warmed cache
+        results = answer_batch(get_ai_manager(), ResponseCache(max_size=len(questions) or 1, similarity=1), questions, args.concurrency)
+    for result in results:
+        mark = '✅' if result['status'] == 'success' else '❌'
+        print(f"{mark} [{result['api_used'] or '-'}] {result['question']}")
+    count = save_warm_cache(results, args.output, merge=not args.replace)
+    print(f"✅ {count} answers -> {args.output}")
+
+
+if __name__ == '__main__':
+    main()
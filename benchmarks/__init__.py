@@ -0,0 +1,3 @@
+"""
+Offline benchmarks for performance-sensitive code paths
+"""
@@ -0,0 +1,314 @@
+#!/usr/bin/env python3
+"""
+Local stand-in for the Gemini and Groq APIs
+
+Speaks the wire formats the SDKs use, so the app runs unmodified against it:
+
+- Groq (OpenAI-compatible): POST /openai/v1/chat/completions, JSON or SSE
+  chunks with ``x_groq.usage`` on the last chunk; GET /openai/v1/models
+- Gemini (REST transport): POST /v1beta/models/<model>:generateContent and
+  :streamGenerateContent (a streamed JSON array); GET /v1beta/models
+
+Latency is shaped by a time to first token plus a token rate, and a share
+of requests can be answered with 429 / 404 or left hanging. Point the app
+at it with GEMINI_API_ENDPOINT and GROQ_BASE_URL. Standalone:
+
+    python -m benchmarks.fake_provider --port 8765 --ttft 0.4 --token-rate 80
+"""
+import argparse
+import json
+import random
+import re
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+WORDS = (
+    "Raviteja builds production AI systems with Python, FastAPI and Flask, "
+    "designs retrieval augmented generation pipelines over vector databases, "
+    "fine-tunes open models with LoRA and ships agentic workflows with CrewAI."
+).split()
+
+_GEMINI_PATH_RE = re.compile(r'^/v1beta/(models/[^:]+):(generateContent|streamGenerateContent)$')
+
+
+class FaultProfile:
+    """Latency shape and error injection shared by every request"""
+
+    def __init__(self, ttft=0.3, token_rate=60.0, tokens=80, rate_limit_ratio=0.0,
+                 not_found_ratio=0.0, timeout_ratio=0.0, hang_seconds=60.0, seed=None):
+        self.ttft = ttft
+        self.token_rate = token_rate
+        self.tokens = tokens
+        self.rate_limit_ratio = rate_limit_ratio
+        self.not_found_ratio = not_found_ratio
+        self.timeout_ratio = timeout_ratio
+        self.hang_seconds = hang_seconds
+        self._random = random.Random(seed)
+        self._lock = threading.Lock()
+
+    def draw(self):
+        """Pick the fate of one request: 'ok', 'rate_limit', 'not_found' or 'timeout'"""
+        with self._lock:
+            roll = self._random.random()
+        for outcome, ratio in (('rate_limit', self.rate_limit_ratio), ('not_found', self.not_found_ratio),
+                               ('timeout', self.timeout_ratio)):
+            if roll < ratio:
+                return outcome
+            roll -= ratio
+        return 'ok'
+
+    def token_delay(self):
+        return 1.0 / self.token_rate if self.token_rate > 0 else 0.0
+
+    def words(self):
+        return [WORDS[index % len(WORDS)] + ' ' for index in range(self.tokens)]
+
+
+class ProviderHandler(BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'
+    server_version = 'FakeProvider/1.0'
+
+    def log_message(self, format, *args):
+        pass
+
+    # --- plumbing ---
+
+    def _read_json(self):
+        length = int(self.headers.get('Content-Length') or 0)
+        body = self.rfile.read(length) if length else b''
+        try:
+            return json.loads(body or b'{}')
+        except ValueError:
+            return {}
+
+    def _send_json(self, status, payload, headers=None):
+        body = json.dumps(payload).encode('utf-8')
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(body)))
+        for name, value in (headers or {}).items():
+            self.send_header(name, value)
+        self.end_headers()
+        self.wfile.write(body)
+
+    def _start_chunked(self, content_type):
+        self.send_response(200)
+        self.send_header('Content-Type', content_type)
+        self.send_header('Transfer-Encoding', 'chunked')
+        self.end_headers()
+
+    def _chunk(self, text):
+        data = text.encode('utf-8')
+        self.wfile.write(f"{len(data):x}\r\n".encode('ascii') + data + b"\r\n")
+        self.wfile.flush()
+
+    def _end_chunked(self):
+        self.wfile.write(b"0\r\n\r\n")
+        self.wfile.flush()
+
+    def _inject_fault(self, provider, model):
+        """Answer with an injected failure; returns True when the request was consumed"""
+        fate = self.server.profile.draw()
+        self.server.count(provider, fate)
+        if fate == 'ok':
+            return False
+        if fate == 'timeout':
+            time.sleep(self.server.profile.hang_seconds)
+            self.close_connection = True
+            return True
+        if provider == 'groq':
+            if fate == 'rate_limit':
+                self._send_json(429, {'error': {
+                    'message': f'Rate limit reached for model `{model}`. Please try again in 1s.',
+                    'type': 'tokens', 'code': 'rate_limit_exceeded'
+                }}, {'retry-after': '1'})
+            else:
+                self._send_json(404, {'error': {
+                    'message': f'The model `{model}` does not exist or you do not have access to it.',
+                    'type': 'invalid_request_error', 'code': 'model_not_found'
+                }})
+        else:
+            if fate == 'rate_limit':
+                self._send_json(429, {'error': {
+                    'code': 429, 'message': 'Resource has been exhausted (e.g. check quota).',
+                    'status': 'RESOURCE_EXHAUSTED'
+                }})
+            else:
+                self._send_json(404, {'error': {
+                    'code': 404, 'message': f'{model} is not found for API version v1beta.',
+                    'status': 'NOT_FOUND'
+                }})
+        return True
+
+    # --- routes ---
+
+    def do_GET(self):
+        if self.path.startswith('/openai/v1/models'):
+            self._send_json(200, {'object': 'list', 'data': [
+                {'id': 'llama-3.1-8b-instant', 'object': 'model', 'created': 0, 'owned_by': 'fake'}
+            ]})
+        elif self.path.startswith('/v1beta/models'):
+            self._send_json(200, {'models': [
+                {'name': 'models/gemini-2.0-flash-exp', 'supportedGenerationMethods': ['generateContent']}
+            ]})
+        elif self.path == '/_stats':
+            self._send_json(200, self.server.stats())
+        else:
+            self._send_json(404, {'error': 'unknown path'})
+
+    def do_POST(self):
+        path = self.path.split('?', 1)[0]
+        if path == '/openai/v1/chat/completions':
+            self._groq(self._read_json())
+            return
+        match = _GEMINI_PATH_RE.match(path)
+        if match:
+            self._gemini(self._read_json(), match.group(1), match.group(2) == 'streamGenerateContent')
+            return
+        self._send_json(404, {'error': 'unknown path'})
+
+    def _groq(self, request):
+        model = request.get('model', 'unknown')
+        if self._inject_fault('groq', model):
+            return
+        profile = self.server.profile
+        words = profile.words()
+        prompt_tokens = sum(len(str(m.get('content', ''))) for m in request.get('messages', [])) // 4
+        usage = {'prompt_tokens': prompt_tokens, 'completion_tokens': len(words),
+                 'total_tokens': prompt_tokens + len(words)}
+        base = {'id': f'chatcmpl-{random.getrandbits(48):x}', 'created': int(time.time()), 'model': model}
+
+        time.sleep(profile.ttft)
+        if not request.get('stream'):
+            time.sleep(profile.token_delay() * len(words))
+            self._send_json(200, {**base, 'object': 'chat.completion', 'choices': [{
+                'index': 0, 'message': {'role': 'assistant', 'content': ''.join(words)}, 'finish_reason': 'stop'
+            }], 'usage': usage})
+            return
+
+        self._start_chunked('text/event-stream')
+        for index, word in enumerate(words):
+            if index:
+                time.sleep(profile.token_delay())
+            chunk = {**base, 'object': 'chat.completion.chunk', 'choices': [{
+                'index': 0, 'delta': {'content': word}, 'finish_reason': None
+            }]}
+            self._chunk(f"data: {json.dumps(chunk)}\n\n")
+        final = {**base, 'object': 'chat.completion.chunk',
+                 'choices': [{'index': 0, 'delta': {}, 'finish_reason': 'stop'}],
+                 'x_groq': {'id': base['id'], 'usage': usage}}
+        self._chunk(f"data: {json.dumps(final)}\n\n")
+        self._chunk("data: [DONE]\n\n")
+        self._end_chunked()
+
+    def _gemini(self, request, model, stream):
+        if self._inject_fault('gemini', model):
+            return
+        profile = self.server.profile
+        words = profile.words()
+        prompt_tokens = len(json.dumps(request.get('contents', []))) // 4
+
+        def response(text, finished, completion_tokens):
+            candidate = {'content': {'parts': [{'text': text}], 'role': 'model'}, 'index': 0}
+            if finished:
+                candidate['finishReason'] = 1  # STOP (the SDK asks for integer enums)
+            return {'candidates': [candidate], 'usageMetadata': {
+                'promptTokenCount': prompt_tokens, 'candidatesTokenCount': completion_tokens,
+                'totalTokenCount': prompt_tokens + completion_tokens
+            }}
+
+        time.sleep(profile.ttft)
+        if not stream:
+            time.sleep(profile.token_delay() * len(words))
+            self._send_json(200, response(''.join(words), True, len(words)))
+            return
+
+        self._start_chunked('application/json')
+        for index, word in enumerate(words):
+            if index:
+                time.sleep(profile.token_delay())
+            last = index == len(words) - 1
+            prefix = '[' if index == 0 else ',\r\n'
+            self._chunk(prefix + json.dumps(response(word, last, index + 1)))
+        self._chunk(']')
+        self._end_chunked()
+
+
+class FakeProvider(ThreadingHTTPServer):
+    """Threaded fake provider server; start() serves it on a background thread"""
+
+    daemon_threads = True
+
+    def __init__(self, profile=None, host='127.0.0.1', port=0):
+        super().__init__((host, port), ProviderHandler)
+        self.profile = profile or FaultProfile()
+        self._stats = {}
+        self._stats_lock = threading.Lock()
+        self._thread = None
+
+    @property
+    def url(self):
+        host, port = self.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def count(self, provider, outcome):
+        with self._stats_lock:
+            key = f"{provider}_{outcome}"
+            self._stats[key] = self._stats.get(key, 0) + 1
+
+    def stats(self):
+        with self._stats_lock:
+            return dict(self._stats)
+
+    def start(self):
+        self._thread = threading.Thread(target=self.serve_forever, name='fake-provider', daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self.shutdown()
+        self.server_close()
+
+
+def add_profile_arguments(parser):
+    """Latency and fault-injection options shared with the load test"""
+    parser.add_argument('--ttft', type=float, default=0.3, help='seconds before the first token')
+    parser.add_argument('--token-rate', type=float, default=60.0, help='tokens per second after the first')
+    parser.add_argument('--tokens', type=int, default=80, help='tokens per answer')
+    parser.add_argument('--rate-limit-ratio', type=float, default=0.0, help='share of requests answered 429')
+    parser.add_argument('--not-found-ratio', type=float, default=0.0, help='share of requests answered 404')
+    parser.add_argument('--timeout-ratio', type=float, default=0.0, help='share of requests left hanging')
+    parser.add_argument('--hang-seconds', type=float, default=60.0, help='how long a hanging request hangs')
+    parser.add_argument('--seed', type=int, default=None)
+
+
+def profile_from_args(args):
+    return FaultProfile(
+        ttft=args.ttft, token_rate=args.token_rate, tokens=args.tokens,
+        rate_limit_ratio=args.rate_limit_ratio, not_found_ratio=args.not_found_ratio,
+        timeout_ratio=args.timeout_ratio, hang_seconds=args.hang_seconds, seed=args.seed
+    )
+
+
+def main():
+    """Serve the fake provider in the foreground"""
+    parser = argparse.ArgumentParser(description='Local stand-in for the Gemini and Groq APIs')
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=8765)
+    add_profile_arguments(parser)
+    args = parser.parse_args()
+
+    server = FakeProvider(profile_from_args(args), args.host, args.port)
+    print(f"🤖 Fake provider listening on {server.url}")
+    print(f"   GEMINI_API_ENDPOINT={server.url} GROQ_BASE_URL={server.url}")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+
+
+if __name__ == '__main__':
+    main()
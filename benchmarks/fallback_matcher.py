@@ -0,0 +1,78 @@
+#!/usr/bin/env python3
+"""
+Micro-benchmark for get_smart_fallback_response
+
+Compares the precompiled intent matcher with the original chain of
+substring scans. Run from the project root:
+
+    python -m benchmarks.fallback_matcher
+"""
+import timeit
+
+from app.utils.resume_context import FALLBACK_RESPONSES, get_smart_fallback_response
+
+SAMPLE_MESSAGES = [
+    "What are his technical skills?",
+    "Tell me about the projects he has built",
+    "Where did Raviteja study and what was his CGPA?",
+    "What is he currently working on at Kadel Labs?",
+    "What's the weather like today?",
+    "Hello there",
+    "Can you recommend a good cookbook?",
+    "Is he happy with his current role and career progression so far?",
+]
+
+
+def legacy_fallback(message):
+    """The original substring-scan implementation, kept for comparison"""
+    message_lower = message.lower().strip()
+    out_of_context_keywords = [
+        'weather', 'food', 'movie', 'music', 'sports', 'politics', 'news',
+        'personal', 'family', 'relationship', 'hobby', 'travel', 'health',
+        'recipe', 'joke', 'game', 'entertainment', 'celebrity', 'fashion',
+        'shopping', 'restaurant', 'book', 'tv show', 'animal', 'nature',
+        'cooking', 'cook'
+    ]
+    if any(word in message_lower for word in out_of_context_keywords):
+        return FALLBACK_RESPONSES['out_of_context']
+    if any(word in message_lower for word in ['experience', 'work', 'job', 'role', 'career', 'position', 'current', 'doing', 'working', 'prior', 'before', 'previous']):
+        return FALLBACK_RESPONSES['experience']
+    elif any(word in message_lower for word in ['skill', 'technology', 'programming', 'tech', 'language', 'framework', 'tools', 'stack']):
+        return FALLBACK_RESPONSES['skills']
+    elif any(word in message_lower for word in ['project', 'portfolio', 'built', 'developed', 'created', 'app', 'build', 'made']):
+        return FALLBACK_RESPONSES['projects']
+    elif any(word in message_lower for word in ['education', 'degree', 'university', 'study', 'college', 'certification', 'school', 'graduate']):
+        return FALLBACK_RESPONSES['education']
+    return FALLBACK_RESPONSES['default']
+
+
+def per_call_microseconds(func, repeat=5, number=20000):
+    """Best-of-N average cost of one call over the sample messages"""
+    def run():
+        for message in SAMPLE_MESSAGES:
+            func(message)
+    best = min(timeit.repeat(run, repeat=repeat, number=number // len(SAMPLE_MESSAGES)))
+    return best / (number // len(SAMPLE_MESSAGES) * len(SAMPLE_MESSAGES)) * 1e6
+
+
+def main():
+    """Print per-call cost for both implementations and where they disagree"""
+    print("📊 get_smart_fallback_response micro-benchmark")
+    print("=" * 55)
+    legacy = per_call_microseconds(legacy_fallback)
+    current = per_call_microseconds(get_smart_fallback_response)
+    print(f"   Legacy substring scans: {legacy:.2f} µs/call")
+    print(f"   Precompiled matcher:    {current:.2f} µs/call")
+    print(f"   Speedup:                {legacy / current:.2f}x")
+
+    print("\n🔍 Classification differences (legacy -> matcher):")
+    names = {id(text): key for key, text in FALLBACK_RESPONSES.items()}
+    for message in SAMPLE_MESSAGES:
+        before = names[id(legacy_fallback(message))]
+        after = names[id(get_smart_fallback_response(message))]
+        if before != after:
+            print(f"   {message!r}: {before} -> {after}")
+
+
+if __name__ == '__main__':
+    main()
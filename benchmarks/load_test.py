@@ -0,0 +1,369 @@
+#!/usr/bin/env python3
+"""
+Load test for /api/chat and /api/chat-stream against a local fake provider
+
+Starts benchmarks.fake_provider, then for each worker model serves the app
+(built by create_app() through wsgi:app) pointed at it, drives a closed
+loop of concurrent clients and reports throughput, latency percentiles,
+time to first streamed chunk and peak RSS per worker process. Nothing
+leaves the machine. Run from the project root:
+
+    python -m benchmarks.load_test
+    python -m benchmarks.load_test --models werkzeug,gthread --concurrency 32 --duration 20
+    python -m benchmarks.load_test --ttft 1.0 --rate-limit-ratio 0.2 --env ASYNC_PIPELINE=True
+    python -m benchmarks.load_test --json after.json --baseline before.json
+
+With --baseline the run fails (exit 1) when throughput drops or p95
+latency grows by more than --tolerance for any model and endpoint.
+
+Worker models: werkzeug (Flask threaded dev server, one process) and the
+gunicorn worker classes sync, gthread and gevent (gevent must be
+installed). Memory figures come from /proc and are only reported on Linux.
+"""
+import argparse
+import http.client
+import itertools
+import json
+import math
+import os
+import socket
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+
+from benchmarks.fake_provider import FakeProvider, add_profile_arguments, profile_from_args
+
+# Shared across runs so the measured phase never repeats a warm-up question
+_request_numbers = itertools.count()
+
+PROJECT_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+ENDPOINTS = {'chat': '/api/chat', 'chat-stream': '/api/chat-stream'}
+
+QUESTIONS = [
+    "What are his technical skills",
+    "Tell me about his projects",
+    "What is his current role",
+    "Where did he study",
+    "What experience does he have with RAG",
+]
+
+
+def free_port():
+    with socket.socket() as sock:
+        sock.bind(('127.0.0.1', 0))
+        return sock.getsockname()[1]
+
+
+def percentile(values, fraction):
+    """Nearest-rank percentile of an unsorted list (None when empty)"""
+    if not values:
+        return None
+    ordered = sorted(values)
+    return ordered[max(0, math.ceil(fraction * len(ordered)) - 1)]
+
+
+def server_command(model, port, workers, threads):
+    """Command line that serves wsgi:app with the given worker model"""
+    if model == 'werkzeug':
+        return [sys.executable, '-m', 'flask', '--app', 'wsgi:app', 'run', '--port', str(port),
+                '--with-threads', '--no-reload', '--no-debugger']
+    return [sys.executable, '-m', 'gunicorn', '--config', 'gunicorn.conf.py', 'wsgi:app',
+            '--bind', f'127.0.0.1:{port}', '--workers', str(workers), '--worker-class', model,
+            '--threads', str(threads), '--access-logfile', '/dev/null']
+
+
+def server_environment(provider_url, extra):
+    env = dict(os.environ)
+    env.update({
+        'GEMINI_API_KEY': 'benchmark',
+        'GROQ_API_KEY': 'benchmark',
+        'GEMINI_API_ENDPOINT': provider_url,
+        'GROQ_BASE_URL': provider_url,
+        'AI_STARTUP_PROBES': 'False',
+        'RATE_LIMIT_ENABLED': 'False',
+        # Numbered questions differ by one token, which fuzzy matching would treat as repeats
+        'RESPONSE_CACHE_SIMILARITY': '1',
+        'WARM_CACHE_PATH': os.path.join(tempfile.gettempdir(), 'benchmark-no-warm-cache.json'),
+        'LOG_LEVEL': 'WARNING',
+        'GUNICORN_LOG_LEVEL': 'warning',
+        'FLASK_DEBUG': 'False'
+    })
+    env.update(extra)
+    return env
+
+
+def wait_until_ready(port, process, timeout=60):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if process.poll() is not None:
+            raise RuntimeError(f"server exited with status {process.returncode}")
+        try:
+            connection = http.client.HTTPConnection('127.0.0.1', port, timeout=2)
+            connection.request('GET', '/health')
+            if connection.getresponse().status == 200:
+                connection.close()
+                return
+        except OSError:
+            pass
+        time.sleep(0.2)
+    raise RuntimeError("server did not become healthy")
+
+
+def worker_pids(root_pid):
+    """The server process and all its descendants (gunicorn master + workers)"""
+    parents = {}
+    for entry in os.listdir('/proc'):
+        if entry.isdigit():
+            try:
+                with open(f'/proc/{entry}/stat') as handle:
+                    parents[int(entry)] = int(handle.read().rsplit(')', 1)[1].split()[1])
+            except (OSError, IndexError, ValueError):
+                continue
+    found, frontier = [root_pid], [root_pid]
+    while frontier:
+        children = [pid for pid, parent in parents.items() if parent in frontier]
+        found.extend(children)
+        frontier = children
+    return found
+
+
+def rss_bytes(pid):
+    try:
+        with open(f'/proc/{pid}/status') as handle:
+            for line in handle:
+                if line.startswith('VmRSS:'):
+                    return int(line.split()[1]) * 1024
+    except OSError:
+        return None
+    return None
+
+
+class MemorySampler(threading.Thread):
+    """Track peak RSS of every serving process while the load runs"""
+
+    def __init__(self, root_pid, interval=0.5):
+        super().__init__(daemon=True)
+        self.root_pid = root_pid
+        self.interval = interval
+        self.peaks = {}
+        self._halt = threading.Event()
+
+    def run(self):
+        if not os.path.isdir('/proc'):
+            return
+        while not self._halt.is_set():
+            for pid in worker_pids(self.root_pid):
+                rss = rss_bytes(pid)
+                if rss is not None:
+                    self.peaks[pid] = max(self.peaks.get(pid, 0), rss)
+            self._halt.wait(self.interval)
+
+    def stop(self):
+        self._halt.set()
+        self.join()
+
+
+def one_request(connection, path, message, stream):
+    """Send one chat request; returns (latency, ttft or None, ok, fallback)"""
+    body = json.dumps({'message': message})
+    started = time.monotonic()
+    connection.request('POST', path, body=body, headers={'Content-Type': 'application/json'})
+    response = connection.getresponse()
+    ttft = None
+    data = b''
+    while True:
+        piece = response.read1(65536) if stream else response.read()
+        if not piece:
+            break
+        if stream and ttft is None and b'"chunk"' in piece:
+            ttft = time.monotonic() - started
+        data += piece
+        if not stream:
+            break
+    latency = time.monotonic() - started
+    # Honour "Connection: close" even when another Connection header claims keep-alive
+    if response.will_close or 'close' in (response.getheader('Connection') or '').lower():
+        connection.close()
+    fallback = b'"api_used": "fallback"' in data or b'"api_used":"fallback"' in data
+    return latency, ttft, response.status == 200, fallback
+
+
+def run_load(port, endpoint, concurrency, duration, request_timeout):
+    """Closed-loop load: each client sends its next request as soon as the previous one finishes"""
+    path = ENDPOINTS[endpoint]
+    stream = endpoint == 'chat-stream'
+    latencies, ttfts = [], []
+    counts = {'ok': 0, 'errors': 0, 'fallback': 0}
+    lock = threading.Lock()
+    deadline = time.monotonic() + duration
+
+    def client():
+        connection = http.client.HTTPConnection('127.0.0.1', port, timeout=request_timeout)
+        while time.monotonic() < deadline:
+            with lock:
+                number = next(_request_numbers)
+            # A unique suffix keeps every request a cache miss so the providers are exercised
+            message = f"{QUESTIONS[number % len(QUESTIONS)]} (request {number})?"
+            try:
+                latency, ttft, ok, fallback = one_request(connection, path, message, stream)
+            except (OSError, http.client.HTTPException):
+                connection.close()
+                connection = http.client.HTTPConnection('127.0.0.1', port, timeout=request_timeout)
+                with lock:
+                    counts['errors'] += 1
+                continue
+            with lock:
+                if ok:
+                    counts['ok'] += 1
+                    latencies.append(latency)
+                    if ttft is not None:
+                        ttfts.append(ttft)
+                    counts['fallback'] += fallback
+                else:
+                    counts['errors'] += 1
+        connection.close()
+
+    started = time.monotonic()
+    clients = [threading.Thread(target=client, daemon=True) for _ in range(concurrency)]
+    for thread in clients:
+        thread.start()
+    for thread in clients:
+        thread.join()
+    elapsed = time.monotonic() - started
+
+    result = {
+        'requests': counts['ok'],
+        'errors': counts['errors'],
+        'fallback': counts['fallback'],
+        'rps': counts['ok'] / elapsed if elapsed else 0.0,
+        'p50': percentile(latencies, 0.50),
+        'p95': percentile(latencies, 0.95),
+        'p99': percentile(latencies, 0.99)
+    }
+    if stream:
+        result['ttft_p50'] = percentile(ttfts, 0.50)
+        result['ttft_p95'] = percentile(ttfts, 0.95)
+    return result
+
+
+def benchmark_model(model, provider_url, args, extra_env):
+    """Serve the app with one worker model and load every endpoint; returns {endpoint: result}"""
+    port = free_port()
+    log = tempfile.NamedTemporaryFile(prefix=f'benchmark-{model}-', suffix='.log', delete=False)
+    process = subprocess.Popen(
+        server_command(model, port, args.workers, args.threads),
+        cwd=PROJECT_ROOT, env=server_environment(provider_url, extra_env),
+        stdout=log, stderr=subprocess.STDOUT
+    )
+    results = {}
+    try:
+        wait_until_ready(port, process)
+        for endpoint in args.endpoints:
+            # Warm up connections, lazy clients and caches before measuring
+            run_load(port, endpoint, min(args.concurrency, 4), 1.0, args.request_timeout)
+            sampler = MemorySampler(process.pid)
+            sampler.start()
+            result = run_load(port, endpoint, args.concurrency, args.duration, args.request_timeout)
+            sampler.stop()
+            # The gunicorn master only supervises; report the processes that serve requests
+            serving = [rss for pid, rss in sampler.peaks.items() if model == 'werkzeug' or pid != process.pid]
+            result['rss_mb_per_worker'] = (sum(serving) / len(serving) / 2 ** 20) if serving else None
+            results[endpoint] = result
+    except RuntimeError as e:
+        print(f"❌ {model}: {e} (server log: {log.name})")
+    finally:
+        process.terminate()
+        try:
+            process.wait(timeout=15)
+        except subprocess.TimeoutExpired:
+            process.kill()
+        log.close()
+    return results
+
+
+def _ms(value):
+    return f"{value * 1000:8.0f}" if value is not None else f"{'-':>8}"
+
+
+def print_report(results):
+    print(f"\n{'model':<10} {'endpoint':<12} {'ok':>6} {'err':>5} {'fallbk':>6} {'rps':>8} "
+          f"{'p50 ms':>8} {'p95 ms':>8} {'p99 ms':>8} {'ttft50':>8} {'ttft95':>8} {'rss MB':>7}")
+    for model, endpoints in results.items():
+        for endpoint, r in endpoints.items():
+            rss = f"{r['rss_mb_per_worker']:7.1f}" if r.get('rss_mb_per_worker') else f"{'-':>7}"
+            print(f"{model:<10} {endpoint:<12} {r['requests']:>6} {r['errors']:>5} {r['fallback']:>6} "
+                  f"{r['rps']:>8.1f} {_ms(r['p50'])} {_ms(r['p95'])} {_ms(r['p99'])} "
+                  f"{_ms(r.get('ttft_p50'))} {_ms(r.get('ttft_p95'))} {rss}")
+
+
+def compare(results, baseline, tolerance):
+    """List regressions against a previous --json output"""
+    regressions = []
+    for model, endpoints in results.items():
+        for endpoint, current in endpoints.items():
+            before = baseline.get(model, {}).get(endpoint)
+            if not before:
+                continue
+            if before['rps'] and current['rps'] < before['rps'] * (1 - tolerance):
+                regressions.append(f"{model} {endpoint}: rps {before['rps']:.1f} -> {current['rps']:.1f}")
+            if before.get('p95') and current.get('p95') and current['p95'] > before['p95'] * (1 + tolerance):
+                regressions.append(f"{model} {endpoint}: p95 {before['p95'] * 1000:.0f}ms -> "
+                                   f"{current['p95'] * 1000:.0f}ms")
+    return regressions
+
+
+def main():
+    """Run the load test and print (and optionally save / compare) the results"""
+    parser = argparse.ArgumentParser(description='Load test the chat endpoints against a fake provider')
+    parser.add_argument('--models', default='werkzeug,gthread', help='comma list of werkzeug, sync, gthread, gevent')
+    parser.add_argument('--endpoints', default='chat,chat-stream', help='comma list of chat, chat-stream')
+    parser.add_argument('--concurrency', type=int, default=16, help='concurrent clients')
+    parser.add_argument('--duration', type=float, default=10.0, help='seconds of load per endpoint')
+    parser.add_argument('--workers', type=int, default=2, help='gunicorn worker processes')
+    parser.add_argument('--threads', type=int, default=16, help='threads per gthread worker')
+    parser.add_argument('--request-timeout', type=float, default=60.0)
+    parser.add_argument('--env', action='append', default=[], metavar='KEY=VALUE', help='extra app setting')
+    parser.add_argument('--json', help='write the results to this file')
+    parser.add_argument('--baseline', help='previous --json output to compare against')
+    parser.add_argument('--tolerance', type=float, default=0.15, help='allowed relative regression')
+    add_profile_arguments(parser)
+    args = parser.parse_args()
+    args.endpoints = [endpoint.strip() for endpoint in args.endpoints.split(',') if endpoint.strip()]
+    extra_env = dict(item.split('=', 1) for item in args.env)
+
+    provider = FakeProvider(profile_from_args(args)).start()
+    print(f"📊 Chat load test: {args.concurrency} clients, {args.duration:.0f}s per endpoint, "
+          f"fake provider at {provider.url} (ttft {args.ttft}s, {args.token_rate} tok/s, {args.tokens} tokens)")
+
+    results = {}
+    try:
+        for model in [model.strip() for model in args.models.split(',') if model.strip()]:
+            print(f"🚀 {model} ...")
+            results[model] = benchmark_model(model, provider.url, args, extra_env)
+    finally:
+        provider.stop()
+
+    print_report(results)
+    print(f"\n🤖 Provider calls: {json.dumps(provider.stats(), sort_keys=True)}")
+
+    if args.json:
+        with open(args.json, 'w', encoding='utf-8') as handle:
+            json.dump(results, handle, indent=2)
+        print(f"✅ Results -> {args.json}")
+
+    if args.baseline:
+        with open(args.baseline, encoding='utf-8') as handle:
+            regressions = compare(results, json.load(handle), args.tolerance)
+        if regressions:
+            print("\n❌ Regressions beyond tolerance:")
+            for line in regressions:
+                print(f"   {line}")
+            sys.exit(1)
+        print("\n✅ No regressions beyond tolerance")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,50 @@
+"""
+Gunicorn configuration for production serving
+Values come from app.config.settings.Config so they can be tuned with environment variables
+"""
+import multiprocessing
+import os
+import sys
+
+# Resolve the app package and wsgi:app relative to the project root regardless of the launch directory
+chdir = os.path.dirname(os.path.abspath(__file__))
+if chdir not in sys.path:
+    sys.path.insert(0, chdir)
+
+from app.config.settings import Config
+
+
+def default_worker_count():
+    """Derive worker processes from CPU cores when WEB_CONCURRENCY is not set"""
+    return min(multiprocessing.cpu_count() * 2 + 1, Config.GUNICORN_MAX_WORKERS)
+
+
+# Railway injects PORT; fall back to the Flask settings for local runs
+bind = f"{Config.HOST}:{os.environ.get('PORT', Config.PORT)}"
+
+workers = Config.WEB_CONCURRENCY or default_worker_count()
+# Per-worker state (chat sessions, the token budget) is sized from the real worker count.
+# Workers are forked from this process, so they inherit both.
+os.environ['WORKER_PROCESSES'] = str(workers)
+Config.WORKER_PROCESSES = workers
+
+# gthread keeps a long-lived /api/chat-stream on its own thread, so one slow
+# LLM call no longer blocks other visitors. Set GUNICORN_WORKER_CLASS=gevent
+# (after installing gevent) to hold hundreds of idle streams per worker.
+worker_class = Config.GUNICORN_WORKER_CLASS
+threads = Config.GUNICORN_THREADS
+worker_connections = Config.GUNICORN_WORKER_CONNECTIONS
+
+# SSE responses stay open for the whole generation; the worker heartbeat
+# timeout must outlive the slowest answer, and shutdown lets streams finish.
+timeout = Config.GUNICORN_TIMEOUT
+graceful_timeout = Config.GUNICORN_GRACEFUL_TIMEOUT
+keepalive = Config.GUNICORN_KEEPALIVE
+
+# Each worker builds its own app so the background health-probe threads
+# started by create_app() run in the worker rather than the forked master.
+preload_app = False
+
+accesslog = '-'
+errorlog = '-'
+loglevel = os.environ.get('GUNICORN_LOG_LEVEL', 'info')
@@ -5,6 +5,7 @@ Run this file to start the portfolio server
 """
 
 import os
+import sys
 from app import create_app
 
 def check_setup():
@@ -44,10 +45,24 @@ def check_setup():
     
     return True
 
+def run_production():
+    """Serve the app with gunicorn using gunicorn.conf.py"""
+    from gunicorn.app.wsgiapp import WSGIApplication
+    
+    config_path = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'gunicorn.conf.py')
+    sys.argv = [sys.argv[0], '--config', config_path, 'wsgi:app']
+    print("🚀 Starting Portfolio Application with gunicorn...")
+    WSGIApplication("%(prog)s [OPTIONS] [APP_MODULE]").run()
+
 def main():
     """Main application entry point"""
     check_setup()
     
+    # The Flask dev server is single-process; production goes through gunicorn
+    if os.environ.get('FLASK_ENV') == 'production':
+        run_production()
+        return
+    
     # Create Flask app
     app = create_app()
     
@@ -55,47 +70,24 @@ def main():
     port = int(os.environ.get('PORT', 5000))
     host = os.environ.get('HOST', '0.0.0.0')
     
-    # Check if we're in production
-    is_production = os.environ.get('FLASK_ENV') == 'production'
-    debug_mode = not is_production
-    
-    print(f"\n🚀 Starting Portfolio Application...")
-    print(f"   Environment: {'Production' if is_production else 'Development'}")
+    print(f"\n🚀 Starting Portfolio Application (development server)...")
     print(f"   Host: {host}")
     print(f"   Port: {port}")
-    print(f"   Debug: {debug_mode}")
     
     try:
-        # Initialize AI manager in a non-blocking way
-        try:
-            from app.utils.ai_clients import get_ai_manager
-            with app.app_context():
-                ai_manager = get_ai_manager(app)
-                ai_manager.init_app(app)
-                print("✅ AI Manager initialized")
-                
-                # Debug status (only in development)
-                if not is_production:
-                    ai_manager.debug_status()
-        except Exception as ai_error:
-            print(f"⚠️  AI Manager initialization failed: {ai_error}")
-            print("   App will continue with fallback responses")
+        # AI clients are constructed by create_app() and verified in the background
+        from app.utils.ai_clients import get_ai_manager
+        with app.app_context():
+            get_ai_manager().debug_status()
         
         # Start the server
         print(f"🌐 Server starting at http://{host}:{port}")
-        app.run(
-            debug=debug_mode,
-            host=host,
-            port=port,
-            use_reloader=False  # Disable reloader for production
-        )
+        app.run(debug=True, host=host, port=port, use_reloader=False)
         
     except Exception as e:
         print(f"❌ Error starting server: {e}")
-        if not is_production:
-            import traceback
-            traceback.print_exc()
-        # Exit with error code for Railway to detect failure
+        import traceback
+        traceback.print_exc()
         exit(1)
 
 if __name__ == '__main__':
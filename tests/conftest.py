@@ -0,0 +1,97 @@
+"""
+Shared fixtures: a scripted fake provider in place of Gemini and Groq
+"""
+import queue
+import threading
+import time
+
+import pytest
+
+from app.config.settings import Config
+
+_END = object()
+
+
+class FakeProvider:
+    """Stands in for the AI manager; the test feeds each delta and ends the answer
+
+    stream_chat() blocks until the test calls feed() or finish(), so a test
+    controls exactly how far a generation has got when it reads, drops or
+    resumes a stream.
+    """
+
+    def __init__(self, api_used='groq'):
+        self.api_used = api_used
+        self.calls = 0
+        self.cancelled = threading.Event()
+        self._deltas = queue.Queue()
+
+    def feed(self, *deltas):
+        for delta in deltas:
+            self._deltas.put(delta)
+
+    def finish(self):
+        self._deltas.put(_END)
+
+    def start(self, cancel_event=None):
+        """A SingleFlight start(): the (api_used, delta) iterator for one generation"""
+        return self.stream_chat(None, None, cancel_event)
+
+    # AI manager interface used by the chat routes
+
+    def ensure_clients(self):
+        return True
+
+    def build_prompts(self, user_message, history=None):
+        return user_message, [{'role': 'user', 'content': user_message}]
+
+    def get_chat_response(self, prompt, messages, route=None):
+        deltas = list(self.stream_chat(prompt, messages))
+        if not deltas:
+            return None, None
+        return ''.join(delta for _, delta in deltas), deltas[-1][0]
+
+    def stream_chat(self, prompt, messages, cancel_event=None, route=None):
+        self.calls += 1
+        while cancel_event is None or not cancel_event.is_set():
+            try:
+                delta = self._deltas.get(timeout=0.01)
+            except queue.Empty:
+                continue
+            if delta is _END:
+                return
+            yield self.api_used, delta
+        self.cancelled.set()
+
+
+def wait_for(condition, timeout=2.0):
+    """Poll condition() until it is true; False when timeout runs out first"""
+    deadline = time.monotonic() + timeout
+    while not condition():
+        if time.monotonic() >= deadline:
+            return False
+        time.sleep(0.01)
+    return True
+
+
+@pytest.fixture
+def provider():
+    return FakeProvider()
+
+
+@pytest.fixture
+def client(monkeypatch, provider):
+    """Flask test client whose chat routes generate through the fake provider"""
+    from app import create_app
+    from app.api import routes
+    from app.utils.coalescing import SingleFlight
+    from app.utils.response_cache import ResponseCache
+
+    monkeypatch.setattr(Config, 'RATE_LIMIT_ENABLED', False)
+    monkeypatch.setattr(Config, 'SESSIONS_ENABLED', 'false')
+    monkeypatch.setattr(Config, 'SSE_FLUSH_INTERVAL', 0.0)
+    monkeypatch.setattr(routes, 'get_ai_manager', lambda: provider)
+    cache, flights = ResponseCache(), SingleFlight()
+    monkeypatch.setattr(routes, 'get_response_cache', lambda: cache)
+    monkeypatch.setattr(routes, 'get_single_flight', lambda: flights)
+    return create_app().test_client()
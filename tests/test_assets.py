@@ -0,0 +1,93 @@
+"""
+Static asset pipeline: minifiers, encoding negotiation, fingerprinted builds and serving
+"""
+import gzip
+import os
+import re
+
+from app import create_app
+from app.utils.assets import (ASSET_SOURCES, AssetRegistry, build_assets, choose_encoding,
+                              compress_variants, minify_css, minify_js)
+
+
+def write_sources(static_folder, css='body {\n  color: red ;\n}\n', js='// setup\nlet a = 1;\n'):
+    for logical, source in zip(ASSET_SOURCES, (css, js)):
+        path = os.path.join(static_folder, logical)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        with open(path, 'w', encoding='utf-8') as handle:
+            handle.write(source)
+
+
+def test_css_minifier_leaves_quoted_strings_alone():
+    source = '/* theme */\na::before {\n  content: "a  ;  b" ;\n  margin:  0 ;\n}\n'
+
+    assert minify_css(source) == 'a::before{content:"a  ;  b";margin:0}'
+
+
+def test_js_minifier_drops_comments_but_keeps_template_literals_verbatim():
+    source = (
+        "/* header\n   comment */\n"
+        "    const a = 1; // one\n"
+        "\n"
+        "const html = `\n"
+        "    // not a comment\n"
+        "`;\n"
+    )
+
+    assert minify_js(source) == "const a = 1;\nconst html = `\n    // not a comment\n`;\n"
+
+
+def test_encoding_follows_our_preference_among_what_the_client_accepts():
+    variants = {None: b'x', 'gzip': b'g', 'br': b'b'}
+
+    assert choose_encoding(variants, 'gzip, deflate, br') == 'br'
+    assert choose_encoding(variants, 'gzip;q=1.0') == 'gzip'
+    assert choose_encoding(variants, 'deflate') is None
+    assert choose_encoding({None: b'x'}, 'br') is None
+    assert choose_encoding(variants, None) is None
+
+
+def test_build_fingerprints_by_content_and_registry_rebuilds_stale_output(tmp_path):
+    static_folder = str(tmp_path)
+    write_sources(static_folder)
+    manifest = build_assets(static_folder)
+
+    entry = manifest['assets']['css/portfolio.css']
+    assert re.fullmatch(r'css/portfolio\.[0-9a-f]{12}\.css', entry['path'])
+    assert 'gzip' in entry['encodings']
+    registry = AssetRegistry(static_folder).load()
+    body, encoding, etag = registry.variant(entry['path'], 'gzip')
+    assert encoding == 'gzip'
+    assert etag == f"{entry['hash']}-gzip"
+    assert gzip.decompress(body) == b'body{color:red}'
+
+    write_sources(static_folder, css='body { color: blue; }')
+    reloaded = AssetRegistry(static_folder).load()
+    new_path = reloaded.hashed_path('css/portfolio.css')
+    assert new_path != entry['path']
+    assert reloaded.variant(new_path, None)[0] == b'body{color:blue}'
+
+
+def test_fingerprinted_assets_are_served_immutable_and_revalidated():
+    app = create_app()
+    client = app.test_client()
+    with app.test_request_context():
+        url = app.jinja_env.globals['asset_url']('css/portfolio.css')
+    assert re.fullmatch(r'/static/dist/css/portfolio\.[0-9a-f]{12}\.css', url)
+
+    response = client.get(url, headers={'Accept-Encoding': 'gzip'})
+    assert response.status_code == 200
+    assert response.headers['Content-Encoding'] == 'gzip'
+    assert 'immutable' in response.headers['Cache-Control']
+    assert response.headers['Vary'] == 'Accept-Encoding'
+    again = client.get(url, headers={'Accept-Encoding': 'gzip', 'If-None-Match': response.headers['ETag']})
+    assert again.status_code == 304
+    assert client.get('/static/dist/css/portfolio.000000000000.css').status_code == 404
+
+
+def test_compressed_variants_round_trip():
+    body = b'hello ' * 100
+
+    variants = compress_variants(body)
+    assert variants[None] == body
+    assert gzip.decompress(variants['gzip']) == body
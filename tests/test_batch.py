@@ -0,0 +1,50 @@
+"""
+Batch endpoint: authorization, validation and the whole-batch deadline
+"""
+import time
+
+import pytest
+
+from app.config.settings import Config
+
+TOKEN = {'Authorization': 'Bearer secret'}
+
+
+@pytest.fixture
+def batch_client(client, monkeypatch):
+    monkeypatch.setattr(Config, 'BATCH_API_TOKEN', 'secret')
+    return client
+
+
+def test_batch_needs_the_token(batch_client):
+    response = batch_client.post('/api/chat/batch', json={'questions': ['Where did he study?']})
+    assert response.status_code == 404
+
+
+@pytest.mark.parametrize('questions', [None, [], ['', '   ']])
+def test_batch_without_questions_is_rejected(batch_client, questions):
+    response = batch_client.post('/api/chat/batch', json={'questions': questions}, headers=TOKEN)
+    assert response.status_code == 400
+
+
+def test_batch_answers_and_caches(batch_client, provider):
+    provider.feed('Osmania University')
+    provider.finish()
+    body = batch_client.post('/api/chat/batch', json={'questions': ['Where did he study?']}, headers=TOKEN).get_json()
+    again = batch_client.post('/api/chat/batch', json={'questions': ['Where did he study?']}, headers=TOKEN).get_json()
+
+    assert body['answered'] == 1
+    assert body['results'][0]['api_used'] == 'groq'
+    assert again['results'][0]['api_used'] == 'cache'
+    assert again['results'][0]['provider'] == 'groq'
+
+
+def test_batch_stops_waiting_at_its_deadline(batch_client, provider, monkeypatch):
+    monkeypatch.setattr(Config, 'BATCH_DEADLINE_SECONDS', 0.3)
+    started = time.monotonic()
+    body = batch_client.post('/api/chat/batch', json={'questions': ['Where did he study?']}, headers=TOKEN).get_json()
+    provider.finish()  # let the abandoned question's thread end
+
+    assert time.monotonic() - started < 2.0
+    assert body['results'][0]['status'] == 'timeout'
+    assert (body['answered'], body['failed']) == (0, 1)
@@ -0,0 +1,104 @@
+"""
+Chat endpoints against the fake provider: caching, streaming and Last-Event-ID resume
+"""
+import json
+
+from app.config.settings import Config
+from tests.conftest import wait_for
+
+
+def events(chunks):
+    """Split streamed bytes into SSE frames, skipping keep-alive comments"""
+    frames = []
+    for block in b''.join(chunks).decode('utf-8').split('\n\n'):
+        fields = dict(line.split(': ', 1) for line in block.split('\n') if line and not line.startswith(':'))
+        if 'data' in fields:
+            frames.append(fields)
+    return frames
+
+
+def chunks_of(frames):
+    return ''.join(json.loads(frame['data']).get('chunk', '') for frame in frames if frame['data'] != '[DONE]')
+
+
+def test_chat_answers_through_the_provider_and_caches_the_answer(client, provider):
+    provider.feed('Python', ' and Flask')
+    provider.finish()
+    first = client.post('/api/chat', json={'message': 'Which frameworks does he use?'}).get_json()
+    second = client.post('/api/chat', json={'message': 'Which frameworks does he use?'}).get_json()
+
+    assert (first['response'], first['api_used']) == ('Python and Flask', 'groq')
+    assert (second['response'], second['api_used']) == ('Python and Flask', 'cache')
+    assert provider.calls == 1
+
+
+def test_chat_falls_back_when_the_deadline_passes(client, provider, monkeypatch):
+    monkeypatch.setattr(Config, 'CHAT_DEADLINE_SECONDS', 0.2)
+    body = client.post('/api/chat', json={'message': 'Which frameworks does he use?'}).get_json()
+
+    assert body['api_used'] == 'fallback'
+    assert provider.cancelled.wait(1.0)
+
+
+def test_chat_stream_frames_the_answer(client, provider):
+    provider.feed('Python', ' and Flask')
+    provider.finish()
+    frames = events(client.post('/api/chat-stream', json={'message': 'Which frameworks does he use?'}).response)
+
+    assert frames[0]['event'] == 'meta'
+    stream_id = json.loads(frames[0]['data'])['stream_id']
+    assert frames[1]['id'].startswith(f'{stream_id}-')
+    assert json.loads(frames[1]['data'])['api_used'] == 'groq'
+    assert chunks_of(frames[1:]) == 'Python and Flask'
+    assert json.loads(frames[-2]['data']) == {'complete': True, 'api_used': 'groq'}
+    assert frames[-1]['data'] == '[DONE]'
+
+
+def test_dropped_stream_resumes_from_last_event_id(client, provider):
+    question = {'message': 'Which frameworks does he use?'}
+    provider.feed('Python')
+    response = client.post('/api/chat-stream', json=question, buffered=False)
+    body = response.response
+    received = [next(body), next(body)]
+    response.close()  # the visitor's connection drops mid-answer
+
+    meta, first = events(received)
+    stream_id = json.loads(meta['data'])['stream_id']
+    assert first['id'] == f'{stream_id}-1'
+
+    provider.feed(' and Flask')
+    provider.finish()
+    resumed = events(client.post('/api/chat-stream', json=question, headers={'Last-Event-ID': first['id']}).response)
+
+    assert json.loads(resumed[0]['data'])['stream_id'] == stream_id
+    assert chunks_of(resumed[1:]) == ' and Flask'
+    assert resumed[-1]['data'] == '[DONE]'
+    assert provider.calls == 1
+
+
+def test_unknown_last_event_id_starts_a_fresh_stream(client, provider):
+    provider.feed('Python')
+    provider.finish()
+    frames = events(client.post(
+        '/api/chat-stream', json={'message': 'Which frameworks does he use?'}, headers={'Last-Event-ID': 'gone-3'}
+    ).response)
+
+    assert json.loads(frames[0]['data'])['stream_id'] != 'gone'
+    assert chunks_of(frames[1:]) == 'Python'
+    assert wait_for(lambda: provider.calls == 1)
+
+
+def test_last_event_id_of_another_question_starts_a_fresh_stream(client, provider):
+    provider.feed('Python')
+    provider.finish()
+    first = events(client.post('/api/chat-stream', json={'message': 'Which frameworks does he use?'}).response)
+
+    provider.feed('Osmania University')
+    provider.finish()
+    second = events(client.post(
+        '/api/chat-stream', json={'message': 'Where did he study?'}, headers={'Last-Event-ID': first[1]['id']}
+    ).response)
+
+    assert second[0]['data'] != first[0]['data']
+    assert chunks_of(second[1:]) == 'Osmania University'
+    assert provider.calls == 2
@@ -0,0 +1,133 @@
+"""
+Per-model circuit breaker: opening, half-open probes and eviction
+"""
+import pytest
+
+from app.utils.circuit_breaker import (
+    CLOSED, HALF_OPEN, OPEN, ModelHealthRegistry, classify_error, retry_after_seconds
+)
+
+
+def reopen_now(registry, model):
+    """Let an open circuit's cooldown run out"""
+    registry._models[model].open_until = 0.0
+
+
+def tripped(model='llama'):
+    registry = ModelHealthRegistry(failure_threshold=1, cooldown=30)
+    registry.record_failure('groq', model, 'error')
+    reopen_now(registry, model)
+    return registry
+
+
+def test_cancelled_probe_is_released_for_the_next_request():
+    registry = tripped()
+    assert registry.allow('llama')
+    assert not registry.allow('llama')
+
+    registry.release_probe('llama')
+    assert registry._models['llama'].state == HALF_OPEN
+    assert registry.allow('llama')
+
+
+def test_release_probe_leaves_closed_and_open_models_alone():
+    registry = ModelHealthRegistry(failure_threshold=1)
+    registry.allow('mixtral')
+    registry.release_probe('mixtral')
+    registry.release_probe('unknown')
+    registry.record_failure('groq', 'llama', 'error')
+    registry.release_probe('llama')
+
+    assert registry._models['mixtral'].state == CLOSED
+    assert registry._models['llama'].state == OPEN
+    assert not registry.allow('llama')
+
+
+def test_repeated_errors_open_the_circuit():
+    registry = ModelHealthRegistry(failure_threshold=3, cooldown=30)
+    for _ in range(2):
+        registry.record_failure('groq', 'llama', 'error')
+    assert registry.ordered('groq', ['llama']) == ['llama']
+
+    registry.record_failure('groq', 'llama', 'error')
+    assert registry.ordered('groq', ['llama']) == []
+    assert not registry.allow('llama')
+    assert registry.snapshot()['llama']['state'] == OPEN
+
+
+def test_rate_limits_open_at_once_for_the_retry_hint():
+    registry = ModelHealthRegistry(failure_threshold=3, cooldown=30)
+    registry.record_failure('groq', 'llama', 'rate_limit', retry_after=7)
+
+    assert registry.snapshot()['llama']['retry_in'] == 7.0
+
+
+def test_missing_models_are_evicted_and_auth_errors_ignored():
+    registry = ModelHealthRegistry(failure_threshold=1)
+    registry.record_failure('groq', 'retired', 'not_found')
+    registry.record_failure('groq', 'llama', 'auth')
+
+    reopen_now(registry, 'retired')
+    assert registry.ordered('groq', ['retired', 'llama']) == ['llama']
+    assert registry.snapshot()['retired']['state'] == 'evicted'
+    assert registry.snapshot()['llama']['state'] == CLOSED
+
+
+def test_a_half_open_model_admits_one_probe_at_a_time():
+    registry = tripped()
+    assert registry.ordered('groq', ['llama']) == ['llama']
+    assert registry.allow('llama')
+    assert registry.ordered('groq', ['llama']) == []
+
+
+def test_a_successful_probe_closes_the_circuit():
+    registry = tripped()
+    registry.allow('llama')
+    registry.record_success('groq', 'llama')
+
+    assert registry._models['llama'].state == CLOSED
+    assert registry.allow('llama') and registry.allow('llama')
+
+
+def test_a_failed_probe_reopens_with_a_longer_cooldown():
+    registry = tripped()
+    registry.allow('llama')
+    registry.record_failure('groq', 'llama', 'error')
+
+    assert registry._models['llama'].state == OPEN
+    assert registry.snapshot()['llama']['retry_in'] == 60.0
+
+
+def test_the_last_good_model_is_tried_first():
+    registry = ModelHealthRegistry()
+    registry.record_success('groq', 'mixtral')
+
+    assert registry.ordered('groq', ['llama', 'mixtral']) == ['mixtral', 'llama']
+    assert registry.ordered('groq', ['llama', 'mixtral'], keep_order=True) == ['llama', 'mixtral']
+    registry.record_failure('groq', 'mixtral', 'error')
+    assert registry.ordered('groq', ['llama', 'mixtral']) == ['llama', 'mixtral']
+
+
+class ProviderError(Exception):
+    def __init__(self, message, status_code=None):
+        super().__init__(message)
+        self.status_code = status_code
+
+
+@pytest.mark.parametrize('error, kind', [
+    (ProviderError('Too many requests', 429), 'rate_limit'),
+    (ProviderError('Resource has been exhausted (e.g. check quota)'), 'rate_limit'),
+    (ProviderError('The model llama-3.1-70b-versatile has been decommissioned'), 'not_found'),
+    (ProviderError('Invalid API Key', 401), 'auth'),
+    (ProviderError('Connection reset'), 'error'),
+])
+def test_classify_error(error, kind):
+    assert classify_error(error) == kind
+
+
+def test_retry_after_comes_from_the_header_or_the_message():
+    error = ProviderError('rate limited')
+    error.response = type('Response', (), {'headers': {'retry-after': '12'}})()
+    assert retry_after_seconds(error) == 12.0
+    assert retry_after_seconds(ProviderError('Please retry after 3.5 seconds')) == 3.5
+    assert retry_after_seconds(ProviderError('Connection reset')) is None
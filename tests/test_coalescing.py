@@ -0,0 +1,151 @@
+"""
+SingleFlight: joining, resuming, leaving and cancelling generations
+"""
+import time
+
+import pytest
+
+from app.utils.coalescing import SingleFlight
+from app.utils.deadline import DeadlineExceeded, deadline_scope
+from tests.conftest import FakeProvider, wait_for
+
+
+def test_identical_questions_share_one_generation(provider):
+    flights = SingleFlight()
+    first = flights.join('skills', provider.start)
+    second = flights.join('skills', provider.start)
+
+    assert first is second
+    assert first.subscribers == 2
+    provider.feed('Python')
+    provider.finish()
+    assert wait_for(lambda: first.done)
+    assert provider.calls == 1
+    assert first.deltas == [('groq', 'Python')]
+
+
+def test_questions_without_a_key_never_share(provider):
+    flights = SingleFlight()
+    assert flights.join(None, provider.start) is not flights.join(None, provider.start)
+
+
+def test_subscribe_replays_buffered_deltas_then_follows_the_live_stream(provider):
+    flights = SingleFlight()
+    leader = flights.join('skills', provider.start)
+    provider.feed('Python', ', Flask')
+    assert wait_for(lambda: len(leader.deltas) == 2)
+
+    follower = flights.subscribe('skills', provider.start)
+    assert next(follower) == ('groq', 'Python')
+    assert next(follower) == ('groq', ', Flask')
+    provider.feed(' and SQL')
+    provider.finish()
+    assert list(follower) == [('groq', ' and SQL')]
+    assert provider.calls == 1
+    flights.leave(leader)
+
+
+def test_on_complete_runs_once_with_the_whole_answer(provider):
+    flights = SingleFlight()
+    completed = []
+    subscriber = flights.subscribe('skills', provider.start, lambda text, api_used: completed.append((text, api_used)))
+    provider.feed(' Python ', 'and Flask ')
+    provider.finish()
+
+    assert ''.join(delta for _, delta in subscriber) == ' Python and Flask '
+    assert completed == [('Python and Flask', 'groq')]
+    assert flights.in_flight() == 0
+
+
+def test_resume_rejoins_a_flight_by_stream_id(provider):
+    flights = SingleFlight()
+    flight = flights.join('skills', provider.start)
+
+    assert flights.resume(flight.stream_id) is flight
+    assert flight.subscribers == 2
+    assert flights.resume('no-such-stream') is None
+
+
+def test_resume_needs_the_same_fingerprint(provider):
+    flights = SingleFlight()
+    flight = flights.join('skills', provider.start, fingerprint=('skills', None, ()))
+
+    assert flights.resume(flight.stream_id, ('education', None, ())) is None
+    assert flights.resume(flight.stream_id, ('skills', None, ())) is flight
+
+
+def test_resume_fails_once_the_replay_ttl_has_passed(provider):
+    flights = SingleFlight(replay_ttl=0.0)
+    flight = flights.join('skills', provider.start)
+    provider.finish()
+    assert wait_for(lambda: flight.done)
+    flights.leave(flight)
+
+    assert flights.resume(flight.stream_id) is None
+
+
+def test_last_subscriber_leaving_cancels_after_the_grace_period(provider):
+    flights = SingleFlight(resume_grace=0.1)
+    flight = flights.join('skills', provider.start)
+    flights.leave(flight)
+
+    assert not flight.cancelled
+    assert wait_for(lambda: flight.cancelled)
+    assert provider.cancelled.wait(1.0)
+    assert flights.resume(flight.stream_id) is None
+
+
+def test_zero_grace_cancels_at_once(provider):
+    flights = SingleFlight(resume_grace=0)
+    flight = flights.join('skills', provider.start)
+    flights.leave(flight)
+
+    assert flight.cancelled
+    assert flight.cancel_event.is_set()
+
+
+def test_resuming_within_the_grace_period_keeps_the_generation(provider):
+    flights = SingleFlight(resume_grace=0.1)
+    flight = flights.join('skills', provider.start)
+    flights.leave(flight)
+    assert flights.resume(flight.stream_id) is flight
+
+    time.sleep(0.2)
+    assert not flight.cancelled
+    provider.feed('Python')
+    provider.finish()
+    assert wait_for(lambda: flight.done)
+    assert flight.deltas == [('groq', 'Python')]
+
+
+def test_a_cancelled_flight_is_not_joined_again(provider):
+    flights = SingleFlight(resume_grace=0)
+    flight = flights.join('skills', provider.start)
+    flights.leave(flight)
+
+    fresh = FakeProvider()
+    assert flights.join('skills', fresh.start) is not flight
+    assert wait_for(lambda: fresh.calls == 1)
+
+
+def test_a_cancelled_generation_is_never_cached(provider):
+    flights = SingleFlight(resume_grace=0)
+    completed = []
+    flight = flights.join('skills', provider.start, lambda text, api_used: completed.append(text))
+    provider.feed('Partial')
+    assert wait_for(lambda: flight.deltas)
+    flights.leave(flight)
+
+    assert wait_for(lambda: flight.done)
+    assert completed == []
+
+
+def test_subscribe_gives_up_at_the_request_deadline(provider):
+    flights = SingleFlight()
+    with deadline_scope(0.2):
+        started = time.monotonic()
+        with pytest.raises(DeadlineExceeded):
+            list(flights.subscribe('skills', provider.start))
+
+    assert time.monotonic() - started < 1.0
+    assert provider.cancelled.wait(1.0)
@@ -0,0 +1,70 @@
+"""
+Request deadlines: attempt budgets along the fallback chain and bounded waits
+"""
+import threading
+
+import pytest
+
+from app.utils import deadline as deadline_module
+from app.utils.deadline import (Deadline, DeadlineExceeded, attempt_timeout, deadline_passed,
+                                deadline_scope, wait_timeout)
+from app.utils.telemetry import run_in_context
+
+
+class Clock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        return self.now
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = Clock()
+    monkeypatch.setattr(deadline_module.time, 'monotonic', clock)
+    return clock
+
+
+def test_attempts_get_a_shrinking_share_until_too_little_is_left(clock):
+    deadline = Deadline(20, attempt_share=0.5, min_attempt=2)
+
+    assert deadline.attempt_timeout() == 10
+    clock.now += 10
+    assert deadline.attempt_timeout() == 5
+    clock.now += 7
+    assert deadline.attempt_timeout() == 2
+    clock.now += 2
+    with pytest.raises(DeadlineExceeded):
+        deadline.attempt_timeout()
+
+
+def test_waits_are_bounded_by_the_current_deadline(clock):
+    assert wait_timeout(30) == 30
+    assert attempt_timeout('groq', 'model') is None
+    assert not deadline_passed()
+
+    with deadline_scope(5):
+        assert wait_timeout(30) == 5
+        assert wait_timeout() == 5
+        assert wait_timeout(1) == 1
+        clock.now += 5
+        assert deadline_passed()
+        with pytest.raises(DeadlineExceeded):
+            attempt_timeout('groq', 'model')
+    assert wait_timeout(30) == 30
+
+
+def test_zero_seconds_disables_the_deadline():
+    with deadline_scope(0) as deadline:
+        assert deadline is None
+        assert wait_timeout() is None
+
+
+def test_threads_started_in_context_see_the_deadline(clock):
+    seen = []
+    with deadline_scope(5):
+        worker = threading.Thread(target=run_in_context(lambda: seen.append(wait_timeout())))
+        worker.start()
+        worker.join()
+    assert seen == [5]
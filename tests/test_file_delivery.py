@@ -0,0 +1,63 @@
+"""
+Resume download: in-memory versions, conditional and range requests
+"""
+import os
+
+from flask import Flask
+
+from app.utils.file_delivery import CachedFile
+
+app = Flask(__name__)
+
+
+def cached(tmp_path, content=b'%PDF-1.4 resume', **options):
+    path = tmp_path / 'resume.pdf'
+    path.write_bytes(content)
+    return CachedFile(str(path), 'resume.pdf', 'application/pdf', **options), path
+
+
+def test_range_and_conditional_requests(tmp_path):
+    resume, _ = cached(tmp_path)
+    version = resume.refresh()
+
+    with app.test_request_context(headers={'Range': 'bytes=0-3'}):
+        partial = resume.response(version)
+    assert partial.status_code == 206
+    assert partial.get_data() == b'%PDF'
+
+    with app.test_request_context(headers={'If-None-Match': f'"{version.etag}"'}):
+        assert resume.response(version).status_code == 304
+
+
+def test_a_reload_publishes_a_whole_new_version(tmp_path):
+    resume, path = cached(tmp_path, stat_ttl=0)
+    old = resume.refresh()
+    path.write_bytes(b'%PDF-1.7 a longer resume')
+    os.utime(path, ns=(old.mtime + 10 ** 9, old.mtime + 10 ** 9))
+    new = resume.refresh()
+
+    assert new is not old
+    assert (old.content, old.size) == (b'%PDF-1.4 resume', 15)
+    assert (new.content, new.size) == (b'%PDF-1.7 a longer resume', 24)
+    with app.test_request_context():
+        response = resume.response(old)
+    assert response.get_data() == old.content
+    assert response.headers['ETag'] == f'"{old.etag}"'
+
+
+def test_missing_file_has_no_version(tmp_path):
+    resume, path = cached(tmp_path, stat_ttl=0)
+    path.unlink()
+    assert resume.refresh() is None
+
+
+def test_large_files_are_streamed_from_disk(tmp_path):
+    resume, _ = cached(tmp_path, memory_max_bytes=4)
+    version = resume.refresh()
+
+    assert version.content is None
+    with app.test_request_context():
+        response = resume.response(version)
+    assert response.content_length == 15
+    assert b''.join(response.response) == b'%PDF-1.4 resume'
+    response.close()
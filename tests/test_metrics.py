@@ -0,0 +1,45 @@
+"""
+Metrics registry shards and the Prometheus rendering
+"""
+import threading
+
+from app.utils.metrics import render_prometheus
+from app.utils.telemetry import MetricsRegistry, get_metrics_registry
+
+
+def run_in_threads(target, count):
+    for _ in range(count):
+        thread = threading.Thread(target=target)
+        thread.start()
+        thread.join()
+
+
+def test_shards_of_exited_threads_are_folded_without_a_scrape():
+    registry = MetricsRegistry()
+    run_in_threads(lambda: registry.inc('flights'), 2000)
+
+    assert len(registry._shards) <= registry.RETIRE_EVERY
+    counters, _ = registry.snapshot()
+    assert counters[('flights', ())] == 2000
+
+
+def test_snapshot_merges_live_and_retired_shards():
+    registry = MetricsRegistry()
+    registry.observe('request', 0.2, route='chat')
+    run_in_threads(lambda: registry.observe('request', 0.7, route='chat'), 3)
+
+    _, histograms = registry.snapshot()
+    [histogram] = histograms
+    assert histogram['count'] == 4
+    assert round(histogram['sum'], 6) == 2.3
+    assert dict(histogram['buckets'])[0.25] == 1
+    assert dict(histogram['buckets'])[float('inf')] == 4
+
+
+def test_render_prometheus_names_counters_and_gauges():
+    get_metrics_registry().inc('hedge_wins', provider='groq')
+    text = render_prometheus({'chat_sessions': ('Chat sessions held in memory', [({}, 3)])})
+
+    assert '# TYPE portfolio_hedge_wins_total counter' in text
+    assert 'portfolio_hedge_wins_total{provider="groq",worker="' in text
+    assert '# TYPE portfolio_chat_sessions gauge' in text
@@ -0,0 +1,78 @@
+"""
+Model routing: question tiers, follow-ups and the per-worker token budget
+"""
+from app.config.settings import Config
+from app.utils import model_router
+from app.utils.model_router import COMPLEX, ECONOMY, SIMPLE, ModelRouter, TokenBudget, create_model_router
+
+SYSTEM = {'role': 'system', 'content': 'You answer questions about a resume.'}
+
+
+def router(budget=None):
+    return ModelRouter(['gemini-pro'], ['llama-3.1-8b-instant', 'llama-3.3-70b-versatile'],
+                       budget=budget, downgrade_at=0.8)
+
+
+def conversation(*questions):
+    messages = [SYSTEM]
+    for question in questions:
+        messages += [{'role': 'user', 'content': question}, {'role': 'assistant', 'content': 'An answer.'}]
+    return messages[:-1]
+
+
+def test_single_topic_questions_are_simple():
+    assert router().classify('What are his technical skills?') == SIMPLE
+    assert router().classify('Where did he study?') == SIMPLE
+
+
+def test_off_topic_questions_are_simple_only_when_off_topic_wins():
+    assert router().classify('What is the weather today?') == SIMPLE
+    assert router().classify('What about his cooking skills and python skills?') == SIMPLE
+    assert router().classify('Which projects used his cooking skills and python skills?') == COMPLEX
+
+
+def test_open_ended_questions_are_complex():
+    assert router().classify('Why should we hire him?') == COMPLEX
+
+
+def test_only_referential_follow_ups_keep_the_large_model():
+    history = ('What are his technical skills?',)
+    assert router().route(conversation(*history, 'Where did he study?')).tier == SIMPLE
+    assert router().route(conversation(*history, 'Where did he use them?')).tier == COMPLEX
+
+
+def test_large_model_leads_the_groq_list_for_complex_questions():
+    route = router().route(conversation('Why should we hire him?'))
+    assert route.groq_models[0] == 'llama-3.3-70b-versatile'
+
+
+def test_token_budget_is_split_across_workers(monkeypatch):
+    monkeypatch.setattr(Config, 'MODEL_ROUTER_ENABLED', True)
+    monkeypatch.setattr(Config, 'TOKEN_BUDGET_DAILY', 80000)
+    monkeypatch.setattr(Config, 'WORKER_PROCESSES', 8)
+    assert create_model_router([], []).budget.daily_tokens == 10000
+
+
+def test_spending_the_budget_downgrades_in_two_steps():
+    budget = TokenBudget(1000)
+    open_ended = conversation('Why should we hire him?')
+
+    assert router(budget).route(open_ended).tier == COMPLEX
+    budget.charge(800)
+    economy = router(budget).route(open_ended)
+    assert economy.tier == ECONOMY
+    assert economy.groq_models[0] == 'llama-3.1-8b-instant'
+    assert economy.max_tokens == router().complex_max_tokens
+    budget.charge(200)
+    spent = router(budget).route(open_ended)
+    assert spent.tier == SIMPLE
+    assert spent.max_tokens == router().simple_max_tokens
+
+
+def test_token_budget_starts_again_on_a_new_utc_day(monkeypatch):
+    budget = TokenBudget(1000)
+    budget.charge(600)
+    assert budget.used_fraction() == 0.6
+
+    monkeypatch.setattr(model_router.time, 'strftime', lambda *args: '2099-01-01')
+    assert budget.used() == 0
@@ -0,0 +1,47 @@
+"""
+Pre-rendered index page: compressed variants, ETags and invalidation
+"""
+import threading
+
+from app import create_app
+from app.utils.page_cache import PrerenderedPage
+
+
+def test_index_is_served_compressed_and_revalidated_with_its_etag():
+    client = create_app().test_client()
+    page = client.get('/', headers={'Accept-Encoding': 'gzip'})
+
+    assert page.status_code == 200
+    assert page.headers['Content-Encoding'] == 'gzip'
+    assert page.headers['ETag'].endswith('-gzip"')
+    again = client.get('/', headers={'Accept-Encoding': 'gzip', 'If-None-Match': page.headers['ETag']})
+    assert again.status_code == 304
+
+
+def test_requests_racing_an_invalidation_always_get_a_whole_render():
+    app = create_app()
+    page = PrerenderedPage('portfolio.html')
+    errors, served = [], set()
+
+    def request_page():
+        with app.test_request_context('/'):
+            for _ in range(200):
+                try:
+                    body, encoding, etag = page.get('identity')
+                    served.add((len(body), etag))
+                except Exception as e:
+                    errors.append(e)
+
+    def invalidate():
+        with app.test_request_context('/'):
+            for _ in range(200):
+                page.invalidate()
+
+    threads = [threading.Thread(target=request_page) for _ in range(4)] + [threading.Thread(target=invalidate)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert errors == []
+    assert len(served) == 1
@@ -0,0 +1,85 @@
+"""
+Admission control: client token buckets and provider concurrency slots
+"""
+import pytest
+
+from app.utils import rate_limit
+from app.utils.rate_limit import ClientRateLimiter, ProviderSlots, provider_slot
+
+
+class Clock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        return self.now
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = Clock()
+    monkeypatch.setattr(rate_limit.time, 'monotonic', clock)
+    return clock
+
+
+def test_bucket_allows_the_burst_then_refills_at_the_rate(clock):
+    limiter = ClientRateLimiter(rate_per_minute=60, burst=2)
+    assert limiter.allow('a') and limiter.allow('a')
+    assert not limiter.allow('a')
+    assert limiter.retry_after('a') == pytest.approx(1.0)
+
+    clock.now += 0.5
+    assert not limiter.allow('a')
+    clock.now += 0.5
+    assert limiter.allow('a')
+    clock.now += 60
+    assert limiter.allow('a') and limiter.allow('a')
+    assert not limiter.allow('a')
+
+
+def test_clients_have_their_own_buckets_and_idle_ones_are_evicted(clock):
+    limiter = ClientRateLimiter(rate_per_minute=60, burst=1, max_clients=2)
+    assert limiter.allow('a')
+    assert limiter.allow('b')
+    assert not limiter.allow('a')
+    assert limiter.allow('c')  # evicts b, the least recently seen
+
+    assert limiter.allow('b')
+    assert limiter.retry_after('unknown') == 0.0
+
+
+def test_provider_slots_cap_concurrent_calls():
+    slots = ProviderSlots({'gemini': 2, 'groq': 1})
+    assert slots.try_acquire('gemini') and slots.try_acquire('gemini')
+    assert not slots.try_acquire('gemini')
+    assert slots.in_use() == {'gemini': 2, 'groq': 0}
+
+    slots.release('gemini')
+    assert slots.in_use() == {'gemini': 1, 'groq': 0}
+    assert slots.try_acquire('gemini')
+    with pytest.raises(ValueError):
+        slots.release('groq')
+
+
+class Manager:
+    def __init__(self, limit):
+        self.provider_slots = ProviderSlots({'groq': limit})
+
+    def acquire_provider_slot(self, provider):
+        return self.provider_slots.try_acquire(provider)
+
+    @provider_slot('groq')
+    def stream(self):
+        yield 'Python'
+        yield ' and Flask'
+
+
+def test_a_streaming_call_holds_its_slot_until_it_is_closed():
+    manager = Manager(limit=1)
+    first = manager.stream()
+    assert next(first) == 'Python'
+    assert list(manager.stream()) == []  # rejected while the first stream holds the slot
+
+    first.close()
+    assert manager.provider_slots.in_use() == {'groq': 0}
+    assert list(manager.stream()) == ['Python', ' and Flask']
@@ -0,0 +1,71 @@
+"""
+Response cache: normalized keys, fuzzy matching threshold, TTL, LRU and context invalidation
+"""
+from app.utils import response_cache
+from app.utils.response_cache import ResponseCache, normalize_question
+
+CONTEXT = 'Resume context'
+
+
+def test_equivalent_questions_share_a_key():
+    assert normalize_question('What are his technical skills?') == 'skill technical'
+    assert normalize_question("Tell me about Raviteja's technical skill") == 'skill technical'
+    assert normalize_question('What is it?') == ''
+
+
+def test_exact_and_normalized_hits():
+    cache = ResponseCache()
+    cache.put('What are his technical skills?', CONTEXT, 'Python', 'groq')
+
+    assert cache.get('technical skills', CONTEXT) == ('Python', 'groq')
+    assert cache.get('Where did he study?', CONTEXT) is None
+    assert cache.stats() == {'size': 1, 'hits': 1, 'misses': 1}
+
+
+def test_fuzzy_matches_need_the_similarity_threshold():
+    # "skill techincal" shares 60% of its trigrams with "skill technical"
+    strict, loose = ResponseCache(similarity=0.8), ResponseCache(similarity=0.5)
+    for cache in (strict, loose):
+        cache.put('What are his technical skills?', CONTEXT, 'Python', 'groq')
+
+    assert strict.get('What are his techincal skills?', CONTEXT) is None
+    assert loose.get('What are his techincal skills?', CONTEXT) == ('Python', 'groq')
+    assert loose.get('Where did he study?', CONTEXT) is None
+
+
+def test_similarity_one_disables_fuzzy_matching():
+    cache = ResponseCache(similarity=1)
+    cache.put('What are his technical skills?', CONTEXT, 'Python', 'groq')
+    assert cache.get('What are his techincal skills?', CONTEXT) is None
+
+
+def test_entries_expire(monkeypatch):
+    now = [1000.0]
+    monkeypatch.setattr(response_cache.time, 'monotonic', lambda: now[0])
+    cache = ResponseCache(ttl=60, similarity=0.5)
+    cache.put('What are his technical skills?', CONTEXT, 'Python', 'groq')
+    cache.put('Where did he study?', CONTEXT, 'Osmania University', 'gemini', ttl=600)
+
+    now[0] += 61
+    assert cache.get('What are his technical skills?', CONTEXT) is None
+    assert cache.get('What are his techincal skills?', CONTEXT) is None
+    assert cache.get('Where did he study?', CONTEXT) == ('Osmania University', 'gemini')
+
+
+def test_least_recently_used_answers_are_evicted():
+    cache = ResponseCache(max_size=2, similarity=1)
+    cache.put('Where did he study?', CONTEXT, 'Osmania University', 'groq')
+    cache.put('What are his technical skills?', CONTEXT, 'Python', 'groq')
+    cache.get('Where did he study?', CONTEXT)
+    cache.put('Which certifications does he hold?', CONTEXT, 'AWS', 'groq')
+
+    assert cache.get('What are his technical skills?', CONTEXT) is None
+    assert cache.get('Where did he study?', CONTEXT) is not None
+
+
+def test_a_new_context_clears_the_cache():
+    cache = ResponseCache()
+    cache.put('What are his technical skills?', CONTEXT, 'Python', 'groq')
+
+    assert cache.get('What are his technical skills?', 'Updated resume context') is None
+    assert cache.stats()['size'] == 0
@@ -0,0 +1,29 @@
+"""
+Fallback intent matcher: whole-word keywords, suffixes, phrases and tie-breaks
+"""
+from app.utils.resume_context import (FALLBACK_RESPONSES, classify_intent, get_smart_fallback_response,
+                                      score_intents)
+
+
+def test_keywords_match_whole_words_with_suffixes():
+    assert score_intents('Which technologies and frameworks does he use?') == {'skills': 2}
+    assert score_intents('Projects he is building') == {'projects': 2}
+    # Substrings of longer words are not keywords ('application' is, 'apple' is not)
+    assert score_intents('apple workshop') == {}
+
+
+def test_multi_word_keywords_match_as_a_phrase():
+    assert score_intents('his favourite tv show') == {'out_of_context': 1}
+    assert score_intents('show me his work') == {'experience': 1}
+
+
+def test_highest_score_wins_and_ties_follow_the_priority_order():
+    assert classify_intent('Where did he study for his degree?') == 'education'
+    assert classify_intent('skills used in his projects') == 'skills'
+    assert classify_intent('work on music') == 'out_of_context'
+    assert classify_intent('Hello there') == 'default'
+
+
+def test_fallback_answers_come_from_the_classified_intent():
+    assert get_smart_fallback_response('What degree does he have?') == FALLBACK_RESPONSES['education']
+    assert get_smart_fallback_response('Hi') == FALLBACK_RESPONSES['default']
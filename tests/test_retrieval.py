@@ -0,0 +1,59 @@
+"""
+Retrieval index: chunking, ranking, the on-disk round trip and the prompt budget
+"""
+from app.utils import retrieval
+from app.utils.retrieval import RetrievalIndex, chunk_pdf_text, chunk_profile
+
+CHUNKS = [
+    {'source': 'profile', 'title': 'SKILLS', 'text': 'Python, Flask, PostgreSQL and Docker'},
+    {'source': 'profile', 'title': 'EDUCATION', 'text': 'Computer science degree with honours'},
+    {'source': 'profile', 'title': 'PROJECTS', 'text': 'Built a Flask chatbot with streaming answers'},
+]
+
+
+def test_profile_is_split_at_headings():
+    chunks = chunk_profile("NAME: Jane\nSKILLS:\n- Python\n- Go\nEMPTY:\n")
+
+    assert [(chunk['title'], chunk['text']) for chunk in chunks] == [
+        ('NAME', 'Jane'), ('SKILLS', '- Python\n- Go')
+    ]
+
+
+def test_pdf_text_rejoins_wrapped_bullets_and_splits_long_sections():
+    text = "EXPERIENCE\nEngineer at Acme\n• Built the billing\nservice.\n"
+    chunks = chunk_pdf_text(text)
+    assert chunks == [{'source': 'pdf', 'title': 'EXPERIENCE',
+                       'text': 'Engineer at Acme\n• Built the billing service.'}]
+
+    long_section = "EXPERIENCE\n" + "".join(f"Job {n}\n• {'x' * 300}.\n" for n in range(3))
+    entries = chunk_pdf_text(long_section)
+    assert [chunk['text'].splitlines()[0] for chunk in entries] == ['Job 0', 'Job 1', 'Job 2']
+
+
+def test_search_ranks_the_chunk_sharing_the_rarest_terms_first():
+    index = RetrievalIndex.build(CHUNKS, 'test')
+
+    assert index.search('which degree did you study', 1)[0]['title'] == 'EDUCATION'
+    assert [chunk['title'] for chunk in index.search('flask chatbot', 2)] == ['PROJECTS', 'SKILLS']
+    assert index.search('kubernetes', 3) == []
+
+
+def test_saved_index_is_memory_mapped_back_with_the_same_results(tmp_path):
+    base = str(tmp_path / 'index')
+    built = RetrievalIndex.build(CHUNKS, 'abc')
+    built.save(base)
+
+    loaded = RetrievalIndex.load(base)
+    assert loaded.fingerprint == 'abc'
+    assert loaded.search('flask chatbot', 2) == built.search('flask chatbot', 2)
+    assert RetrievalIndex.load(str(tmp_path / 'missing')) is None
+
+
+def test_context_keeps_the_best_match_and_falls_back_to_the_full_profile(monkeypatch):
+    monkeypatch.setattr(retrieval, 'retrieval_index', RetrievalIndex.build(CHUNKS, 'test'))
+
+    context = retrieval.retrieve_profile_context('flask chatbot', top_k=2, max_chars=50)
+    assert context.startswith('RELEVANT PROFILE EXCERPTS:')
+    assert 'streaming answers' in context
+    assert 'PostgreSQL' not in context
+    assert retrieval.retrieve_profile_context('kubernetes') == retrieval.RESUME_PROFILE
@@ -0,0 +1,55 @@
+"""
+Follow-up detection and bounded session history
+"""
+import pytest
+
+from app.utils.sessions import ChatSession, is_follow_up
+
+STANDALONE = [
+    'What is it like to work with him?',
+    'Tell me more about his projects',
+    'Is there a way to contact him?',
+    'What did he do in his previous job?',
+    'What are their main responsibilities in his current team?',
+    'What are his technical skills?',
+    'Where did he study?',
+]
+
+FOLLOW_UPS = [
+    'Why?',
+    'How so?',
+    'Tell me more',
+    'Tell me more about that',
+    'What about the second one?',
+    'Is it open source?',
+    'Which of those used Python?',
+    'Can you expand on what you said?',
+    'What else has he built?',
+]
+
+
+@pytest.mark.parametrize('question', STANDALONE)
+def test_standalone_questions_are_not_follow_ups(question):
+    assert not is_follow_up(question, has_history=True)
+
+
+@pytest.mark.parametrize('question', FOLLOW_UPS)
+def test_references_back_are_follow_ups(question):
+    assert is_follow_up(question, has_history=True)
+
+
+@pytest.mark.parametrize('question', FOLLOW_UPS)
+def test_nothing_is_a_follow_up_without_earlier_turns(question):
+    assert not is_follow_up(question, has_history=False)
+
+
+def test_history_is_compacted_into_a_summary_within_its_budget():
+    session = ChatSession('a' * 24, max_turns=3, history_tokens=60)
+    for turn in range(5):
+        session.record(f'Question {turn}?', f'Answer number {turn}. ' + 'More detail. ' * 10)
+
+    summary, turns = session.history()
+    assert turns[-1][0] == 'Question 4?'
+    assert len(turns) < 3
+    assert 'Question 0?' not in [question for question, _ in turns]
+    assert summary
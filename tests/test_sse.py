@@ -0,0 +1,126 @@
+"""
+SSE framing of a flight: meta event, frame ids, coalescing and heartbeats
+"""
+import json
+
+from app.utils.coalescing import SingleFlight
+from app.utils.deadline import deadline_scope
+from app.utils.sse import HEARTBEAT, format_event, parse_event_id, stream_flight
+from tests.conftest import wait_for
+
+
+def parse(frame):
+    """Return an SSE frame's fields, with data JSON-decoded"""
+    fields = {}
+    for line in frame.strip().split('\n'):
+        name, _, value = line.partition(': ')
+        fields[name] = value
+    fields['data'] = json.loads(fields['data'])
+    return fields
+
+
+def test_format_event_frames_multiline_data():
+    assert format_event('a\nb', event='meta', event_id='s-1', retry=2000) == (
+        'retry: 2000\nevent: meta\nid: s-1\ndata: a\ndata: b\n\n'
+    )
+
+
+def test_parse_event_id():
+    assert parse_event_id('0a1b2c-12') == ('0a1b2c', 12)
+    assert parse_event_id(' 0a1b2c-0 ') == ('0a1b2c', 0)
+    assert parse_event_id('0a1b2c') is None
+    assert parse_event_id('0a1b2c-x') is None
+    assert parse_event_id(None) is None
+
+
+def test_stream_opens_with_meta_and_sends_api_used_on_the_first_frame_only(provider):
+    flight = SingleFlight().join('skills', provider.start)
+    state = {}
+    frames = stream_flight(flight, state=state, flush_interval=10, heartbeat=10)
+
+    meta = parse(next(frames))
+    assert meta['event'] == 'meta'
+    assert meta['data'] == {'stream_id': flight.stream_id}
+
+    provider.feed('Python')
+    first = parse(next(frames))
+    assert first['id'] == f'{flight.stream_id}-1'
+    assert first['data'] == {'chunk': 'Python', 'api_used': 'groq'}
+
+    provider.feed(', Flask', ' and SQL')
+    provider.finish()
+    rest = [parse(frame) for frame in frames]
+    assert [frame['data'] for frame in rest] == [{'chunk': ', Flask and SQL'}]
+    assert rest[0]['id'] == f'{flight.stream_id}-3'
+    assert state['text'] == 'Python, Flask and SQL'
+    assert state['api_used'] == 'groq'
+    assert state['frames'] == 2
+
+
+def test_frames_flush_once_they_reach_the_byte_limit(provider):
+    flight = SingleFlight().join('skills', provider.start)
+    frames = stream_flight(flight, flush_interval=10, flush_bytes=4, heartbeat=10)
+    next(frames)
+    provider.feed('a')
+    assert parse(next(frames))['data']['chunk'] == 'a'
+
+    provider.feed('bc', 'de')
+    assert wait_for(lambda: len(flight.deltas) == 3)
+    assert parse(next(frames))['data']['chunk'] == 'bcde'
+    provider.finish()
+    assert list(frames) == []
+
+
+def test_idle_streams_carry_heartbeats(provider):
+    flight = SingleFlight().join('skills', provider.start)
+    frames = stream_flight(flight, heartbeat=0.05)
+    next(frames)
+
+    assert next(frames) == HEARTBEAT
+    provider.feed('Python')
+    provider.finish()
+    assert [parse(frame)['data']['chunk'] for frame in frames if frame != HEARTBEAT] == ['Python']
+
+
+def test_resumed_stream_replays_from_the_event_index(provider):
+    flight = SingleFlight().join('skills', provider.start)
+    provider.feed('Python', ', Flask', ' and SQL')
+    provider.finish()
+    assert wait_for(lambda: flight.done)
+
+    state = {}
+    frames = [parse(frame) for frame in stream_flight(flight, 1, state)]
+    assert frames[0]['data'] == {'stream_id': flight.stream_id}
+    assert [frame['data']['chunk'] for frame in frames[1:]] == [', Flask and SQL']
+    assert frames[-1]['id'] == f'{flight.stream_id}-3'
+    assert state['text'] == 'Python, Flask and SQL'
+
+
+def test_stream_gives_up_at_the_request_deadline(provider):
+    flight = SingleFlight().join('skills', provider.start)
+    provider.feed('Partial')
+    state = {}
+    with deadline_scope(0.2):
+        frames = [frame for frame in stream_flight(flight, state=state, heartbeat=10)]
+
+    assert state['expired']
+    assert flight.cancelled
+    assert parse(frames[-1])['data']['chunk'] == 'Partial'
+    assert provider.cancelled.wait(1.0)
+
+
+def test_resume_index_past_the_flight_is_clamped(provider):
+    flight = SingleFlight().join('skills', provider.start)
+    provider.feed('Python')
+    assert wait_for(lambda: flight.deltas)
+
+    state = {}
+    frames = stream_flight(flight, 5, state, flush_interval=10, heartbeat=10)
+    next(frames)
+    provider.feed(', Flask', ' and SQL')
+    provider.finish()
+    chunks = [parse(frame) for frame in frames]
+
+    assert ''.join(frame['data']['chunk'] for frame in chunks) == ', Flask and SQL'
+    assert chunks[-1]['id'] == f'{flight.stream_id}-3'
+    assert state['text'] == 'Python, Flask and SQL'
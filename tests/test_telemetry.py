@@ -0,0 +1,49 @@
+"""
+Request traces: every /api/chat-stream request reaches the request histogram once
+"""
+from flask import Response
+
+from app.api.routes import finish_trace_on_close
+from app.utils.telemetry import Trace, get_metrics_registry
+
+
+def requests_traced(**labels):
+    """Samples in the request histogram for chat_stream with exactly these extra labels"""
+    _, histograms = get_metrics_registry().snapshot()
+    wanted = {'route': 'chat_stream', **labels}
+    return sum(histogram['count'] for histogram in histograms
+               if histogram['name'] == 'request' and histogram['labels'] == wanted)
+
+
+def test_a_trace_finishes_once():
+    trace = Trace('chat_stream')
+    trace.attributes['api_used'] = 'twice'
+    trace.finish()
+    trace.finish()
+    assert requests_traced(api_used='twice') == 1
+
+
+def test_rejected_stream_requests_are_traced(client):
+    before = requests_traced()
+    assert client.post('/api/chat-stream', json={'message': '  '}).status_code == 400
+    assert requests_traced() == before + 1
+
+
+def test_streams_closed_before_the_body_starts_are_traced():
+    trace = Trace('chat_stream')
+    before = requests_traced(disconnected=True)
+    finish_trace_on_close(Response(iter(())), trace).close()
+
+    assert trace.finished
+    assert requests_traced(disconnected=True) == before + 1
+
+
+def test_finished_streams_are_traced_once(client, provider):
+    provider.feed('Python')
+    provider.finish()
+    before = requests_traced(api_used='groq')
+    response = client.post('/api/chat-stream', json={'message': 'Which frameworks does he use?'})
+    assert response.get_data().endswith(b'data: [DONE]\n\n')
+    response.close()
+
+    assert requests_traced(api_used='groq') == before + 1